@@ -1,57 +1,80 @@
-import time
-import threading
+from pathlib import Path
 import queue
 import signal
-import datetime
-from typing import Optional
+import threading
+import time
+from types import FrameType
+from typing import List, Optional, cast
 
-from gridbot.config.settings import load_settings, Settings
-from gridbot.state.manager import StateManager
+from gridbot.book import BookMirror
 from gridbot.broker.binance_connector import Broker
+from gridbot.broker.cassette import CassetteWriter, RecordingBroker, RecordingFeed, session_header
+from gridbot.config.settings import Settings, load_settings
+from gridbot.core.clock import day_of
 from gridbot.core.grid_logic import GridManager
-from gridbot.core.utils import sync_server_time, set_debug_verbose, align_to_grid, spread_bps
-from gridbot.price import refresh_prices, get_book, PriceMessage
+from gridbot.core.hedge import install_hedging
+from gridbot.core.marketstats import MarketStats
+from gridbot.core.scheduler import PollScheduler
+from gridbot.core.timesync import sync_server_time
+from gridbot.core.utils import align_to_grid, set_weight_limit
+from gridbot.feed import FeedReader
+from gridbot.price import PriceMessage, PriceSource, get_book, refresh_prices
+from gridbot.state.manager import StateManager
+from gridbot.ticks import TickRecorder
+from gridbot.utils.logger import get_logger, kv, setup_logger, shutdown_logger
+from gridbot.utils.profiler import start_profiler
+
+log = get_logger(__name__)
 
 # ===== Global Control and Threads =====
 stop_evt = threading.Event()
 price_thread: Optional[threading.Thread] = None
+time_thread: Optional[threading.Thread] = None
 proc_thread: Optional[threading.Thread] = None
 grid_manager: Optional[GridManager] = None
 settings: Optional[Settings] = None
 state_manager: Optional[StateManager] = None
+cassette: Optional[CassetteWriter] = None
+recorder: Optional[TickRecorder] = None
 
-def processor_loop(settings: Settings, state_manager: StateManager, grid_manager: GridManager, msg_queue: "queue.Queue[PriceMessage]", stop_evt: threading.Event):
+def processor_loop(settings: Settings, state_manager: StateManager, grid_manager: GridManager, msg_queue: PriceSource,
+                   stop_evt: threading.Event, scheduler: Optional[PollScheduler] = None,
+                   initial_mid: Optional[float] = None, book: Optional[BookMirror] = None) -> None:
     """The main processing loop that handles market data and executes logic."""
     state = state_manager.state
+    clock = grid_manager.clock
+    stats = scheduler.stats if scheduler else MarketStats(settings)
     last_status = 0.0
 
     # Initial setup
-    try:
-        _, _, mid = get_book(settings)
-    except Exception:
-        mid = 200.0 # Fallback
+    mid = initial_mid
+    if mid is None:
+        try:
+            _, _, mid = get_book(settings)
+        except Exception:
+            mid = 200.0 # Fallback
     
     state.base_price = grid_manager.broker.clamp_price(mid) # Use broker's precision
     state.base_price = grid_manager.broker.clamp_price(state.base_price) # Ensure precision
     state.base_price = grid_manager.broker.clamp_price(align_to_grid(mid, settings.GRID_STEP_USD))
-    print(f"Base price aligned: {state.base_price:.0f}")
+    log.info("Base price aligned: %.0f", state.base_price)
 
     grid_manager.sync_open_from_exchange_full()
     grid_manager.ensure_tps_for_positions()
-    print("[ARMED] Grid placement enabled.")
+    log.info("[ARMED] Grid placement enabled.")
 
     levels = grid_manager.build_grid_candidates(state.base_price)
     if not (stop_evt.is_set() or state.HALT_PLACEMENT):
         grid_manager.place_missing_buys(levels)
-        state_manager.save_state()
+        state_manager.save_state(durable=True)
 
     while not stop_evt.is_set():
         if state.HALT_PLACEMENT:
-            print("[LOOP] HALT_PLACEMENT=True -> exiting processor loop")
+            log.info("[LOOP] HALT_PLACEMENT=True -> exiting processor loop")
             break
         
         # Daily reset check
-        curr = datetime.datetime.now().strftime("%Y-%m-%d")
+        curr = day_of(clock.time())
         if curr != state.spent_date:
             state.spent_today = 0.0
             state.spent_date = curr
@@ -60,63 +83,99 @@ def processor_loop(settings: Settings, state_manager: StateManager, grid_manager
         try:
             bid, ask, mid = msg_queue.get(timeout=0.6)
         except queue.Empty:
+            grid_manager.flush_refill()
             continue
 
-        sp = spread_bps(bid, ask)
+        # Gate on the smoothed spread: one wide tick does not block a pass, one tight tick does not open it
+        now = clock.time()
+        stats.observe(bid, ask, now)
+        sp = stats.spread_avg_bps
         if sp > settings.MAX_SPREAD_BPS:
-            now = time.time()
             if now - last_status > settings.INTERVAL_STATUS_SEC:
-                print(f"\nMid={mid:.4f} | Spread={sp:.2f}bps wide; waiting...", end="", flush=True)
+                log.info("Mid=%.4f | Spread=%.2fbps (now %.2f) wide; waiting...", mid, sp, stats.spread_bps,
+                         extra=kv(_limit=False))
                 last_status = now
             continue
 
         grid_manager.reanchor_up_if_needed(mid)
-        grid_manager.detect_filled_buys_and_restore()
-        
-        # Re-sync state after fill detection/reanchor to get latest TP blocks
-        grid_manager.sync_open_from_exchange_full()
-        
-        levels = grid_manager.build_grid_candidates(state.base_price)
-        if len(state.open_buy_price_to_id) < settings.MAX_LADDERS and not (stop_evt.is_set() or state.HALT_PLACEMENT):
-            grid_manager.place_missing_buys(levels)
-            state_manager.save_state()
 
-        grid_manager.process_positions_vs_market(bid)
+        # Levels the book mirror saw crossed or traded through are confirmed now, not at the next sweep
+        predicted_tps: List[str] = []
+        tp_bid = bid
+        if book is not None:
+            book.track(state.open_buy_price_to_id.items(), ((p.tp_price, p.tp_id, p.qty) for p in state.positions), now)
+            predicted_buys, predicted_tps = book.hits(now)
+            predicted_buys = [(px, oid) for px, oid in predicted_buys if state.open_buy_price_to_id.get(px) == oid]
+            if predicted_buys:
+                grid_manager.confirm_and_process_vanished(predicted_buys, debounce=False)
+            live = book.live(now)
+            if scheduler:
+                scheduler.book_live = live
+            # TP targets are judged on the mirror's top of book, which is newer than a queued tick
+            top = book.best_bid() if live else None
+            if top is not None:
+                tp_bid = top
+
+        # Order/fill polling runs at the scheduler's pace; far from every level it backs off
+        if scheduler is None or scheduler.orders_due(now):
+            grid_manager.detect_filled_buys_and_restore()
+
+            # Re-sync state after fill detection/reanchor to get latest TP blocks
+            grid_manager.sync_open_from_exchange_full()
 
-        now = time.time()
+            levels = grid_manager.build_grid_candidates(state.base_price)
+            room = len(state.open_buy_price_to_id) < settings.MAX_LADDERS
+            if room and not (stop_evt.is_set() or state.HALT_PLACEMENT):
+                grid_manager.place_missing_buys(levels)
+                state_manager.save_state(durable=True)
+            if scheduler:
+                scheduler.mark_orders_polled(clock.time())
+
+        grid_manager.process_positions_vs_market(tp_bid, predicted_tps)
+
+        # One refill pass for everything that filled this tick
+        grid_manager.flush_refill()
+
+        if scheduler:
+            scheduler.update_levels(*grid_manager.nearest_levels())
+
+        now = clock.time()
         if now - last_status > settings.INTERVAL_STATUS_SEC:
-            print(
-                f"\nMid={mid:.4f} | Spread={sp:.2f}bps | Base={state.base_price:.0f} | OpenBUYS={len(state.open_buy_price_to_id)}/{settings.MAX_LADDERS} | "
-                f"TPBlocks={len(state.tp_blocked_entries)} | PosLots={len(state.positions)} | PnL=${state.realized_pnl:.2f}",
-                end="",
-                flush=True,
+            day = state_manager.ledger.window("24h", now)
+            log.info(
+                "Mid=%.4f | Spread=%.2fbps | Vol=%.1fbps/min | Ticks=%.1f/s | Base=%.0f | OpenBUYS=%d/%d | "
+                "TPBlocks=%d | PosLots=%d | PnL=$%.2f (24h $%.2f, fees $%.2f)",
+                mid, sp, stats.volatility_bps, stats.tick_rate, state.base_price, len(state.open_buy_price_to_id),
+                settings.MAX_LADDERS,
+                len(state.tp_blocked_entries), len(state.positions), state.realized_pnl, day['pnl'], day['fees'],
+                extra=kv(_limit=False),
             )
             last_status = now
 
 
-def graceful_exit(signum, frame):
+def graceful_exit(signum: Optional[int], frame: Optional[FrameType]) -> None:
     global grid_manager, state_manager, stop_evt
-    print("\n[Signal] Graceful shutdown...")
+    log.info("[Signal] Graceful shutdown...")
 
     if state_manager:
         state_manager.state.HALT_PLACEMENT = True
-        set_debug_verbose(state_manager.settings.DEBUG_VERBOSE) # Ensure dprint works
-        print("[SHUTDOWN] HALT_PLACEMENT=True")
+        log.info("[SHUTDOWN] HALT_PLACEMENT=True")
 
     stop_evt.set()
 
     if grid_manager and not grid_manager.settings.DRY_RUN:
         try:
-            print("[INFO] Canceling active BUY orders...")
+            log.info("Canceling active BUY orders...")
             for oid in list(grid_manager.state.open_buy_price_to_id.values()):
                 grid_manager.broker.cancel_order(oid)
             grid_manager.state.open_buy_price_to_id.clear()
         except Exception as e:
-            print(f"[WARN] selective cancel failed: {e}")
+            log.warning("selective cancel failed: %s", e)
 
     if state_manager:
         try:
-            state_manager.save_state()
+            state_manager.save_state(durable=True)
+            state_manager.close()
         except Exception:
             pass
 
@@ -128,17 +187,42 @@ def graceful_exit(signum, frame):
     except Exception:
         pass
 
-    print("Bye!")
+    if grid_manager:
+        # After the processor has stopped: placements in flight finish first
+        grid_manager.close()
+    if cassette:
+        cassette.close()
+    if recorder:
+        # The price thread may still be asleep; flush the buffered ticks now
+        recorder.close()
+
+    log.info("Bye!")
+    shutdown_logger()
 
 
-def main():
-    global price_thread, proc_thread, grid_manager, settings, state_manager
+def main() -> None:
+    global price_thread, proc_thread, time_thread, grid_manager, settings, state_manager, cassette, recorder
     
     settings = load_settings()
-    set_debug_verbose(settings.DEBUG_VERBOSE)
+    setup_logger(
+        "DEBUG" if settings.DEBUG_VERBOSE else settings.LOG_LEVEL,
+        Path(settings.LOG_FILE) if settings.LOG_FILE else None,
+        rate_period=settings.LOG_RATE_PERIOD_SEC,
+        rate_burst=settings.LOG_RATE_BURST,
+    )
+    set_weight_limit(settings.RATE_LIMIT_WEIGHT_1M)
+    if settings.HEDGE_REQUESTS:
+        install_hedging(settings)
     
     mode = "DRY" if settings.DRY_RUN else ("TESTNET" if settings.USE_TESTNET else "LIVE")
-    print(f"Starting {settings.SYMBOL} | Mode={mode}")
+    log.info("Starting %s | Mode=%s", settings.SYMBOL, mode)
+
+    log.info("[TIME] syncing...")
+    server_clock = sync_server_time(settings)
+    time_thread = threading.Thread(
+        target=server_clock.run, args=(stop_evt, settings.TIME_SYNC_INTERVAL_SEC), daemon=True
+    )
+    time_thread.start()
 
     broker = Broker(settings)
     
@@ -146,29 +230,78 @@ def main():
     if broker.taker_fee is not None:
         # Note: Settings is frozen, so we rely on the broker instance having the correct fee
         # The PnL calculation in GridManager uses broker.taker_fee if available.
-        print(f"[FEES] TAKER_FEE used for PnL: {broker.taker_fee:.6f}")
+        log.info("[FEES] TAKER_FEE used for PnL: %.6f", broker.taker_fee)
 
     state_manager = StateManager(settings)
-    state_manager.load_state()
+    loaded = state_manager.load_state()
     state_manager.init_csv()
+    if settings.STATE_SAVE_WINDOW_MS > 0:
+        # State writes leave the processor thread; placement passes end in a durability barrier
+        state_manager.start_writer()
+    if not loaded and settings.RECOVER_STATE and not settings.DRY_RUN:
+        # State file missing or corrupt: adopt our position and orders from the exchange
+        recovery = GridManager(settings, state_manager, broker)
+        try:
+            recovery.recover_state_from_exchange()
+        finally:
+            recovery.close()
+
+    initial_mid: Optional[float] = None
+    if settings.SESSION_RECORD_PATH:
+        # Record every exchange call and price message for gridbot.replay
+        _, _, initial_mid = get_book(settings)
+        header = session_header(settings, broker, state_manager.snapshot(), initial_mid)
+        cassette = CassetteWriter(settings.SESSION_RECORD_PATH, header)
+        broker = cast(Broker, RecordingBroker(broker, cassette))
+        log.info("[REPLAY] recording session to %s", settings.SESSION_RECORD_PATH)
 
     grid_manager = GridManager(settings, state_manager, broker)
     
-    print(
-        f"[CONFIG] SYMBOL={settings.SYMBOL} | GRID_STEP_USD={settings.GRID_STEP_USD} | TAKE_PROFIT_USD={settings.TAKE_PROFIT_USD} "
-        f"| MAX_LADDERS={settings.MAX_LADDERS} | DRY_RUN={settings.DRY_RUN} | USE_TESTNET={settings.USE_TESTNET} | TRAIL_UP={settings.TRAIL_UP} | QTY_PER_LADDER={settings.QTY_PER_LADDER}"
+    log.info(
+        "[CONFIG]",
+        extra=kv(
+            SYMBOL=settings.SYMBOL, GRID_STEP_USD=settings.GRID_STEP_USD, TAKE_PROFIT_USD=settings.TAKE_PROFIT_USD,
+            MAX_LADDERS=settings.MAX_LADDERS, DRY_RUN=settings.DRY_RUN, USE_TESTNET=settings.USE_TESTNET,
+            TRAIL_UP=settings.TRAIL_UP, QTY_PER_LADDER=settings.QTY_PER_LADDER,
+        ),
     )
 
-    print("[TIME] syncing...")
-    sync_server_time(settings.FUTURES_BASE_URL)
-
     # Start threads
-    msg_queue: "queue.Queue[PriceMessage]" = queue.Queue(maxsize=1000)
-    price_thread = threading.Thread(target=refresh_prices, args=(settings, stop_evt, msg_queue), daemon=True)
-    price_thread.start()
-    proc_thread = threading.Thread(target=processor_loop, args=(settings, state_manager, grid_manager, msg_queue, stop_evt), daemon=True)
+    scheduler = PollScheduler(settings)
+    msg_queue: PriceSource
+    if settings.PRICE_FEED_PATH:
+        # Ticks come from a shared gridbot.feed process instead of our own polling thread
+        log.info("[FEED] consuming %s", settings.PRICE_FEED_PATH)
+        msg_queue = FeedReader(settings.PRICE_FEED_PATH, settings.SYMBOL, stale_sec=settings.FEED_STALE_SEC)
+    else:
+        price_queue: "queue.Queue[PriceMessage]" = queue.Queue(maxsize=1000)
+        msg_queue = price_queue
+        recorder = TickRecorder(settings.TICK_RECORD_DIR, settings.SYMBOL) if settings.TICK_RECORD_DIR else None
+        price_thread = threading.Thread(
+            target=refresh_prices, args=(settings, stop_evt, price_queue, scheduler, recorder),
+            name="price", daemon=True,
+        )
+        price_thread.start()
+    if cassette:
+        msg_queue = RecordingFeed(msg_queue, cassette)
+    book = None
+    if settings.BOOK_MIRROR and not settings.DRY_RUN:
+        book = BookMirror(settings)
+        threading.Thread(target=book.run, args=(stop_evt,), name="book", daemon=True).start()
+    proc_thread = threading.Thread(
+        target=processor_loop,
+        args=(settings, state_manager, grid_manager, msg_queue, stop_evt, scheduler, initial_mid, book),
+        name="processor", daemon=True,
+    )
     proc_thread.start()
 
+    profiler = start_profiler(
+        settings.PROFILE_DIR, settings.PROFILE_HZ, settings.PROFILE_CONTROL_FILE,
+        [t for t in (proc_thread, price_thread) if t is not None], stop_evt,
+    )
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, profiler.toggle)
+
     signal.signal(signal.SIGINT, graceful_exit)
     signal.signal(signal.SIGTERM, graceful_exit)
 
@@ -0,0 +1,283 @@
+"""
+Streaming analytics over the trade log written by `StateManager.log_trade`.
+
+The log is read in fixed-size binary chunks, so memory stays bounded by the
+number of distinct days/hours/levels, not by file size. Rows are appended in
+time order, which lets `--day` bisect straight to the wanted day and an index
+file resume a previous scan from its last byte offset.
+
+    python -m gridbot.analytics trades.csv
+    python -m gridbot.analytics trades.csv --day 2025-01-31
+    python -m gridbot.analytics trades.csv --index trades.csv.idx --json
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# Events that mark a problem rather than normal flow
+_PROBLEM_EVENTS = (b"BUY_UNKNOWN_STATUS_REMOVED", b"BUY_PARTIAL_OR_ZERO_EXEC")
+
+
+class TradeLogStats:
+    """Aggregates for one pass over the log. Keys are kept as bytes while scanning."""
+
+    def __init__(self) -> None:
+        self.rows = 0
+        self.bad_rows = 0
+        self.events: Dict[bytes, int] = {}
+        self.errors: Dict[bytes, int] = {}
+        # day -> {"events": {event: n}, "pnl": sum, "total_pnl": last}
+        self.days: Dict[bytes, Dict] = {}
+        # hour (YYYY-MM-DDTHH) -> last total_pnl
+        self.hourly_total: Dict[bytes, float] = {}
+        # level -> [buy_opens, buy_fills, tp_closes]
+        self.levels: Dict[bytes, List[int]] = {}
+
+    def _level(self, px: bytes) -> List[int]:
+        lv = self.levels.get(px)
+        if lv is None:
+            lv = self.levels[px] = [0, 0, 0]
+        return lv
+
+    def feed_line(self, line: bytes) -> None:
+        # Only the note column may contain commas/quotes, and it is last -> maxsplit is exact
+        parts = line.split(b",", 6)
+        if len(parts) < 6 or len(parts[0]) < 13 or parts[0][4:5] != b"-":
+            if line.strip() and not line.startswith(b"time,"):
+                self.bad_rows += 1
+            return
+        ts, event, price = parts[0], parts[1], parts[2]
+        self.rows += 1
+        self.events[event] = self.events.get(event, 0) + 1
+        if b"ERROR" in event or event in _PROBLEM_EVENTS:
+            self.errors[event] = self.errors.get(event, 0) + 1
+
+        day = ts[:10]
+        d = self.days.get(day)
+        if d is None:
+            d = self.days[day] = {"events": {}, "pnl": 0.0, "total_pnl": 0.0}
+        ev = d["events"]
+        ev[event] = ev.get(event, 0) + 1
+        try:
+            total = float(parts[5])
+        except ValueError:
+            total = d["total_pnl"]
+        d["total_pnl"] = total
+        self.hourly_total[ts[:13]] = total
+
+        if event == b"LIMIT_BUY_OPEN":
+            self._level(price)[0] += 1
+        elif event == b"BUY_FILLED_CONFIRMED":
+            self._level(price)[1] += 1
+        elif event == b"TP_FILLED":
+            try:
+                d["pnl"] += float(parts[4])
+            except ValueError:
+                pass
+            note = parts[6] if len(parts) > 6 else b""
+            i = note.find(b"entry=")
+            if i >= 0:
+                entry = note[i + 6:].split(b" ", 1)[0].strip(b'"\r\n')
+                self._level(entry)[2] += 1
+
+    # --- Output / persistence ---
+
+    def to_dict(self) -> Dict:
+        return {
+            "rows": self.rows,
+            "bad_rows": self.bad_rows,
+            "events": {_dec(k): v for k, v in self.events.items()},
+            "errors": {_dec(k): v for k, v in self.errors.items()},
+            "days": {
+                _dec(k): {
+                    "events": {_dec(e): n for e, n in v["events"].items()},
+                    "pnl": v["pnl"], "total_pnl": v["total_pnl"],
+                }
+                for k, v in sorted(self.days.items())
+            },
+            "hourly_total_pnl": {_dec(k): v for k, v in sorted(self.hourly_total.items())},
+            "levels": {
+                _dec(k): {"opens": v[0], "fills": v[1], "tp_closes": v[2], "fill_rate": (v[1] / v[0]) if v[0] else None}
+                for k, v in sorted(self.levels.items(), key=lambda kv: _float_or_zero(kv[0]))
+            },
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "TradeLogStats":
+        st = cls()
+        st.rows = int(d.get("rows", 0))
+        st.bad_rows = int(d.get("bad_rows", 0))
+        st.events = {_enc(k): int(v) for k, v in d.get("events", {}).items()}
+        st.errors = {_enc(k): int(v) for k, v in d.get("errors", {}).items()}
+        st.days = {
+            _enc(k): {
+                "events": {_enc(e): int(n) for e, n in v["events"].items()},
+                "pnl": float(v["pnl"]), "total_pnl": float(v["total_pnl"]),
+            }
+            for k, v in d.get("days", {}).items()
+        }
+        st.hourly_total = {_enc(k): float(v) for k, v in d.get("hourly_total_pnl", {}).items()}
+        st.levels = {
+            _enc(k): [int(v["opens"]), int(v["fills"]), int(v["tp_closes"])] for k, v in d.get("levels", {}).items()
+        }
+        return st
+
+
+def _dec(b: bytes) -> str:
+    return b.decode("utf-8", "replace")
+
+
+def _enc(s: str) -> bytes:
+    return s.encode("utf-8")
+
+
+def _float_or_zero(b: bytes) -> float:
+    try:
+        return float(b)
+    except ValueError:
+        return 0.0
+
+
+def scan(
+    path: str, stats: TradeLogStats, start: int = 0, end: Optional[int] = None, chunk_size: int = CHUNK_SIZE
+) -> int:
+    """
+    Feeds complete lines in [start, end) to `stats`. Returns the offset just past the last
+    complete line consumed, so a trailing half-written row is picked up on the next scan.
+    """
+    with open(path, "rb") as f:
+        f.seek(start)
+        pos = start
+        tail = b""
+        while end is None or pos < end:
+            want = chunk_size if end is None else min(chunk_size, end - pos)
+            buf = f.read(want)
+            if not buf:
+                break
+            pos += len(buf)
+            buf = tail + buf
+            cut = buf.rfind(b"\n")
+            if cut < 0:
+                tail = buf
+                continue
+            tail = buf[cut + 1:]
+            for line in buf[:cut].split(b"\n"):
+                stats.feed_line(line)
+        return pos - len(tail)
+
+
+def _line_day_at(f: BinaryIO, offset: int) -> Optional[bytes]:
+    """Day of the first complete line starting at or after `offset`."""
+    f.seek(offset)
+    if offset:
+        f.readline()
+    line = f.readline()
+    while line and (len(line) < 10 or line[4:5] != b"-"):
+        line = f.readline()
+    return line[:10] if line else None
+
+
+def seek_day(path: str, day: str) -> int:
+    """Binary-searches the time-ordered log for the first byte offset of `day` (YYYY-MM-DD)."""
+    target = day.encode("ascii")
+    with open(path, "rb") as f:
+        lo, hi = 0, os.fstat(f.fileno()).st_size
+        while hi - lo > 4096:
+            mid = (lo + hi) // 2
+            d = _line_day_at(f, mid)
+            if d is None or d >= target:
+                hi = mid
+            else:
+                lo = mid
+        # Linear finish inside the last page
+        f.seek(lo)
+        if lo:
+            f.readline()
+        while True:
+            here = f.tell()
+            line = f.readline()
+            if not line or (line[4:5] == b"-" and line[:10] >= target):
+                return here
+
+
+def _load_index(index_path: str, log_path: str) -> Tuple[int, TradeLogStats]:
+    try:
+        with open(index_path, "r", encoding="utf-8") as f:
+            idx = json.load(f)
+        st = os.stat(log_path)
+        # A rotated/truncated log invalidates the index
+        if idx.get("inode") != st.st_ino or int(idx.get("offset", 0)) > st.st_size:
+            return 0, TradeLogStats()
+        return int(idx["offset"]), TradeLogStats.from_dict(idx["stats"])
+    except (OSError, ValueError, KeyError):
+        return 0, TradeLogStats()
+
+
+def _save_index(index_path: str, log_path: str, offset: int, stats: TradeLogStats) -> None:
+    tmp = index_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        doc = {"inode": os.stat(log_path).st_ino, "offset": offset, "stats": stats.to_dict()}
+        json.dump(doc, f, separators=(",", ":"))
+    os.replace(tmp, index_path)
+
+
+def format_report(d: Dict) -> str:
+    out = [f"rows={d['rows']} bad_rows={d['bad_rows']}", "", "== Per day =="]
+    for day, v in d["days"].items():
+        ev = v["events"]
+        out.append(
+            f"{day} | PnL ${v['pnl']:.2f} | Total ${v['total_pnl']:.2f} | buys={ev.get('LIMIT_BUY_OPEN', 0)} "
+            f"fills={ev.get('BUY_FILLED_CONFIRMED', 0)} tps={ev.get('TP_FILLED', 0)}"
+        )
+    out += ["", "== Events =="]
+    out += [f"{k}: {v}" for k, v in sorted(d["events"].items(), key=lambda kv: -kv[1])]
+    out += ["", "== Errors =="]
+    out += [f"{k}: {v}" for k, v in sorted(d["errors"].items(), key=lambda kv: -kv[1])] or ["(none)"]
+    out += ["", "== Levels (opens / fills / tp_closes / fill rate) =="]
+    for px, v in d["levels"].items():
+        rate = f"{v['fill_rate'] * 100:.0f}%" if v["fill_rate"] is not None else "-"
+        out.append(f"{px}: {v['opens']} / {v['fills']} / {v['tp_closes']} / {rate}")
+    return "\n".join(out)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m gridbot.analytics", description="Streaming summary of the trade log.")
+    ap.add_argument("csv", nargs="?", default=os.getenv("CSV_FILE", "trades.csv"))
+    ap.add_argument("--day", help="Only this day (YYYY-MM-DD); bisects to it instead of reading from the start")
+    ap.add_argument("--index", help="Index file to resume from and update (ignored with --day)")
+    ap.add_argument("--json", action="store_true", help="Print JSON instead of the text report")
+    args = ap.parse_args(argv)
+
+    if not os.path.exists(args.csv):
+        print(f"[ANALYTICS] no such file: {args.csv}")
+        return 1
+
+    if args.day:
+        stats = TradeLogStats()
+        start = seek_day(args.csv, args.day)
+        nxt = seek_day(args.csv, _next_day(args.day))
+        scan(args.csv, stats, start, nxt)
+    elif args.index:
+        start, stats = _load_index(args.index, args.csv)
+        offset = scan(args.csv, stats, start)
+        _save_index(args.index, args.csv, offset, stats)
+    else:
+        stats = TradeLogStats()
+        scan(args.csv, stats)
+
+    d = stats.to_dict()
+    print(json.dumps(d, indent=2) if args.json else format_report(d))
+    return 0
+
+
+def _next_day(day: str) -> str:
+    return (datetime.date.fromisoformat(day) + datetime.timedelta(days=1)).isoformat()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Local L2 order-book mirror for predictive fill detection.
+
+`BookMirror` follows the futures diff-depth stream (`<symbol>@depth@100ms`) and the
+aggregate trade stream (`<symbol>@aggTrade`). `DepthBook` keeps the book in sync with
+a REST `/depth` snapshot, following Binance's futures procedure:
+- drop diffs older than the snapshot;
+- the first diff must straddle `lastUpdateId`;
+- every later diff's `pu` must equal the previous `u`, else resync from a new snapshot.
+
+`LevelWatch` tracks our resting BUYs and TPs. When one is first seen, the volume
+resting ahead of it is taken from the book. Trades at that price eat into it, and
+so do cancellations: the queue ahead never exceeds the volume resting at the price. A level
+is reported as a likely fill in two cases:
+- it was crossed: a trade through the price, or the opposite best at or past it;
+- it was traded through: volume at the price covered the queue ahead plus our size.
+
+The processor then confirms BUYs with a targeted lookup and books TPs immediately,
+so the blind open-orders sweep (`BOOK_POLL_SEC`) is only a backstop.
+
+    BOOK_MIRROR=true python -m gridbot
+"""
+import json
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from gridbot.config.settings import Settings
+from gridbot.core.clock import WALL, Clock
+from gridbot.core.utils import request_with_retry
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+BUY, SELL = "BUY", "SELL"
+
+
+class DepthBook:
+    def __init__(self) -> None:
+        self.bids: Dict[float, float] = {}
+        self.asks: Dict[float, float] = {}
+        self.last_update_id = 0
+        self.synced = False
+        self._best_bid: Optional[float] = None
+        self._best_ask: Optional[float] = None
+        self._first = True  # next diff is the first after a snapshot
+
+    def load_snapshot(self, snap: Dict) -> None:
+        """REST `/depth` response: {"lastUpdateId", "bids": [[px, qty], ...], "asks": [...]}."""
+        self.bids = {float(p): float(q) for p, q in snap.get("bids", ()) if float(q) > 0}
+        self.asks = {float(p): float(q) for p, q in snap.get("asks", ()) if float(q) > 0}
+        self.last_update_id = int(snap["lastUpdateId"])
+        self._best_bid = max(self.bids, default=None)
+        self._best_ask = min(self.asks, default=None)
+        self._first = True
+        self.synced = True
+
+    def reset(self) -> None:
+        self.synced = False
+
+    def apply(self, ev: Dict) -> bool:
+        """Applies one `depthUpdate` event; False -> sequence gap, the book needs a new snapshot."""
+        if not self.synced:
+            return False
+        first_id, final_id = int(ev["U"]), int(ev["u"])
+        if final_id < self.last_update_id:
+            return True  # older than the snapshot
+        if self._first:
+            # Straddles the snapshot (or starts right after it)
+            if first_id > self.last_update_id + 1:
+                self.synced = False
+                return False
+            self._first = False
+        elif int(ev.get("pu", -1)) != self.last_update_id:
+            self.synced = False
+            return False
+        for p, q in ev.get("b", ()):
+            self._set(self.bids, float(p), float(q), True)
+        for p, q in ev.get("a", ()):
+            self._set(self.asks, float(p), float(q), False)
+        self.last_update_id = final_id
+        return True
+
+    def _set(self, side: Dict[float, float], px: float, qty: float, is_bid: bool) -> None:
+        best = self._best_bid if is_bid else self._best_ask
+        if qty > 0:
+            side[px] = qty
+            if best is None or (px > best if is_bid else px < best):
+                best = px
+        elif side.pop(px, None) is not None and px == best:
+            # Only removing the best level forces a rescan
+            best = (max if is_bid else min)(side, default=None)
+        if is_bid:
+            self._best_bid = best
+        else:
+            self._best_ask = best
+
+    @property
+    def best_bid(self) -> Optional[float]:
+        return self._best_bid
+
+    @property
+    def best_ask(self) -> Optional[float]:
+        return self._best_ask
+
+    def qty_at(self, side: str, px: float) -> float:
+        """Resting volume at `px` on the side a `side` order of ours would rest on."""
+        return (self.bids if side == BUY else self.asks).get(px, 0.0)
+
+
+class _Level:
+    __slots__ = ("side", "price", "oid", "qty", "ahead")
+
+    def __init__(self, side: str, price: float, oid: str, qty: float, ahead: float):
+        self.side = side
+        self.price = price
+        self.oid = oid
+        self.qty = qty
+        self.ahead = ahead  # volume queued before ours; negative -> ours is being filled
+
+
+class LevelWatch:
+    """Queue position estimates for our resting orders and the fills they imply."""
+
+    def __init__(self, recheck_sec: float = 2.0):
+        self.recheck_sec = recheck_sec
+        self.levels: Dict[str, _Level] = {}
+        self._hits: Dict[str, _Level] = {}
+        self._reported: Dict[str, float] = {}  # oid -> when it was last reported
+
+    def track(self, orders: Iterable[Tuple[str, float, str, float]], book: Optional[DepthBook], now: float) -> None:
+        """Reconciles with our current resting (side, price, orderId, qty); new ones start at the back of the queue."""
+        seen = set()
+        for side, px, oid, qty in orders:
+            if not oid or oid == "n/a":
+                continue
+            seen.add(oid)
+            if oid in self.levels or oid in self._hits or now - self._reported.get(oid, -1e18) < self.recheck_sec:
+                continue
+            if book is not None and book.synced:
+                lv = _Level(side, px, oid, qty, book.qty_at(side, px))
+                crossed = self._crossed(lv, book.best_bid, book.best_ask)
+            else:
+                lv, crossed = _Level(side, px, oid, qty, 0.0), False
+            if crossed:
+                self._hit(lv)  # already through the book when first seen
+            else:
+                self.levels[oid] = lv
+        for oid in [o for o in self.levels if o not in seen]:
+            del self.levels[oid]
+        for oid in [o for o in self._reported if o not in seen]:
+            del self._reported[oid]
+
+    def on_trade(self, px: float, qty: float, buyer_is_maker: bool) -> None:
+        # buyer is maker -> the aggressor sold into the bids (our BUYs); else it bought the asks (our TPs)
+        side = BUY if buyer_is_maker else SELL
+        for lv in list(self.levels.values()):
+            if lv.side != side:
+                continue
+            if (px < lv.price) if side == BUY else (px > lv.price):
+                self._hit(lv)
+            elif px == lv.price:
+                lv.ahead -= qty
+                if lv.ahead + lv.qty <= 0:
+                    self._hit(lv)
+
+    def on_book(self, book: DepthBook) -> None:
+        bid, ask = book.best_bid, book.best_ask
+        for lv in list(self.levels.values()):
+            if self._crossed(lv, bid, ask):
+                self._hit(lv)
+            else:
+                # Cancellations ahead of us move us up
+                lv.ahead = min(lv.ahead, book.qty_at(lv.side, lv.price))
+
+    @staticmethod
+    def _crossed(lv: _Level, bid: Optional[float], ask: Optional[float]) -> bool:
+        if lv.side == BUY:
+            return ask is not None and ask <= lv.price
+        return bid is not None and bid >= lv.price
+
+    def _hit(self, lv: _Level) -> None:
+        self.levels.pop(lv.oid, None)
+        self._hits[lv.oid] = lv
+
+    def pop_hits(self, now: float) -> List[Tuple[str, float, str]]:
+        """(side, price, orderId) of levels likely filled since the last call."""
+        out = [(lv.side, lv.price, lv.oid) for lv in self._hits.values()]
+        for oid in self._hits:
+            self._reported[oid] = now
+        self._hits.clear()
+        return out
+
+
+class BookMirror:
+    """Stream client feeding `DepthBook` and `LevelWatch`; the processor reads it through `track` / `hits`."""
+
+    def __init__(self, settings: Settings, clock: Clock = WALL):
+        self.settings = settings
+        self.clock = clock
+        self.book = DepthBook()
+        self.watch = LevelWatch(settings.BOOK_RECHECK_SEC)
+        self.last_msg = 0.0
+        self.resyncs = 0
+        self._buffer: List[Dict] = []
+        self._lock = threading.Lock()
+
+    # --- Processor side ---
+
+    def live(self, now: Optional[float] = None) -> bool:
+        now = self.clock.time() if now is None else now
+        return self.book.synced and now - self.last_msg <= self.settings.BOOK_STALE_SEC
+
+    def best_bid(self) -> Optional[float]:
+        with self._lock:
+            return self.book.best_bid
+
+    def track(self, buys: Iterable[Tuple[float, str]], tps: Iterable[Tuple[float, str, float]], now: float) -> None:
+        qty = self.settings.QTY_PER_LADDER
+        orders = [(BUY, px, oid, qty) for px, oid in buys] + [(SELL, px, oid, q) for px, oid, q in tps]
+        with self._lock:
+            self.watch.track(orders, self.book, now)
+
+    def hits(self, now: float) -> Tuple[List[Tuple[float, str]], List[str]]:
+        """(BUYs as (price, orderId), TP orderIds) that have likely filled."""
+        with self._lock:
+            hits = self.watch.pop_hits(now)
+        return [(px, oid) for side, px, oid in hits if side == BUY], [oid for side, _, oid in hits if side == SELL]
+
+    # --- Stream side ---
+
+    def handle(self, msg: Dict) -> bool:
+        """One combined-stream message; False -> the book lost sync and needs a snapshot."""
+        data = msg.get("data", msg)
+        kind = data.get("e")
+        with self._lock:
+            self.last_msg = self.clock.time()
+            if kind == "aggTrade":
+                self.watch.on_trade(float(data["p"]), float(data["q"]), bool(data["m"]))
+                return True
+            if kind != "depthUpdate":
+                return True
+            if not self.book.synced:
+                self._buffer.append(data)
+                return False
+            ok = self.book.apply(data)
+            if ok:
+                self.watch.on_book(self.book)
+            else:
+                log.info("[BOOK] depth sequence gap at %s; resyncing", data.get("U"))
+            return ok
+
+    def resync(self) -> None:
+        """Loads a REST snapshot and replays the diffs buffered while it was in flight."""
+        snap = request_with_retry(
+            "GET", f"{self.settings.FUTURES_BASE_URL}/depth",
+            params={"symbol": self.settings.SYMBOL, "limit": 1000}, timeout=5, hedge=True,
+        ).json()
+        with self._lock:
+            self.book.load_snapshot(snap)
+            pending, self._buffer = self._buffer, []
+            for ev in pending:
+                if not self.book.apply(ev):
+                    break
+            if self.book.synced:
+                self.watch.on_book(self.book)
+        self.resyncs += 1
+        log.info("[BOOK] snapshot %s loaded (%d buffered diffs)", snap["lastUpdateId"], len(pending))
+
+    def run(self, stop_evt: threading.Event) -> None:
+        """Thread function: keeps the stream connected and the book in sync until `stop_evt`."""
+        try:
+            import websocket  # websocket-client
+        except ImportError:
+            log.warning("[BOOK] websocket-client is not installed; book mirror disabled")
+            return
+        sym = self.settings.SYMBOL.lower()
+        url = f"{self.settings.FUTURES_WS_BASE}/stream?streams={sym}@depth@100ms/{sym}@aggTrade"
+        while not stop_evt.is_set():
+            ws = None
+            try:
+                ws = websocket.create_connection(url, timeout=self.settings.BOOK_STALE_SEC)
+                with self._lock:
+                    self.book.reset()
+                    self._buffer = []
+                while not stop_evt.is_set():
+                    self.handle(json.loads(ws.recv()))
+                    # Unsynced (new connection or a sequence gap) and diffs are buffering: take a snapshot
+                    if not self.book.synced and self._buffer:
+                        self.resync()
+            except Exception as e:
+                self.book.reset()
+                log.warning("[BOOK] stream error: %s; reconnecting", e)
+                stop_evt.wait(1.0)
+            finally:
+                if ws is not None:
+                    ws.close()
@@ -1,16 +1,24 @@
-import time
-import uuid
-import hmac
 import hashlib
-from typing import Dict, Tuple, List, Optional
+import hmac
+import json
+from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
+import uuid
 
+import requests
+
+from gridbot.broker.orders import OpenOrders, OrderParser
 from gridbot.config.settings import Settings
-from gridbot.core.utils import ts_ms, format_step, request_with_retry, dprint, sanitize_tag
+from gridbot.core.clock import WALL, Clock
+from gridbot.core.utils import format_step, recv_window_ms, request_with_retry, sanitize_tag, ts_ms
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 class Broker:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, clock: Clock = WALL):
         self.settings = settings
+        self.clock = clock
         self.order_nonce = 0
         self.tick_size = 0.01
         self.step_size = 0.1
@@ -28,20 +36,22 @@ class Broker:
             if self.settings.AUTO_FEE:
                 self._fetch_commission_rates()
 
-        print("Broker ready.")
+        # Built after exchangeInfo so the memoized clamps use the real filters
+        self.order_parser = OrderParser(self.clamp_price, self.clamp_qty, self.session_tag)
+        log.info("Broker ready.")
 
     def _get_session_tag(self) -> str:
         tag_env = self.settings.SESSION_TAG_ENV
         if tag_env:
             return sanitize_tag(tag_env)
-        return f"r{int(time.time()) % 100000}"
+        return f"r{int(self.clock.time()) % 100000}"
 
     def _sign_request(self, params: dict) -> str:
         q = urlencode(params, True)
         sig = hmac.new(self.settings.API_SECRET.encode("utf-8"), q.encode("utf-8"), hashlib.sha256).hexdigest()
         return f"{q}&signature={sig}"
 
-    def _fetch_exchange_info(self):
+    def _fetch_exchange_info(self) -> None:
         try:
             sym = request_with_retry(
                 "GET",
@@ -58,17 +68,20 @@ class Broker:
                     self.min_notional = float(f.get("notional", self.min_notional))
             self.price_precision = int(sym.get("pricePrecision", self.price_precision))
             self.qty_precision = int(sym.get("quantityPrecision", self.qty_precision))
-            print(
-                f"[SYMBOL INFO] tick={self.tick_size} step={self.step_size} "
-                f"min_qty={self.min_qty} notional>={self.min_notional} "
-                f"pricePrecision={self.price_precision} qtyPrecision={self.qty_precision}"
+            log.info(
+                "[SYMBOL INFO] tick=%s step=%s min_qty=%s notional>=%s pricePrecision=%s qtyPrecision=%s",
+                self.tick_size, self.step_size, self.min_qty, self.min_notional,
+                self.price_precision, self.qty_precision,
             )
         except Exception as e:
-            print(f"[WARN] exchangeInfo failed: {e}")
+            log.warning("exchangeInfo failed: %s", e)
 
-    def _set_margin_mode(self):
+    def _set_margin_mode(self) -> None:
         try:
-            p = {'timestamp': ts_ms(), 'recvWindow': 50000, 'symbol': self.settings.SYMBOL, 'marginType': self.settings.MARGIN_MODE}
+            p = {
+                'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(),
+                'symbol': self.settings.SYMBOL, 'marginType': self.settings.MARGIN_MODE,
+            }
             signed = self._sign_request(p)
             request_with_retry(
                 "POST",
@@ -77,20 +90,22 @@ class Broker:
                 data=signed.encode("utf-8"),
             )
         except Exception as e:
-            print(f"[WARN] set_margin_mode failed: {e}")
+            log.warning("set_margin_mode failed: %s", e)
 
-    def _fetch_commission_rates(self):
+    def _fetch_commission_rates(self) -> None:
         try:
-            params = {'symbol': self.settings.SYMBOL, 'timestamp': ts_ms(), 'recvWindow': 50000}
+            params = {
+                'symbol': self.settings.SYMBOL, 'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(),
+            }
             signed = self._sign_request(params)
             url = f"{self.settings.FUTURES_BASE_URL}/commissionRate?{signed}"
             r = request_with_retry("GET", url, headers={'X-MBX-APIKEY': self.settings.API_KEY}, timeout=5.0)
             d = r.json()
             self.maker_fee = float(d.get("makerCommissionRate", 0.0))
             self.taker_fee = float(d.get("takerCommissionRate", 0.0))
-            print(f"[FEES] maker={self.maker_fee:.6f} taker={self.taker_fee:.6f}")
+            log.info("[FEES] maker=%.6f taker=%.6f", self.maker_fee, self.taker_fee)
         except Exception as e:
-            print(f"[WARN] fetch_commission_rates failed: {e}")
+            log.warning("fetch_commission_rates failed: %s", e)
 
     def clamp_price(self, p: float) -> float:
         return float(format_step(p, self.tick_size))
@@ -104,6 +119,10 @@ class Broker:
         cid = f"{prefix}-{self.session_tag}-{cents}-{self.order_nonce}"
         return cid[:32]
 
+    def client_id(self, prefix: str, price: float) -> str:
+        """A fresh clientOrderId for an order at `price`; not thread-safe, call it from the processor."""
+        return self._cid(prefix, self.clamp_price(price))
+
     def _futures_order(self, params: dict) -> dict:
         if self.settings.DRY_RUN:
             return {
@@ -113,32 +132,74 @@ class Broker:
                 "side": params.get("side", ""),
             }
 
-        def _do(p):
+        def _do(p: Dict) -> requests.Response:
             p = dict(p)
-            p.setdefault("timestamp", ts_ms())
-            p.setdefault("recvWindow", 50000)
+            p.setdefault("timestamp", ts_ms(self.clock.time()))
+            p.setdefault("recvWindow", recv_window_ms())
             signed = self._sign_request(p)
             return request_with_retry(
                 "POST",
                 f"{self.settings.FUTURES_BASE_URL}/order",
                 headers={'X-MBX-APIKEY': self.settings.API_KEY, 'Content-Type': 'application/x-www-form-urlencoded'},
                 data=signed.encode("utf-8"),
+                retries=1,
             )
 
-        r = _do(params)
+        # Never blindly re-sent: after a timeout or 5xx the order may be live, so it is looked
+        # up by clientOrderId first and only resubmitted (same id) if the exchange has none
+        cid = params.get("newClientOrderId")
+        for attempt in range(3):
+            try:
+                r = _do(params)
+                break
+            except requests.exceptions.RequestException as e:
+                status = e.response.status_code if getattr(e, "response", None) is not None else None
+                if not cid or attempt == 2 or (status is not None and status < 500 and status != 429):
+                    raise
+                if status != 429:
+                    landed = self._order_by_client_id(cid)
+                    if landed is not None:
+                        log.info("[ORDER] %s is live despite %s", cid, e)
+                        return landed
+                log.info("[ORDER] %s not placed (%s); resubmitting", cid, e)
+                self.clock.sleep(0.5 * (attempt + 1))
         try:
             return r.json()
         except Exception:
             return {"orderId": "n/a", "status": "UNKNOWN"}
 
-    def limit_buy(self, price: float, qty: float) -> dict:
+    def _order_by_client_id(self, client_id: str) -> Optional[Dict]:
+        """The order placed under `client_id`, or None if the exchange has none (raises when it cannot tell)."""
+        p = {
+            'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(),
+            'symbol': self.settings.SYMBOL, 'origClientOrderId': client_id,
+        }
+        signed = self._sign_request(p)
+        try:
+            return request_with_retry(
+                "GET",
+                f"{self.settings.FUTURES_BASE_URL}/order?{signed}",
+                headers={'X-MBX-APIKEY': self.settings.API_KEY},
+                retries=2,
+                hedge=True,
+            ).json()
+        except requests.exceptions.HTTPError as e:
+            try:
+                code = e.response.json().get("code")
+            except Exception:
+                code = None
+            if code == -2013:  # Order does not exist
+                return None
+            raise
+
+    def limit_buy(self, price: float, qty: float, client_order_id: Optional[str] = None) -> dict:
         qty = self.clamp_qty(qty)
         price = self.clamp_price(price)
         if not self.settings.DRY_RUN and price * qty < self.min_notional:
             # Adjust quantity up to meet min notional
             qty = self.clamp_qty(self.min_notional / price + self.step_size)
 
-        cid = self._cid("B", price)
+        cid = client_order_id or self._cid("B", price)
         params = {
             'symbol': self.settings.SYMBOL,
             'side': 'BUY',
@@ -149,7 +210,7 @@ class Broker:
             'newClientOrderId': cid,
         }
         od = self._futures_order(params)
-        dprint(f"[DEBUG] BUY attempt @ {price}: {od}")
+        log.debug("BUY attempt @ %s: %s", price, od)
         return od
 
     def limit_tp_reduce(self, entry: float, qty: float, client_order_id: Optional[str] = None) -> dict:
@@ -167,14 +228,17 @@ class Broker:
             'newClientOrderId': cid,
         }
         od = self._futures_order(params)
-        dprint(f"[DEBUG] TP attempt @ {exit_price} for entry {entry} qty {qty}: {od}")
+        log.debug("TP attempt @ %s for entry %s qty %s: %s", exit_price, entry, qty, od)
         return od
 
     def cancel_order(self, order_id: str) -> None:
         if self.settings.DRY_RUN:
             return
         try:
-            p = {'timestamp': ts_ms(), 'recvWindow': 50000, 'symbol': self.settings.SYMBOL, 'orderId': order_id}
+            p = {
+                'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(),
+                'symbol': self.settings.SYMBOL, 'orderId': order_id,
+            }
             signed = self._sign_request(p)
             request_with_retry(
                 "DELETE",
@@ -182,36 +246,234 @@ class Broker:
                 headers={'X-MBX-APIKEY': self.settings.API_KEY},
             )
         except Exception as e:
-            print(f"[WARN] cancel_order({order_id}) failed: {e}")
+            log.warning("cancel_order(%s) failed: %s", order_id, e)
+
+    def _signed_call(self, method: str, path: str, params: dict) -> Any:
+        p = dict(params)
+        p.setdefault("symbol", self.settings.SYMBOL)
+        p.setdefault("timestamp", ts_ms(self.clock.time()))
+        p.setdefault("recvWindow", recv_window_ms())
+        signed = self._sign_request(p)
+        if method in ("POST", "PUT"):
+            return request_with_retry(
+                method,
+                f"{self.settings.FUTURES_BASE_URL}{path}",
+                headers={'X-MBX-APIKEY': self.settings.API_KEY, 'Content-Type': 'application/x-www-form-urlencoded'},
+                data=signed.encode("utf-8"),
+            ).json()
+        return request_with_retry(
+            method,
+            f"{self.settings.FUTURES_BASE_URL}{path}?{signed}",
+            headers={'X-MBX-APIKEY': self.settings.API_KEY},
+        ).json()
 
-    def get_open_orders(self) -> List[Dict]:
+    def modify_buys(self, amends: List[Tuple[str, float, float]]) -> List[dict]:
+        """
+        Moves resting BUYs to new prices via batch modify (PUT /batchOrders, 5 per request).
+        `amends` is a list of (orderId, new_price, qty). Returns one result per amend, in order;
+        failed items carry a "code" key as returned by the exchange.
+        """
         if self.settings.DRY_RUN:
-            return []
+            return [
+                {"orderId": oid, "status": "NEW", "price": format_step(px, self.tick_size), "side": "BUY"}
+                for oid, px, _ in amends
+            ]
+
+        out: List[dict] = []
+        for i in range(0, len(amends), 5):
+            chunk = amends[i:i + 5]
+            batch = [
+                {
+                    'symbol': self.settings.SYMBOL,
+                    'orderId': int(oid) if str(oid).isdigit() else oid,
+                    'side': 'BUY',
+                    'quantity': format_step(self.clamp_qty(qty), self.step_size),
+                    'price': format_step(self.clamp_price(px), self.tick_size),
+                }
+                for oid, px, qty in chunk
+            ]
+            try:
+                body = {'batchOrders': json.dumps(batch, separators=(",", ":"))}
+                res = self._signed_call("PUT", "/batchOrders", body)
+                out.extend(res if isinstance(res, list) else [{"code": -1, "msg": str(res)}] * len(chunk))
+            except Exception as e:
+                log.warning("modify_buys batch failed: %s", e)
+                out.extend({"code": -1, "msg": str(e)} for _ in chunk)
+        return out
+
+    def cancel_orders(self, order_ids: List[str]) -> List[dict]:
+        """Cancels orders via batch cancel (DELETE /batchOrders, 10 per request)."""
+        if self.settings.DRY_RUN or not order_ids:
+            return [{"orderId": oid, "status": "CANCELED"} for oid in order_ids]
+
+        out: List[dict] = []
+        for i in range(0, len(order_ids), 10):
+            chunk = order_ids[i:i + 10]
+            ids = [int(o) if str(o).isdigit() else o for o in chunk]
+            try:
+                body = {'orderIdList': json.dumps(ids, separators=(",", ":"))}
+                res = self._signed_call("DELETE", "/batchOrders", body)
+                out.extend(res if isinstance(res, list) else [{"code": -1, "msg": str(res)}] * len(chunk))
+            except Exception as e:
+                log.warning("cancel_orders batch failed: %s", e)
+                out.extend({"code": -1, "msg": str(e)} for _ in chunk)
+        return out
+
+    def get_open_orders(self) -> OpenOrders:
+        """Open orders for the symbol, parsed once into typed records (empty on failure)."""
+        if self.settings.DRY_RUN:
+            return OpenOrders()
         try:
-            p = {'timestamp': ts_ms(), 'recvWindow': 50000, 'symbol': self.settings.SYMBOL}
+            p = {'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(), 'symbol': self.settings.SYMBOL}
             signed = self._sign_request(p)
-            return request_with_retry(
+            r = request_with_retry(
                 "GET",
                 f"{self.settings.FUTURES_BASE_URL}/openOrders?{signed}",
                 headers={'X-MBX-APIKEY': self.settings.API_KEY},
-            ).json()
+                hedge=True,
+            )
+            return self.order_parser.parse(r.content)
         except Exception as e:
-            print(f"[WARN] get_open_orders failed: {e}")
-            return []
+            log.warning("get_open_orders failed: %s", e)
+            return OpenOrders()
 
     def get_order(self, order_id: str) -> Optional[Dict]:
         if self.settings.DRY_RUN:
             return {"status": "NEW", "executedQty": "0", "origQty": str(self.settings.QTY_PER_LADDER)}
         try:
-            p = {'timestamp': ts_ms(), 'recvWindow': 50000, 'symbol': self.settings.SYMBOL, 'orderId': order_id}
+            p = {
+                'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(),
+                'symbol': self.settings.SYMBOL, 'orderId': order_id,
+            }
             signed = self._sign_request(p)
             return request_with_retry(
                 "GET",
                 f"{self.settings.FUTURES_BASE_URL}/order?{signed}",
                 headers={'X-MBX-APIKEY': self.settings.API_KEY},
+                hedge=True,
             ).json()
         except Exception as e:
             if "-2011" in str(e):
                 return {"status": "NOT_FOUND", "executedQty": "0", "origQty": str(self.settings.QTY_PER_LADDER)}
-            dprint(f"[WARN] get_order failed for {order_id}: {e}")
-            return None
\ No newline at end of file
+            log.debug("get_order failed for %s: %s", order_id, e)
+            return None
+
+    def get_order_trades(self, order_id: str) -> List[Dict]:
+        """Returns the account trades (executions) of one order: price, qty, commission, maker flag."""
+        if self.settings.DRY_RUN:
+            return []
+        try:
+            p = {
+                'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(),
+                'symbol': self.settings.SYMBOL, 'orderId': order_id,
+            }
+            signed = self._sign_request(p)
+            return request_with_retry(
+                "GET",
+                f"{self.settings.FUTURES_BASE_URL}/userTrades?{signed}",
+                headers={'X-MBX-APIKEY': self.settings.API_KEY},
+            ).json()
+        except Exception as e:
+            log.debug("get_order_trades failed for %s: %s", order_id, e)
+            return []
+
+    def lookup_orders(self, order_ids: List[str], limit: int = 1000) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+        """
+        Status and executions of many orders in one request per cluster of nearby orders:
+        GET /allOrders from the lowest wanted id, then, if a full page ends before the next
+        wanted id, straight from that id, so the orders between an old resting TP and recent
+        ones are skipped rather than paged through. Executions of the orders that traded come
+        from GET /userTrades the same way, starting at each cluster's creation time.
+        Returns (order by id, trades by order id); ids missing from the result are unknown.
+        """
+        wanted = {str(o) for o in order_ids if str(o).isdigit()}
+        if self.settings.DRY_RUN or not wanted:
+            return {}, {}
+
+        orders: Dict[str, Dict] = {}
+        pending = sorted(int(o) for o in wanted)
+        try:
+            while pending:
+                page = self._signed_call("GET", "/allOrders", {'orderId': pending[0], 'limit': limit})
+                for od in page:
+                    oid = str(od.get("orderId"))
+                    if oid in wanted:
+                        orders[oid] = od
+                if len(page) < limit:
+                    break  # every order from pending[0] on was listed
+                last = int(page[-1]["orderId"])
+                pending = [o for o in pending if o > last and str(o) not in orders]
+        except Exception as e:
+            log.warning("lookup_orders: allOrders failed: %s", e)
+            return orders, {}
+
+        traded = [od for od in orders.values() if float(od.get("executedQty") or 0.0) > 0]
+        try:
+            trades = self._trades_of(traded, limit)
+        except Exception as e:
+            log.warning("lookup_orders: userTrades failed: %s", e)
+            trades = {}
+        return orders, trades
+
+    def _trades_of(self, traded: List[Dict], limit: int) -> Dict[str, List[Dict]]:
+        """Executions of `traded` orders by order id; an order is covered once a page reaches its updateTime."""
+        ids = {str(od.get("orderId")) for od in traded}
+        pending = sorted(traded, key=lambda od: int(od.get("time") or od.get("updateTime") or 0))
+        trades: Dict[str, List[Dict]] = {}
+        params: Dict[str, int] = {}
+        while pending:
+            if "fromId" not in params:
+                params = {'startTime': int(pending[0].get("time") or pending[0].get("updateTime") or 0) - 1000}
+            page = self._signed_call("GET", "/userTrades", {**params, 'limit': limit})
+            for t in page:
+                oid = str(t.get("orderId"))
+                if oid in ids:
+                    trades.setdefault(oid, []).append(t)
+            if len(page) < limit:
+                break
+            last_t = int(page[-1]["time"])
+            pending = [od for od in pending if int(od.get("updateTime") or od.get("time") or 0) >= last_t]
+            nxt = int(pending[0].get("time") or pending[0].get("updateTime") or 0) - 1000 if pending else 0
+            # Continue the page run inside a cluster; jump to the next cluster's start across a gap
+            params = {'fromId': int(page[-1]["id"]) + 1} if nxt <= last_t else {}
+        return trades
+
+    def account_orders_since(self, start_ms: int, limit: int = 1000) -> List[Dict]:
+        """All orders for the symbol created since `start_ms` (GET /allOrders, < 7 days back), oldest first.
+
+        Raises on failure.
+        """
+        out: List[Dict] = []
+        params = {'startTime': start_ms, 'limit': limit}
+        while True:
+            page = self._signed_call("GET", "/allOrders", params)
+            out.extend(page)
+            if len(page) < limit:
+                return out
+            params = {'orderId': int(page[-1]["orderId"]) + 1, 'limit': limit}
+
+    def account_trades_since(self, start_ms: int, limit: int = 1000) -> List[Dict]:
+        """Account trades for the symbol since `start_ms` (GET /userTrades), oldest first. Raises on failure."""
+        out: List[Dict] = []
+        params = {'startTime': start_ms, 'limit': limit}
+        while True:
+            page = self._signed_call("GET", "/userTrades", params)
+            out.extend(page)
+            if len(page) < limit:
+                return out
+            params = {'fromId': int(page[-1]["id"]) + 1, 'limit': limit}
+
+    def get_position_risk(self) -> Dict:
+        """The symbol's position (positionAmt, entryPrice, ...) from GET /fapi/v2/positionRisk. Raises on failure."""
+        p = {'timestamp': ts_ms(self.clock.time()), 'recvWindow': recv_window_ms(), 'symbol': self.settings.SYMBOL}
+        signed = self._sign_request(p)
+        rows = request_with_retry(
+            "GET",
+            f"{self.settings.FUTURES_ACCOUNT_URL}/positionRisk?{signed}",
+            headers={'X-MBX-APIKEY': self.settings.API_KEY},
+        ).json()
+        rows = [r for r in rows if r.get("symbol") == self.settings.SYMBOL]
+        return {
+            "positionAmt": sum(float(r.get("positionAmt") or 0.0) for r in rows),
+            "entryPrice": float(rows[0].get("entryPrice") or 0.0) if rows else 0.0,
+        }
@@ -0,0 +1,310 @@
+"""
+Record/replay cassette for Broker I/O.
+
+A session file is gzip-compressed JSON lines. The first line is a header (broker
+filters, non-secret settings, the starting state and mid); every following line is
+one event:
+
+    ["p", t, bid, ask]                 price message handed to the processor
+    ["c", t, method, args, result, dt] broker call and what it returned
+    ["x", t, method, args, error, dt]  broker call that raised
+
+`t` is the wall time of the event (a call's start) and `dt` how long the call took;
+replay advances the session clock by it, so recorded broker latency is reproduced
+(version 1 files have no `dt` and replay calls as instantaneous). Open-order
+snapshots are stored as compact rows and a snapshot identical to the previous one
+as "=", so a quiet market costs a few bytes per poll.
+
+`RecordingBroker` / `RecordingFeed` wrap the live broker and price source.
+`ReplayBroker` / `ReplayFeed` serve a session back in recorded order through a
+shared `ReplaySession` cursor, which also carries the session clock.
+"""
+from dataclasses import asdict
+import gzip
+import inspect
+import json
+import queue
+import threading
+import time
+from typing import IO, Any, Dict, List, Optional, Set, Tuple, TypeVar, cast
+
+from gridbot.broker.binance_connector import Broker
+from gridbot.broker.orders import OpenOrders, OrderParser
+from gridbot.config.settings import Settings
+from gridbot.price import PriceMessage, PriceSource
+
+VERSION = 2
+BROKER_FIELDS = (
+    "tick_size", "step_size", "min_qty", "min_notional", "price_precision", "qty_precision",
+    "session_tag", "maker_fee", "taker_fee",
+)
+SECRET_SETTINGS = ("API_KEY", "API_SECRET", "TELEGRAM_BOT_TOKEN", "TELEGRAM_CHAT_ID")
+# Broker methods that talk to the exchange; everything else is pure and delegated as-is
+RECORDED = (
+    "limit_buy", "limit_tp_reduce", "cancel_order", "modify_buys", "cancel_orders",
+    "get_open_orders", "get_order", "get_order_trades", "lookup_orders",
+)
+_ORDER_KEYS = ("orderId", "clientOrderId", "side", "status", "price", "origQty", "executedQty", "reduceOnly")
+_T = TypeVar("_T")
+
+
+def _orders_to_rows(orders: OpenOrders) -> List[list]:
+    return [[o.order_id, o.client_id, o.side, o.status, o.price, o.qty, o.executed_qty, o.reduce_only] for o in orders]
+
+
+def session_header(settings: Settings, broker: Broker, state: Dict, mid: float) -> Dict:
+    s = {k: v for k, v in asdict(settings).items() if k not in SECRET_SETTINGS}
+    return {
+        "v": VERSION,
+        "t": time.time(),
+        "mid": mid,
+        "settings": s,
+        "broker": {k: getattr(broker, k) for k in BROKER_FIELDS},
+        "state": state,
+    }
+
+
+class CassetteWriter:
+    def __init__(self, path: str, header: Dict):
+        self.path = path
+        self._f: Optional[IO[str]] = gzip.open(path, "wt", encoding="utf-8", compresslevel=6)
+        self._lock = threading.Lock()
+        self._last_orders: Optional[List[list]] = None
+        self._write(header)
+
+    def _write(self, row: Any) -> None:
+        line = json.dumps(row, separators=(",", ":"), default=str)
+        with self._lock:
+            if self._f is not None:
+                self._f.write(line + "\n")
+
+    def price(self, bid: float, ask: float) -> None:
+        self._write(["p", time.time(), bid, ask])
+
+    def call(self, method: str, args: list, result: Any, t: float, dt: float = 0.0) -> None:
+        if method == "get_open_orders":
+            rows = _orders_to_rows(result)
+            result = "=" if rows == self._last_orders else rows
+            self._last_orders = rows
+        self._write(["c", t, method, args, result, round(dt, 6)])
+
+    def error(self, method: str, args: list, err: BaseException, t: float, dt: float = 0.0) -> None:
+        self._write(["x", t, method, args, str(err), round(dt, 6)])
+
+    def close(self) -> None:
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+
+class RecordingBroker:
+    """Transparent proxy over a live `Broker` that logs every exchange call to a cassette."""
+
+    def __init__(self, broker: Broker, writer: CassetteWriter):
+        self._broker = broker
+        self._writer = writer
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._broker, name)
+        if name not in RECORDED:
+            return attr
+        sig = inspect.signature(attr)
+
+        def _recorded(*args: Any, **kwargs: Any) -> Any:
+            # Keyword and positional arguments are recorded alike, in signature order
+            call_args = list(sig.bind(*args, **kwargs).arguments.values())
+            t, t0 = time.time(), time.perf_counter()
+            try:
+                res = attr(*args, **kwargs)
+            except Exception as e:
+                self._writer.error(name, call_args, e, t, time.perf_counter() - t0)
+                raise
+            self._writer.call(name, call_args, res, t, time.perf_counter() - t0)
+            return res
+
+        return _recorded
+
+
+class RecordingFeed:
+    """Wraps the processor's price source (`get(timeout)`) and records every message it hands out."""
+
+    def __init__(self, source: PriceSource, writer: CassetteWriter):
+        self._source = source
+        self._writer = writer
+
+    def get(self, timeout: float = 0.6) -> PriceMessage:
+        bid, ask, mid = self._source.get(timeout=timeout)
+        self._writer.price(bid, ask)
+        return bid, ask, mid
+
+
+# ===== Replay =====
+
+def load_session(path: str) -> Tuple[Dict, List[list]]:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        header = json.loads(f.readline())
+        if header.get("v") not in (1, VERSION):
+            raise ValueError(f"{path}: unsupported cassette version {header.get('v')}")
+        events = [json.loads(line) for line in f if line.strip()]
+    return header, events
+
+
+class ReplaySession:
+    """
+    Cursor over the recorded events plus the session clock (`now`, the time the last
+    consumed event ended; the session is itself the replayed bot's `Clock`). Calls
+    the replayed bot makes that were not recorded, or recorded calls it skips, are
+    counted rather than fatal, so a code change shows up as a divergence count
+    instead of a crash.
+    """
+
+    def __init__(self, header: Dict, events: List[list]):
+        self.header = header
+        self.events = events
+        self.pos = 0
+        self.now = float(header.get("t", 0.0))
+        self.prices = 0
+        self.calls = 0
+        self.missed = 0       # recorded calls the replay never made
+        self.unexpected = 0   # replay calls with no recorded counterpart
+        self.arg_mismatch = 0
+        self._used: Set[int] = set()  # calls consumed ahead of the cursor
+
+    @property
+    def done(self) -> bool:
+        return self.pos >= len(self.events)
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, sec: float) -> None:
+        self.now += max(sec, 0.0)
+
+    def next_price(self) -> Optional[Tuple[float, float]]:
+        while self.pos < len(self.events):
+            ev = self.events[self.pos]
+            self.pos += 1
+            if self.pos - 1 in self._used:
+                self._used.discard(self.pos - 1)
+                continue
+            if ev[0] == "p":
+                self.now = max(self.now, ev[1])  # a call may have returned after this tick arrived
+                self.prices += 1
+                return ev[2], ev[3]
+            self.missed += 1
+        return None
+
+    def next_call(self, method: str, args: list) -> Optional[list]:
+        """The recorded event for this call, searched up to the next price message.
+
+        Pipelined placements are recorded in completion order, so a call with the same
+        arguments further on is preferred over the first call of the same method.
+        """
+        args = json.loads(json.dumps(args, default=str))
+        match = None
+        i = self.pos
+        while i < len(self.events) and self.events[i][0] != "p":
+            ev = self.events[i]
+            if i not in self._used and ev[2] == method:
+                if ev[3] == args:
+                    match = i
+                    break
+                if match is None:
+                    match = i
+            i += 1
+        if match is None:
+            self.unexpected += 1
+            return None
+        ev = self.events[match]
+        if ev[3] != args:
+            self.arg_mismatch += 1
+        # Events skipped over stay available until the next price message
+        self._used.add(match)
+        while self.pos in self._used:
+            self._used.discard(self.pos)
+            self.pos += 1
+        # The call returns when it did in the recording
+        self.now = max(self.now, ev[1] + (ev[5] if len(ev) > 5 else 0.0))
+        self.calls += 1
+        return ev
+
+    def summary(self) -> Dict[str, int]:
+        return {
+            "events": len(self.events), "prices": self.prices, "calls": self.calls,
+            "missed": self.missed + (len(self.events) - self.pos - len(self._used)), "unexpected": self.unexpected,
+            "arg_mismatch": self.arg_mismatch,
+        }
+
+
+class ReplayBroker(Broker):
+    """`Broker` whose exchange calls are answered from a recorded session; nothing touches the network."""
+
+    def __init__(self, settings: Settings, session: ReplaySession):
+        self.settings = settings
+        self.session = session
+        self.clock = session
+        self.order_nonce = 0
+        for k, v in session.header["broker"].items():
+            setattr(self, k, v)
+        self.order_parser = OrderParser(self.clamp_price, self.clamp_qty, self.session_tag)
+        self._last_orders: List[list] = []
+
+    def _answer(self, method: str, args: list, default: _T) -> _T:
+        ev = self.session.next_call(method, args)
+        if ev is None:
+            return default
+        if ev[0] == "x":
+            raise RuntimeError(ev[4])
+        return cast(_T, ev[4])
+
+    def limit_buy(self, price: float, qty: float, client_order_id: Optional[str] = None) -> dict:
+        args = [price, qty] if client_order_id is None else [price, qty, client_order_id]
+        return self._answer("limit_buy", args, {"orderId": "n/a", "status": "UNKNOWN"})
+
+    def limit_tp_reduce(self, entry: float, qty: float, client_order_id: Optional[str] = None) -> dict:
+        args = [entry, qty] if client_order_id is None else [entry, qty, client_order_id]
+        return self._answer("limit_tp_reduce", args, {"orderId": "n/a", "status": "UNKNOWN"})
+
+    def cancel_order(self, order_id: str) -> None:
+        self._answer("cancel_order", [order_id], None)
+
+    def modify_buys(self, amends: List[Tuple[str, float, float]]) -> List[dict]:
+        return self._answer("modify_buys", [amends], [{"code": -1, "msg": "not recorded"} for _ in amends])
+
+    def cancel_orders(self, order_ids: List[str]) -> List[dict]:
+        return self._answer("cancel_orders", [order_ids], [{"code": -1, "msg": "not recorded"} for _ in order_ids])
+
+    def get_open_orders(self) -> OpenOrders:
+        rows: Any = self._answer("get_open_orders", [], "=")
+        if rows != "=":
+            self._last_orders = rows
+        return self.order_parser.parse([dict(zip(_ORDER_KEYS, r)) for r in self._last_orders])
+
+    def get_order(self, order_id: str) -> Optional[Dict]:
+        return self._answer("get_order", [order_id], None)
+
+    def get_order_trades(self, order_id: str) -> List[Dict]:
+        return self._answer("get_order_trades", [order_id], [])
+
+    def lookup_orders(self, order_ids: List[str], limit: int = 1000) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+        args = [order_ids] if limit == 1000 else [order_ids, limit]
+        empty: Tuple[Dict[str, Dict], Dict[str, List[Dict]]] = ({}, {})
+        orders, trades = self._answer("lookup_orders", args, empty)
+        return orders, trades
+
+
+class ReplayFeed:
+    """Price source for `processor_loop`; sets `stop_evt` once the session is exhausted."""
+
+    def __init__(self, session: ReplaySession, stop_evt: threading.Event):
+        self.session = session
+        self.stop_evt = stop_evt
+
+    def get(self, timeout: float = 0.6) -> PriceMessage:
+        px = self.session.next_price()
+        if px is None:
+            self.stop_evt.set()
+            raise queue.Empty
+        bid, ask = px
+        return bid, ask, (bid + ask) / 2.0
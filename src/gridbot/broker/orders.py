@@ -0,0 +1,136 @@
+"""
+Typed open-order records.
+
+A `GET /openOrders` response is decoded and parsed exactly once into slotted `Order`
+records with the price/qty already clamped to the symbol filters and the side,
+reduce-only, working and ownership flags precomputed. The resulting `OpenOrders`
+snapshot also carries the views every consumer needs (our working BUYs, live
+reduce-only TPs, their ids and prices), so the processor never touches raw dicts.
+"""
+import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Union
+
+_loads: Callable[[Union[bytes, str]], Any]
+try:  # optional: a few times faster than the stdlib decoder on large order lists
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # pragma: no cover - depends on the environment
+    _loads = json.loads
+
+WORKING_STATUSES = frozenset(("NEW", "PARTIALLY_FILLED"))
+_TRUE = frozenset(("true", "1"))
+
+
+def _flag(v: Any) -> bool:
+    if v is True or v is False:
+        return v
+    return str(v or "").lower() in _TRUE
+
+
+class Order:
+    __slots__ = (
+        "order_id", "client_id", "side", "status", "price", "qty", "executed_qty",
+        "reduce_only", "is_buy", "working", "ours",
+    )
+
+    def __init__(self, order_id: str, client_id: str, side: str, status: str, price: float, qty: float,
+                 executed_qty: float, reduce_only: bool, ours: bool):
+        self.order_id = order_id
+        self.client_id = client_id
+        self.side = side
+        self.status = status
+        self.price = price
+        self.qty = qty
+        self.executed_qty = executed_qty
+        self.reduce_only = reduce_only
+        self.is_buy = side == "BUY"
+        self.working = status in WORKING_STATUSES
+        self.ours = ours
+
+    @property
+    def is_grid_buy(self) -> bool:
+        return self.working and self.is_buy and not self.reduce_only
+
+    @property
+    def is_tp(self) -> bool:
+        return self.working and not self.is_buy and self.reduce_only
+
+    def __repr__(self) -> str:
+        ro = " RO" if self.reduce_only else ""
+        return f"Order({self.order_id} {self.side} {self.status} {self.qty}@{self.price}{ro})"
+
+
+class OpenOrders:
+    """One parsed open-orders snapshot plus the derived views shared by all consumers."""
+
+    __slots__ = ("orders", "buys", "tps", "buy_ids", "buy_prices")
+
+    def __init__(self, orders: Optional[List[Order]] = None):
+        self.orders: List[Order] = orders or []
+        self.buys: List[Order] = [o for o in self.orders if o.is_grid_buy]
+        self.tps: List[Order] = [o for o in self.orders if o.is_tp]
+        self.buy_ids: Set[str] = {o.order_id for o in self.buys}
+        self.buy_prices: Set[float] = {o.price for o in self.buys}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __iter__(self) -> Iterator[Order]:
+        return iter(self.orders)
+
+    def __bool__(self) -> bool:
+        return bool(self.orders)
+
+
+class OrderParser:
+    """
+    Builds `OpenOrders` from a raw response body. Clamping goes through Decimal, so
+    clamped values are memoized per raw string: a grid only ever quotes a handful of
+    distinct prices and quantities.
+    """
+
+    def __init__(
+        self, clamp_price: Callable[[float], float], clamp_qty: Callable[[float], float], session_tag: str,
+        cache_size: int = 4096,
+    ):
+        self.clamp_price = clamp_price
+        self.clamp_qty = clamp_qty
+        self.prefixes = (f"B-{session_tag}-", f"T-{session_tag}-")
+        self.cache_size = cache_size
+        self._px: Dict[str, float] = {}
+        self._qty: Dict[str, float] = {}
+
+    def _clamped(self, cache: Dict[str, float], raw: Any, clamp: Callable[[float], float]) -> float:
+        key = str(raw)
+        v = cache.get(key)
+        if v is None:
+            if len(cache) >= self.cache_size:
+                cache.clear()
+            v = cache[key] = clamp(float(raw))
+        return v
+
+    def parse_one(self, o: Dict) -> Order:
+        cid = str(o.get("clientOrderId") or "")
+        return Order(
+            order_id=str(o.get("orderId", "")),
+            client_id=cid,
+            side=str(o.get("side", "")),
+            status=str(o.get("status", "")),
+            price=self._clamped(self._px, o.get("price") or 0, self.clamp_price),
+            qty=self._clamped(self._qty, o.get("origQty") or 0, self.clamp_qty),
+            executed_qty=float(o.get("executedQty") or 0.0),
+            reduce_only=_flag(o.get("reduceOnly")),
+            ours=cid.startswith(self.prefixes),
+        )
+
+    def parse(self, payload: Union[bytes, str, List[Dict]]) -> OpenOrders:
+        raw = _loads(payload) if isinstance(payload, (bytes, str)) else payload
+        if not isinstance(raw, list):
+            raise ValueError(f"unexpected openOrders payload: {str(raw)[:200]}")
+        orders: List[Order] = []
+        for o in raw:
+            try:
+                orders.append(self.parse_one(o))
+            except (TypeError, ValueError, AttributeError):
+                continue
+        return OpenOrders(orders)
@@ -1,6 +1,7 @@
-import os
 from dataclasses import dataclass, field
+import os
 from typing import ClassVar
+
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -42,30 +43,96 @@ class Settings:
 
     # Fees & Budget
     TAKER_FEE: float = field(default_factory=lambda: _parse_float("TAKER_FEE", 0.0005))
+    MAKER_FEE: float = field(default_factory=lambda: _parse_float("MAKER_FEE", 0.0002))
     MAX_DAILY_USDT: float = field(default_factory=lambda: _parse_float("MAX_DAILY_USDT", 10000.0))
     AUTO_FEE: bool = field(default_factory=lambda: _parse_bool("AUTO_FEE", False))
 
     # State & Logging
     CSV_FILE: str = field(default_factory=lambda: os.getenv("CSV_FILE", "trades.csv"))
     STATE_FILE: str = field(default_factory=lambda: os.getenv("STATE_FILE", "bot_state.json"))
+    # group-commit window of the background writer; 0 = write on the processor thread
+    STATE_SAVE_WINDOW_MS: float = field(default_factory=lambda: _parse_float("STATE_SAVE_WINDOW_MS", 50.0))
     SESSION_TAG_ENV: str = field(default_factory=lambda: os.getenv("SESSION_TAG", "").strip())
-    DEBUG_VERBOSE: bool = field(default_factory=lambda: _parse_bool("DEBUG_VERBOSE", True))
+    DEBUG_VERBOSE: bool = field(default_factory=lambda: _parse_bool("DEBUG_VERBOSE", True)) # True -> log level DEBUG
+    LOG_LEVEL: str = field(default_factory=lambda: os.getenv("LOG_LEVEL", "INFO").strip().upper())
+    LOG_FILE: str = field(default_factory=lambda: os.getenv("LOG_FILE", "").strip()) # empty -> console only
+    LOG_RATE_PERIOD_SEC: float = field(default_factory=lambda: _parse_float("LOG_RATE_PERIOD_SEC", 10.0))
+    # per message per period; 0 = unlimited
+    LOG_RATE_BURST: int = field(default_factory=lambda: _parse_int("LOG_RATE_BURST", 5))
+    # broker I/O cassette (gridbot.replay)
+    SESSION_RECORD_PATH: str = field(default_factory=lambda: os.getenv("SESSION_RECORD_PATH", "").strip())
     INTERVAL_STATUS_SEC: float = field(default_factory=lambda: _parse_float("INTERVAL_STATUS_SEC", 1.5))
 
     # Cooldowns & Refill
     DUPLICATE_COOLDOWN_SEC: float = field(default_factory=lambda: _parse_float("DUPLICATE_COOLDOWN_SEC", 90.0))
     INSTANT_TP_REFILL: bool = field(default_factory=lambda: _parse_bool("INSTANT_TP_REFILL", False))
+    # 0 = one refill per tick
+    REFILL_COALESCE_SEC: float = field(default_factory=lambda: _parse_float("REFILL_COALESCE_SEC", 0.0))
     SUPPRESS_SEC_AFTER_CANCEL: float = field(default_factory=lambda: _parse_float("SUPPRESS_SEC_AFTER_CANCEL", 8.0))
     SUPPRESS_SEC_ON_UNKNOWN: float = field(default_factory=lambda: _parse_float("SUPPRESS_SEC_ON_UNKNOWN", 3.0))
     PENDING_LOCK_MAX_SEC: float = field(default_factory=lambda: _parse_float("PENDING_LOCK_MAX_SEC", 3.0))
 
+    # Cold start: rebuild state from the exchange when the state file is missing or corrupt
+    RECOVER_STATE: bool = field(default_factory=lambda: _parse_bool("RECOVER_STATE", True))
+    RECOVER_LOOKBACK_HOURS: float = field(
+        default_factory=lambda: min(167.0, _parse_float("RECOVER_LOOKBACK_HOURS", 72.0))
+    )
+
     # Trailing
     TRAIL_UP: bool = field(default_factory=lambda: _parse_bool("TRAIL_UP", True))
     TRAIL_TRIGGER_STEPS: int = field(default_factory=lambda: max(1, _parse_int("TRAIL_TRIGGER_STEPS", 1)))
     TRAIL_MAX_CANCEL_PER_REANCHOR: int = field(default_factory=lambda: _parse_int("TRAIL_MAX_CANCEL_PER_REANCHOR", 100))
 
-    # Price Refresh
+    # Server Time
+    TIME_SYNC_INTERVAL_SEC: float = field(default_factory=lambda: _parse_float("TIME_SYNC_INTERVAL_SEC", 30.0))
+    RECV_WINDOW_MS: int = field(default_factory=lambda: _parse_int("RECV_WINDOW_MS", 5000))
+    RECV_WINDOW_MIN_MS: int = field(default_factory=lambda: _parse_int("RECV_WINDOW_MIN_MS", 1000))
+
+    # Request hedging: a late read (bookTicker, openOrders, order, time) is duplicated to an alternate host
+    HEDGE_REQUESTS: bool = field(default_factory=lambda: _parse_bool("HEDGE_REQUESTS", False))
+    # comma-separated, e.g. https://fapi1.binance.com; empty -> primary host
+    HEDGE_HOSTS: str = field(default_factory=lambda: os.getenv("HEDGE_HOSTS", "").strip())
+    # hedge once slower than this share of recent answers
+    HEDGE_PERCENTILE: float = field(default_factory=lambda: _parse_float("HEDGE_PERCENTILE", 0.9))
+    HEDGE_MIN_MS: float = field(default_factory=lambda: _parse_float("HEDGE_MIN_MS", 100.0))
+    HEDGE_MAX_MS: float = field(default_factory=lambda: _parse_float("HEDGE_MAX_MS", 1500.0))
+
+    # Price Refresh & Polling
     PRICE_REFRESH_SEC: float = field(default_factory=lambda: _parse_float("PRICE_REFRESH_SEC", 0.5))
+    ADAPTIVE_POLL: bool = field(default_factory=lambda: _parse_bool("ADAPTIVE_POLL", True))
+    POLL_MAX_SEC: float = field(default_factory=lambda: _parse_float("POLL_MAX_SEC", 5.0))
+    # fraction of ETA-to-level
+    POLL_LOOKAHEAD: float = field(default_factory=lambda: _parse_float("POLL_LOOKAHEAD", 0.25))
+    # shared-memory feed (gridbot.feed)
+    PRICE_FEED_PATH: str = field(default_factory=lambda: os.getenv("PRICE_FEED_PATH", "").strip())
+    # empty -> no tick recording
+    TICK_RECORD_DIR: str = field(default_factory=lambda: os.getenv("TICK_RECORD_DIR", "").strip())
+    FEED_STALE_SEC: float = field(default_factory=lambda: _parse_float("FEED_STALE_SEC", 5.0))
+    RATE_LIMIT_WEIGHT_1M: int = field(default_factory=lambda: _parse_int("RATE_LIMIT_WEIGHT_1M", 2400))
+    # BUY placements in flight at once; 1 = one at a time
+    ORDER_PIPELINE_DEPTH: int = field(default_factory=lambda: max(1, _parse_int("ORDER_PIPELINE_DEPTH", 4)))
+    # placements per 10 s; the exchange allows 300
+    ORDER_RATE_10S: int = field(default_factory=lambda: _parse_int("ORDER_RATE_10S", 250))
+
+    # Order-book mirror (gridbot.book): predicts fills at our levels from the depth and trade streams
+    BOOK_MIRROR: bool = field(default_factory=lambda: _parse_bool("BOOK_MIRROR", False))
+    # backstop open-orders sweep while the mirror is live
+    BOOK_POLL_SEC: float = field(default_factory=lambda: _parse_float("BOOK_POLL_SEC", 10.0))
+    BOOK_STALE_SEC: float = field(default_factory=lambda: _parse_float("BOOK_STALE_SEC", 3.0))
+    # before a predicted level that was still open is reported again
+    BOOK_RECHECK_SEC: float = field(default_factory=lambda: _parse_float("BOOK_RECHECK_SEC", 2.0))
+
+    # Market Statistics
+    # spread EWMA used for gating
+    STATS_SPREAD_TAU_SEC: float = field(default_factory=lambda: _parse_float("STATS_SPREAD_TAU_SEC", 2.0))
+    # volatility / tick rate / velocity EWMA
+    STATS_TAU_SEC: float = field(default_factory=lambda: _parse_float("STATS_TAU_SEC", 30.0))
+    STATS_WINDOW: int = field(default_factory=lambda: max(2, _parse_int("STATS_WINDOW", 256))) # rolling window, ticks
+
+    # Profiling (toggle with SIGUSR1 or by creating/removing PROFILE_CONTROL_FILE)
+    PROFILE_HZ: float = field(default_factory=lambda: _parse_float("PROFILE_HZ", 100.0))
+    PROFILE_DIR: str = field(default_factory=lambda: os.getenv("PROFILE_DIR", "profiles"))
+    PROFILE_CONTROL_FILE: str = field(default_factory=lambda: os.getenv("PROFILE_CONTROL_FILE", "").strip())
 
     # Telegram
     TELEGRAM_BOT_TOKEN: str = field(default_factory=lambda: os.getenv("TELEGRAM_BOT_TOKEN", ""))
@@ -75,17 +142,20 @@ class Settings:
     FUTURES_HTTP_BASE: ClassVar[str]
     FUTURES_BASE_URL: ClassVar[str]
     FUTURES_ACCOUNT_URL: ClassVar[str]
+    FUTURES_WS_BASE: ClassVar[str]
 
-    def __post_init__(self):
+    def __post_init__(self) -> None:
         # Calculate derived properties and set them on the instance (using object.__setattr__ for frozen dataclass)
         is_testnet_fut = self.USE_TESTNET
         http_base = "https://testnet.binancefuture.com" if is_testnet_fut else "https://fapi.binance.com"
         base_url = f"{http_base}/fapi/v1"
         account_url = f"{http_base}/fapi/v2"
+        ws_base = "wss://stream.binancefuture.com" if is_testnet_fut else "wss://fstream.binance.com"
 
         object.__setattr__(self, 'FUTURES_HTTP_BASE', http_base)
         object.__setattr__(self, 'FUTURES_BASE_URL', base_url)
         object.__setattr__(self, 'FUTURES_ACCOUNT_URL', account_url)
+        object.__setattr__(self, 'FUTURES_WS_BASE', ws_base)
 
 def load_settings() -> Settings:
     return Settings()
\ No newline at end of file
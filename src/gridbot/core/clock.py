@@ -0,0 +1,55 @@
+"""
+Time source for the bot.
+
+Everything that reads the time or waits (cooldowns, debounce, daily budget
+rollover, request timestamps, polling sleeps) goes through a `Clock` handed in at
+construction. Live runs use `WALL`; replays, the stress harness and tests pass a
+`VirtualClock` and fast-forward it, so hours of behaviour run in seconds.
+"""
+import datetime
+import time
+from typing import Protocol
+
+
+class Clock(Protocol):
+    def time(self) -> float:
+        """Unix time in seconds."""
+        ...
+
+    def sleep(self, sec: float) -> None:
+        ...
+
+
+class WallClock:
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, sec: float) -> None:
+        time.sleep(sec)
+
+
+class VirtualClock:
+    """Clock that only moves when told to; `sleep` advances it instead of blocking."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, sec: float) -> None:
+        self.advance(sec)
+
+    def advance(self, dt: float) -> None:
+        self.now += max(dt, 0.0)
+
+    def advance_to(self, t: float) -> None:
+        self.now = max(self.now, t)
+
+
+WALL = WallClock()
+
+
+def day_of(ts: float) -> str:
+    """Local calendar day of `ts` (the daily budget key)."""
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d")
@@ -0,0 +1,87 @@
+"""
+Price-level cooldowns that keep new BUYs off a level for a while.
+
+`CooldownRegistry` holds every timed block on a grid level, one per reason:
+- `SUPPRESSED`: after a cancel, an unknown status or a partial fill;
+- `PENDING`: a placement is in flight (released on its answer, or it times out);
+- `RECENT`: a BUY was submitted there within `DUPLICATE_COOLDOWN_SEC`. These are
+  the cross-restart entries that the state file persists as `recent_submissions`.
+
+A single lookup answers whether a level is blocked and why. Expired entries are
+dropped by a hashed timing wheel. Each block files a reference under the wheel
+slot of its expiry. Advancing the wheel only visits the slots that elapsed, so
+each entry costs O(1) to expire however many are live. An entry more than one
+revolution out stays in its slot until its round comes up. Membership does not
+depend on the wheel: a block is active while `now < until`, swept or not.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SUPPRESSED, PENDING, RECENT = "suppressed", "pending", "recent"
+
+
+class CooldownRegistry:
+    def __init__(self, now: float, resolution: float = 1.0, slots: int = 512):
+        self.resolution = resolution
+        self._slots: List[List[Tuple[float, str, float]]] = [[] for _ in range(max(1, slots))]
+        self._tick = self._tick_of(now)  # first slot not yet swept
+        self._until: Dict[float, Dict[str, float]] = {}  # price -> reason -> blocked until
+
+    def _tick_of(self, t: float) -> int:
+        return int(t // self.resolution)
+
+    def block(self, px: float, reason: str, until: float) -> None:
+        """Blocks `px` for `reason` until `until`; an existing longer block is kept."""
+        reasons = self._until.setdefault(px, {})
+        if reasons.get(reason, float("-inf")) >= until:
+            return
+        reasons[reason] = until
+        tick = max(self._tick_of(until), self._tick)
+        self._slots[tick % len(self._slots)].append((px, reason, until))
+
+    def release(self, px: float, reason: str) -> None:
+        reasons = self._until.get(px)
+        if reasons is not None and reasons.pop(reason, None) is not None and not reasons:
+            del self._until[px]
+        # Its wheel entry no longer matches and is dropped when its slot comes up
+
+    def reason(self, px: float, now: float, ignore: Iterable[str] = ()) -> Optional[str]:
+        """Why `px` is blocked at `now`, or None when it is free."""
+        reasons = self._until.get(px)
+        if reasons:
+            for reason, until in reasons.items():
+                if now < until and reason not in ignore:
+                    return reason
+        return None
+
+    def until(self, px: float, reason: str) -> Optional[float]:
+        return self._until.get(px, {}).get(reason)
+
+    def expire(self, now: float) -> List[Tuple[float, str]]:
+        """Drops blocks that ended before the current slot; returns them as (price, reason)."""
+        end = self._tick_of(now)
+        n = len(self._slots)
+        # After a long gap one revolution visits every slot
+        ticks = range(self._tick, end) if end - self._tick <= n else range(end - n, end)
+        out = []
+        for tick in ticks:
+            slot = self._slots[tick % n]
+            if not slot:
+                continue
+            keep = []
+            for px, reason, until in slot:
+                reasons = self._until.get(px)
+                if reasons is None or reasons.get(reason) != until:
+                    continue  # released or extended since
+                if until > now:
+                    keep.append((px, reason, until))  # a later revolution
+                    continue
+                del reasons[reason]
+                if not reasons:
+                    del self._until[px]
+                out.append((px, reason))
+            self._slots[tick % n] = keep
+        self._tick = max(self._tick, end)
+        return out
+
+    def __len__(self) -> int:
+        return sum(len(r) for r in self._until.values())
@@ -1,34 +1,53 @@
-import time
-from typing import Dict, Tuple, List, Set, Optional
+from concurrent.futures import ThreadPoolExecutor
+import logging
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
-from gridbot.config.settings import Settings
-from gridbot.state.manager import StateManager, BotState, Position
 from gridbot.broker.binance_connector import Broker
 from gridbot.broker.notifications import send_telegram_message
-from gridbot.core.utils import dprint, format_step, align_to_grid
+from gridbot.broker.orders import OpenOrders, Order
+from gridbot.config.settings import Settings
+from gridbot.core.clock import Clock
+from gridbot.core.cooldowns import PENDING, RECENT, SUPPRESSED, CooldownRegistry
+from gridbot.core.pipeline import OrderPipeline
+from gridbot.core.utils import align_to_grid
+from gridbot.state.ledger import Fill
+from gridbot.state.manager import Position, StateManager
+from gridbot.strategy.grid_logic import buy_ladder
+from gridbot.strategy.ladder import plan_ladder
+from gridbot.utils.logger import get_logger, kv
+
+log = get_logger(__name__)
 
 class GridManager:
-    def __init__(self, settings: Settings, state_manager: StateManager, broker: Broker):
+    def __init__(self, settings: Settings, state_manager: StateManager, broker: Broker, clock: Optional[Clock] = None):
         self.settings = settings
         self.state_manager = state_manager
         self.broker = broker
+        self.clock = clock or state_manager.clock
         self.state = state_manager.state
-        self.price_suppress_until: Dict[float, float] = {}
-        self.pending_submissions: Set[float] = set()
-        self.pending_since: Dict[float, float] = {}
-        self.suspected_filled: Dict[str, float] = {}
+        # Timed blocks on levels: suppressions, in-flight placements and (persisted) recent submissions
+        self.cooldowns = CooldownRegistry(self.clock.time())
+        for k, ts in self.state.recent_submissions.items():
+            self.cooldowns.block(float(k), RECENT, float(ts) + settings.DUPLICATE_COOLDOWN_SEC)
+        self.suspected_filled: Dict[str, float] = {}  # vanished BUY orderId -> first seen gone (debounce)
+        self._tp_entry: Dict[float, float] = {}  # TP price -> entry level, memoized clamp
+        self.refill_due_at: Optional[float] = None  # pending coalesced refill (see request_refill)
+        self.far_cancels = 0  # farthest BUYs to cancel with that refill
+        self.orders = OrderPipeline(settings.ORDER_PIPELINE_DEPTH, settings.ORDER_RATE_10S, self.clock)
+
+    def close(self) -> None:
+        """Stops the placement pipeline's threads."""
+        self.orders.close()
 
     # --- Utility Helpers ---
 
-    def _is_ours(self, o: Dict) -> bool:
-        """Checks if an order belongs to this bot session."""
-        try:
-            cid = str(o.get("clientOrderId") or o.get("client_order_id") or o.get("client_id") or "")
-        except Exception:
-            return False
-        if not cid:
-            return False
-        return cid.startswith(f"B-{self.broker.session_tag}-") or cid.startswith(f"T-{self.broker.session_tag}-")
+    def _entry_for_tp(self, tp_price: float) -> float:
+        entry = self._tp_entry.get(tp_price)
+        if entry is None:
+            if len(self._tp_entry) > 4096:
+                self._tp_entry.clear()
+            entry = self._tp_entry[tp_price] = self.broker.clamp_price(tp_price - self.settings.TAKE_PROFIT_USD)
+        return entry
 
     def tp_client_id(self, entry: float, qty: float) -> str:
         """Generates a deterministic client ID for a TP order."""
@@ -50,18 +69,74 @@ class GridManager:
         }
         return allowed, meta
 
-    def _persistent_recent_hot(self, px: float, now_ts: float) -> bool:
-        """Checks if a price is in persistent cooldown across restarts."""
-        ts = float(self.state.recent_submissions.get(str(px), 0.0))
-        if ts <= 0:
-            return False
-        return (now_ts - ts) < self.settings.DUPLICATE_COOLDOWN_SEC
+    def nearest_levels(self) -> Tuple[Optional[float], Optional[float], bool]:
+        """(highest open BUY, lowest TP, ladder has room for new BUYs) for the polling scheduler."""
+        highest_buy = self.state.open_buy_price_to_id.max_price()
+        lowest_tp = min((p.tp_price for p in self.state.positions), default=None)
+        allowed, _ = self._allowed_new_buys_now()
+        return highest_buy, lowest_tp, allowed > 0
+
+    def _suppress(self, px: float, until: float) -> None:
+        self.cooldowns.block(px, SUPPRESSED, until)
+
+    def _mark_submitted(self, px: float, now_ts: float) -> None:
+        """Starts the duplicate cooldown on `px`; it is persisted, so it holds across restarts."""
+        self.state.recent_submissions[str(px)] = now_ts
+        self.cooldowns.block(px, RECENT, now_ts + self.settings.DUPLICATE_COOLDOWN_SEC)
+
+    def _expire_cooldowns(self, now_ts: float) -> None:
+        for px, reason in self.cooldowns.expire(now_ts):
+            if reason == RECENT:
+                self.state.recent_submissions.pop(str(px), None)
+
+    # --- Executions ---
+
+    def _fee_rate(self, maker: bool) -> float:
+        if maker:
+            return self.broker.maker_fee if self.broker.maker_fee is not None else self.settings.MAKER_FEE
+        return self.broker.taker_fee if self.broker.taker_fee is not None else self.settings.TAKER_FEE
+
+    def _estimated_fill(self, side: str, order_id: str, price: float, qty: float) -> Fill:
+        """Fallback when the exchange gave us no trade records: assume taker fee (conservative)."""
+        return Fill(
+            ts=self.clock.time(), side=side, price=price, qty=qty,
+            commission=price * qty * self._fee_rate(False), maker=False,
+            order_id=order_id, estimated=True,
+        )
+
+    def _execution_fill(self, side: str, order_id: str, fallback_price: float, qty: float,
+                        od: Optional[Dict] = None, trades: Optional[List[Dict]] = None) -> Fill:
+        """
+        Aggregates the account trades of a filled order into one Fill (VWAP price, summed
+        commission). `trades` from a bulk lookup spares the per-order request.
+        """
+        if trades is None:
+            trades = self.broker.get_order_trades(order_id) if order_id else []
+        try:
+            tq = sum(float(t["qty"]) for t in trades)
+            if tq > 0:
+                return Fill(
+                    ts=max(float(t.get("time", 0)) for t in trades) / 1000.0 or self.clock.time(),
+                    side=side,
+                    price=sum(float(t["price"]) * float(t["qty"]) for t in trades) / tq,
+                    qty=tq,
+                    commission=sum(float(t.get("commission", 0.0)) for t in trades),
+                    maker=all(bool(t.get("maker", False)) for t in trades),
+                    order_id=order_id,
+                )
+        except (KeyError, TypeError, ValueError) as e:
+            log.debug("bad trade records for %s: %s", order_id, e)
+
+        try:
+            price = float((od or {}).get("avgPrice") or 0.0) or fallback_price
+        except (TypeError, ValueError):
+            price = fallback_price
+        return self._estimated_fill(side, order_id, price, qty)
 
     # --- Exchange Sync ---
 
-    def sync_open_from_exchange_full(self):
+    def sync_open_from_exchange_full(self) -> None:
         """Updates local open BUY map and TP blocked entries from exchange orders."""
-        tmp_open: Dict[float, str] = dict(self.state.open_buy_price_to_id)
         tmp_tp_blocked: Set[float] = set(p.entry for p in self.state.positions)
 
         if self.settings.DRY_RUN:
@@ -71,44 +146,33 @@ class GridManager:
         try:
             orders = self.broker.get_open_orders()
         except Exception as e:
-            print(f"[WARN] get_open_orders failed: {e} (keeping previous maps)")
+            log.warning("get_open_orders failed: %s (keeping previous maps)", e)
             return
 
-        # Clear map and rebuild from live orders to ensure accuracy
-        tmp_open.clear()
-
-        for o in orders:
-            try:
-                side = str(o.get("side", ""))
-                status = str(o.get("status", ""))
-                if status not in ("NEW", "PARTIALLY_FILLED"):
-                    continue
-                price = self.broker.clamp_price(float(o.get("price", "0")))
-                reduce_only = str(o.get("reduceOnly") or o.get("reduce_only") or o.get("reduce_only_flag") or "").lower() in ("true","1")
-                
-                if side == "BUY" and not reduce_only:
-                    if self._is_ours(o):
-                        tmp_open[price] = str(o.get("orderId", ""))
-                elif side == "SELL" and reduce_only:
-                    entry = self.broker.clamp_price(price - self.settings.TAKE_PROFIT_USD)
-                    tmp_tp_blocked.add(entry)
-            except Exception:
-                continue
+        # Update the index from live orders: our BUYs and ones we already track (whatever session
+        # tagged them) at their live price. Tracked BUYs that left the book stay indexed until
+        # detect_filled_buys_and_restore has confirmed them; dropping them here would lose any
+        # fill that happened in between.
+        index = self.state.open_buy_price_to_id
+        for o in orders.buys:
+            if o.ours or index.price_of(o.order_id) is not None:
+                index.set(o.price, o.order_id, o.client_id)
+        for o in orders.tps:
+            tmp_tp_blocked.add(self._entry_for_tp(o.price))
 
-        self.state.open_buy_price_to_id = tmp_open
         self.state.tp_blocked_entries = tmp_tp_blocked
 
-    def ensure_tps_for_positions(self):
+    def ensure_tps_for_positions(self) -> None:
         """Checks all positions and places missing TP orders."""
         if self.settings.DRY_RUN:
-            dprint("[TP-RECOVER] DRY_RUN=True -> skip placing live TPs")
+            log.debug("[TP-RECOVER] DRY_RUN=True -> skip placing live TPs")
             return
 
         try:
             live_orders = self.broker.get_open_orders()
         except Exception as e:
-            print(f"[TP-RECOVER] get_open_orders failed: {e}")
-            live_orders = []
+            log.warning("[TP-RECOVER] get_open_orders failed: %s", e)
+            live_orders = OpenOrders()
 
         placed = 0
         for lot in list(self.state.positions):
@@ -119,8 +183,11 @@ class GridManager:
             qty = lot.qty
             tp_price = self.broker.clamp_price(entry + self.settings.TAKE_PROFIT_USD)
 
-            if self._orders_has_live_tp(live_orders, tp_price, qty):
-                dprint(f"[TP-RECOVER] live TP exists @ {tp_price} qty={qty}")
+            live = self._live_tp(live_orders, tp_price, qty)
+            if live is not None:
+                log.debug("[TP-RECOVER] live TP exists @ %s qty=%s", tp_price, qty)
+                if not lot.tp_id or lot.tp_id == "n/a":
+                    lot.tp_id = live.order_id  # adopt it, so its fill can be looked up
                 continue
             
             try:
@@ -134,173 +201,249 @@ class GridManager:
                 self.state_manager.log_trade("LIMIT_TP_RECOVER_OPEN", tp_price, qty, 0.0, f"tpId={tp_id}")
                 send_telegram_message(self.settings, f"✅ TP RECOVER {self.settings.SYMBOL} @ {tp_price:.4f} | Qty {qty:.4f}")
             except Exception as e:
-                dprint(f"[TP-RECOVER] error placing TP for entry {entry}: {e}")
+                log.error("[TP-RECOVER] error placing TP for entry %s: %s", entry, e)
                 self.state_manager.log_trade("LIMIT_TP_RECOVER_ERROR", tp_price, qty, 0.0, str(e))
 
         if placed:
-            self.state_manager.save_state()
-        print(f"[TP-RECOVER] total newly opened: {placed}")
+            self.state_manager.save_state(durable=True)
+        log.info("[TP-RECOVER] total newly opened: %d", placed)
 
-    def _orders_has_live_tp(self, orders: List[Dict], tp_price: float, qty: float) -> bool:
+    def _live_tp(self, orders: OpenOrders, tp_price: float, qty: float) -> Optional[Order]:
         tp_price = self.broker.clamp_price(tp_price)
         qty = self.broker.clamp_qty(qty)
-        for o in orders:
+        px_tol = max(self.broker.tick_size, 1e-9)
+        qty_tol = max(self.broker.step_size, 1e-9)
+        for o in orders.tps:
+            # Compare prices and quantities within tolerance
+            if abs(o.price - tp_price) < px_tol and abs(o.qty - qty) < qty_tol:
+                return o
+        return None
+
+    # --- Cold Start ---
+
+    def _recoverable(self, cid: str, prefix: str) -> bool:
+        """Client id written by this bot (`B-`/`T-`); with a fixed SESSION_TAG only that session's."""
+        if self.settings.SESSION_TAG_ENV:
+            return cid.startswith(f"{prefix}-{self.broker.session_tag}-")
+        return cid.startswith(f"{prefix}-")
+
+    def _tp_entry_from_cid(self, cid: str, tp_price: float) -> float:
+        """Entry level encoded by `tp_client_id` (T-<tag>-<entry cents>-<qty*1000>), else TP price - TAKE_PROFIT_USD."""
+        parts = cid.rsplit("-", 2)
+        if len(parts) == 3 and parts[1].isdigit():
+            entry = self.broker.clamp_price(int(parts[1]) / 100.0)
+            if self.broker.clamp_price(entry + self.settings.TAKE_PROFIT_USD) == tp_price:
+                return entry
+        return self._entry_for_tp(tp_price)
+
+    def recover_state_from_exchange(self) -> bool:
+        """
+        Rebuilds positions, the open-BUY map, TP blocks and handled fills after the state file
+        was lost. Position risk, open orders, recent orders and recent trades come from one
+        round of parallel requests:
+
+        - every live TP of ours becomes a position (entry from its client id)
+        - filled BUYs of ours supply the entry executions and the handled fills
+        - position quantity no live TP covers becomes positions without a TP, newest BUYs
+          first, for ensure_tps_for_positions to protect
+        """
+        if self.settings.DRY_RUN:
+            return False
+        start_ms = int((self.clock.time() - self.settings.RECOVER_LOOKBACK_HOURS * 3600) * 1000)
+        with ThreadPoolExecutor(max_workers=4, thread_name_prefix="recover") as pool:
+            f_pos = pool.submit(self.broker.get_position_risk)
+            f_open = pool.submit(self.broker.get_open_orders)
+            f_hist = pool.submit(self.broker.account_orders_since, start_ms)
+            f_trades = pool.submit(self.broker.account_trades_since, start_ms)
             try:
-                side = str(o.get("side", ""))
-                status = str(o.get("status", ""))
-                reduce_only = str(o.get("reduceOnly") or o.get("reduce_only") or o.get("reduce_only_flag") or "").lower() in ("true","1")
-                op = self.broker.clamp_price(float(o.get("price", 0.0)))
-                oq = self.broker.clamp_qty(float(o.get("origQty", 0.0)))
-            except Exception:
+                position, live, history, trade_rows = f_pos.result(), f_open.result(), f_hist.result(), f_trades.result()
+            except Exception as e:
+                log.error("[RECOVER] exchange fetch failed: %s", e)
+                return False
+
+        trades: Dict[str, List[Dict]] = {}
+        for t in trade_rows:
+            trades.setdefault(str(t.get("orderId")), []).append(t)
+
+        # Our filled BUYs per entry level, oldest first (lots take the newest)
+        filled: Dict[float, List[Dict]] = {}
+        handled: Set[str] = set()
+        for od in history:
+            if od.get("side") != "BUY" or od.get("status") != "FILLED":
+                continue
+            if not self._recoverable(str(od.get("clientOrderId") or ""), "B"):
+                continue
+            handled.add(str(od.get("orderId")))
+            filled.setdefault(self.broker.clamp_price(float(od.get("price") or 0.0)), []).append(od)
+
+        def _lot(entry: float, qty: float, tp_id: str, od: Optional[Dict]) -> Position:
+            tp_price = self.broker.clamp_price(entry + self.settings.TAKE_PROFIT_USD)
+            if od is None:
+                return Position(entry=entry, qty=qty, tp_price=tp_price, tp_id=tp_id)
+            oid = str(od.get("orderId"))
+            fill = self._execution_fill("BUY", oid, entry, qty, od, trades.get(oid, []))
+            return Position(entry=entry, qty=qty, tp_price=tp_price, tp_id=tp_id,
+                            entry_fill=fill.price, entry_fee=fill.commission, opened_at=fill.ts)
+
+        positions: List[Position] = []
+        for o in live.tps:
+            if not self._recoverable(o.client_id, "T"):
                 continue
-            if side == "SELL" and reduce_only and status in ("NEW", "PARTIALLY_FILLED"):
-                # Compare prices and quantities within tolerance
-                if abs(op - tp_price) < max(self.broker.tick_size, 1e-9) and abs(oq - qty) < max(self.broker.step_size, 1e-9):
-                    return True
-        return False
+            entry = self._tp_entry_from_cid(o.client_id, o.price)
+            qty = self.broker.clamp_qty(o.qty - o.executed_qty)
+            level = filled.get(entry)
+            positions.append(_lot(entry, qty, o.order_id, level.pop() if level else None))
+
+        # Position the live TPs do not cover: newest remaining BUY fills first
+        unhedged = float(position.get("positionAmt") or 0.0) - sum(p.qty for p in positions)
+        rest = sorted((od for ods in filled.values() for od in ods), key=lambda od: int(od.get("updateTime") or od.get("time") or 0), reverse=True)
+        for od in rest:
+            if unhedged < self.broker.min_qty / 2:
+                break
+            qty = self.broker.clamp_qty(min(float(od.get("executedQty") or 0.0), unhedged))
+            positions.append(_lot(self.broker.clamp_price(float(od.get("price") or 0.0)), qty, "", od))
+            unhedged -= qty
+        if unhedged >= self.broker.min_qty / 2:
+            # Bought before the lookback window: protect it as one lot at the average entry
+            entry = self.broker.clamp_price(float(position.get("entryPrice") or 0.0))
+            log.warning("[RECOVER] %s qty not matched to BUY fills; one lot @ %s", unhedged, entry)
+            positions.append(_lot(entry, self.broker.clamp_qty(unhedged), "", None))
+
+        self.state.positions = positions
+        self.state.open_buy_price_to_id.replace(
+            (o.price, o.order_id, o.client_id) for o in live.buys if self._recoverable(o.client_id, "B")
+        )
+        self.state.tp_blocked_entries = {p.entry for p in positions}
+        self.state.handled_fills = handled
+        self.state_manager.save_state(durable=True)
+
+        log.info("[RECOVER] state rebuilt from exchange", extra=kv(
+            positions=len(positions), without_tp=sum(1 for p in positions if not p.tp_id),
+            open_buys=len(self.state.open_buy_price_to_id), handled_fills=len(handled),
+        ))
+        self.state_manager.log_trade("STATE_RECOVERED", 0.0, sum(p.qty for p in positions), 0.0,
+                                     f"positions={len(positions)} open_buys={len(self.state.open_buy_price_to_id)}")
+        return True
 
     # --- Grid Management ---
 
     def build_grid_candidates(self, base: float) -> List[float]:
-        """Generates potential BUY prices below the base price, excluding TP-blocked entries."""
-        levels: List[float] = []
-        i = 1
-        seen = set()
-        
-        # Use the derived state for blocked entries
-        blocked_prices = self.state.tp_blocked_entries
-
-        while True:
-            px = self.broker.clamp_price(base - self.settings.GRID_STEP_USD * i)
-            if px not in seen:
-                levels.append(px)
-                seen.add(px)
-            
-            # Check if we have enough usable levels (not blocked)
-            usable = [p for p in levels if (p not in blocked_prices)]
-            if len(usable) >= self.settings.MAX_LADDERS:
-                # Return all generated levels, sorted descending
-                return sorted(set(levels), reverse=True)
-            
-            i += 1
-            if i > 20000: # Safety break
-                return sorted(set(levels), reverse=True)
+        """Generates potential BUY prices below the base price, deep enough for MAX_LADDERS levels that are not TP-blocked."""
+        return buy_ladder(
+            base, self.settings.GRID_STEP_USD, self.settings.MAX_LADDERS, self.broker.tick_size,
+            self.state.tp_blocked_entries,
+        )
 
-    def place_missing_buys(self, levels: List[float], ignore_recent: bool = False):
+    def place_missing_buys(self, levels: List[float], ignore_recent: bool = False) -> None:
         """Places new limit BUY orders to fill the grid depth."""
         if self.state.HALT_PLACEMENT:
-            dprint("[SKIP] HALT_PLACEMENT=True — blocking new orders")
+            log.debug("[SKIP] HALT_PLACEMENT=True — blocking new orders")
             return
 
+        # Checked once per pass so the per-level skip diagnostics cost a local lookup when DEBUG is off
+        debug = log.isEnabledFor(logging.DEBUG)
         allowed, meta = self._allowed_new_buys_now()
-        dprint(f"[CAP] posLots={meta['pos_lots']} openBuys={meta['open_buys']} "
-               f"capTrades={meta['cap_trades']} capLadders={meta['cap_ladders']} -> allowed={allowed}")
+        if debug:
+            log.debug("[CAP] posLots=%s openBuys=%s capTrades=%s capLadders=%s -> allowed=%s",
+                      meta['pos_lots'], meta['open_buys'], meta['cap_trades'], meta['cap_ladders'], allowed)
 
         if allowed <= 0:
-            dprint("[SKIP] No capacity to open new BUYs (allowed<=0)")
+            log.debug("[SKIP] No capacity to open new BUYs (allowed<=0)")
             return
 
-        now_ts = time.time()
-        
-        # Purge old in-memory cooldowns
-        for k, t in list(self.price_suppress_until.items()):
-            if now_ts >= t:
-                self.price_suppress_until.pop(k, None)
-        for px_pending, ts in list(self.pending_since.items()):
-            if now_ts - ts > self.settings.PENDING_LOCK_MAX_SEC:
-                self.pending_submissions.discard(px_pending)
-                self.pending_since.pop(px_pending, None)
-
-        open_levels = set(self.state.open_buy_price_to_id.keys())
-        cooldown_prices: Set[float] = set()
-        oid_to_price = {oid: px for px, oid in self.state.open_buy_price_to_id.items()}
-        for oid in self.suspected_filled.keys():
-            px = oid_to_price.get(oid)
-            if px is not None:
-                cooldown_prices.add(px)
+        now_ts = self.clock.time()
+        self._expire_cooldowns(now_ts)
 
+        # A BUY in its vanish debounce (suspected_filled) stays in open_levels, which covers its level
+        open_levels = self.state.open_buy_price_to_id
         blocked = self.state.tp_blocked_entries
+        ignore = (RECENT,) if ignore_recent else ()
 
         # Extra safety: live snapshot to prevent exchange-hiccup duplicates
-        live_buy_prices = set()
+        live_buy_prices: Set[float] = set()
         try:
             if not self.settings.DRY_RUN:
-                orders = self.broker.get_open_orders()
-                for o in orders:
-                    if str(o.get("side")) == "BUY" and str(o.get("status")) in ("NEW", "PARTIALLY_FILLED"):
-                        ro = str(o.get("reduceOnly") or o.get("reduce_only") or "").lower() in ("true", "1")
-                        if not ro:
-                            live_buy_prices.add(self.broker.clamp_price(float(o.get("price", 0))))
+                live_buy_prices = self.broker.get_open_orders().buy_prices
         except Exception as e:
-            dprint(f"[WARN] live snapshot failed: {e}")
+            log.warning("live snapshot failed: %s", e)
 
-        placed_now = 0
+        batch: List[Tuple[float, float]] = []  # (price, estimated cost)
+        reserved = 0.0
 
         for px in levels:
-            if placed_now >= allowed:
-                dprint(f"[STOP] Reached allowed cap this pass (placed_now={placed_now} / allowed={allowed})")
+            if len(batch) >= allowed:
+                if debug:
+                    log.debug("[STOP] Reached allowed cap this pass (batch=%d / allowed=%d)", len(batch), allowed)
                 break
 
             # --- Anti-dup / Guards ---
             if px in open_levels:
-                dprint(f"[SKIP {px}] already in open_buy_price_to_id")
-                continue
-            if px in cooldown_prices:
-                dprint(f"[SKIP {px}] in suspected_filled cooldown")
+                if debug:
+                    log.debug("[SKIP %s] already in open_buy_price_to_id", px)
                 continue
             if px in blocked:
-                dprint(f"[SKIP {px}] TP-blocked entry (reduce-only SELL live)")
+                if debug:
+                    log.debug("[SKIP %s] TP-blocked entry (reduce-only SELL live)", px)
                 continue
-            if px in self.price_suppress_until:
-                dprint(f"[SKIP {px}] suppressed until {self.price_suppress_until[px]:.1f}")
-                continue
-            if px in self.pending_submissions:
-                dprint(f"[SKIP {px}] pending submission lock")
+            reason = self.cooldowns.reason(px, now_ts, ignore)
+            if reason is not None:
+                if debug:
+                    log.debug("[SKIP %s] %s cooldown until %.1f", px, reason, self.cooldowns.until(px, reason))
                 continue
             if px in live_buy_prices:
-                dprint(f"[SKIP {px}] live snapshot shows BUY already working")
+                if debug:
+                    log.debug("[SKIP %s] live snapshot shows BUY already working", px)
                 continue
 
-            if not ignore_recent:
-                if self._persistent_recent_hot(px, now_ts):
-                    dprint(f"[SKIP {px}] persistent cooldown (recent_submissions)")
-                    continue
-
-            # Daily budget check
+            # Daily budget check; orders already in this batch count against it
             est_cost = px * max(self.settings.QTY_PER_LADDER, self.broker.min_qty)
-            if self.state.spent_today + est_cost > self.settings.MAX_DAILY_USDT:
-                dprint(f"[SKIP {px}] MAX_DAILY_USDT would be exceeded (spent_today={self.state.spent_today:.2f}, est={est_cost:.2f})")
+            if self.state.spent_today + reserved + est_cost > self.settings.MAX_DAILY_USDT:
+                if debug:
+                    log.debug("[SKIP %s] MAX_DAILY_USDT would be exceeded (spent_today=%.2f, est=%.2f)", px, self.state.spent_today, est_cost)
                 continue
+            batch.append((px, est_cost))
+            reserved += est_cost
+
+        # --- Submission ---
+        # Pipelined: up to ORDER_PIPELINE_DEPTH placements in flight, each reconciled here as it completes
+        qty = self.settings.QTY_PER_LADDER
+        for px, est_cost in batch:
+            cid = self.broker.client_id("B", px)
+            self.cooldowns.block(px, PENDING, now_ts + self.settings.PENDING_LOCK_MAX_SEC)
+            for outcome in self.orders.submit(cid, (px, est_cost), self.broker.limit_buy, px, qty, client_order_id=cid):
+                self._on_buy_submitted(*outcome, now_ts)
+        for outcome in self.orders.drain():
+            self._on_buy_submitted(*outcome, now_ts)
+
+    def _on_buy_submitted(self, cid: str, key: Tuple[float, float], od: Optional[Dict],
+                          err: Optional[BaseException], now_ts: float) -> None:
+        """Reconciles one BUY placement's acknowledgement or error."""
+        px, est_cost = key
+        self.cooldowns.release(px, PENDING)
+        if err is not None:
+            log.error("limit_buy failed @ %s: %s", px, err, extra=kv(price=px, cid=cid))
+            self.state_manager.log_trade("LIMIT_OPEN_ERROR", px, 0.0, 0.0, str(err))
+            return
+        od = od or {}
+        oid = str(od.get("orderId", "n/a"))
 
-            # --- Submission ---
-            self.pending_submissions.add(px)
-            self.pending_since[px] = now_ts
-            try:
-                od = self.broker.limit_buy(px, self.settings.QTY_PER_LADDER)
-                oid = str(od.get("orderId", "n/a"))
-
-                self.state.open_buy_price_to_id[px] = oid
-                self.state.total_buys += 1
-                self.state.spent_today += est_cost
-                self.state.recent_submissions[str(px)] = now_ts # Persisted cooldown
-
-                self.state_manager.save_state()
-                self.state_manager.log_trade("LIMIT_BUY_OPEN", px, self.settings.QTY_PER_LADDER, 0.0, f"orderId={oid}")
-                send_telegram_message(self.settings, f"🚀 LIMIT BUY {self.settings.SYMBOL} @ {px:.4f} | Qty {self.settings.QTY_PER_LADDER:.4f}")
+        self.state.open_buy_price_to_id.set(px, oid, str(od.get("clientOrderId") or cid))
+        self.state.total_buys += 1
+        self.state.spent_today += est_cost
+        self._mark_submitted(px, now_ts)
 
-                placed_now += 1
+        # Coalesced with the rest of the pass; the caller's save after the pass is the barrier
+        self.state_manager.save_state()
+        self.state_manager.log_trade("LIMIT_BUY_OPEN", px, self.settings.QTY_PER_LADDER, 0.0, f"orderId={oid}")
+        send_telegram_message(self.settings, f"🚀 LIMIT BUY {self.settings.SYMBOL} @ {px:.4f} | Qty {self.settings.QTY_PER_LADDER:.4f}")
 
-            except Exception as e:
-                dprint(f"[ERROR] limit_buy failed @ {px}: {e}")
-                self.state_manager.log_trade("LIMIT_OPEN_ERROR", px, 0.0, 0.0, str(e))
-            finally:
-                self.pending_submissions.discard(px)
-                self.pending_since.pop(px, None)
+        log.info("[BUY] OPEN @ %s", px, extra=kv(_limit=False, price=px, qty=self.settings.QTY_PER_LADDER, oid=oid))
 
     # --- Fill Processing ---
 
-    def on_buy_fill_confirmed(self, entry_price: float, qty: float, order_id: str):
-        """Handles a confirmed BUY fill: opens TP and updates state."""
+    def on_buy_fill_confirmed(self, entry_price: float, qty: float, order_id: str,
+                              od: Optional[Dict] = None, trades: Optional[List[Dict]] = None) -> None:
+        """Handles a confirmed BUY fill: records the execution, opens TP and updates state."""
         if order_id in self.state.handled_fills:
             return
         self.state.handled_fills.add(order_id)
@@ -309,7 +452,12 @@ class GridManager:
             entry_price = self.broker.clamp_price(entry_price)
             qty = self.broker.clamp_qty(qty)
 
-            print(f"[FILL] BUY filled @ {entry_price} qty={qty} oid={order_id}")
+            fill = self._execution_fill("BUY", order_id, entry_price, qty, od, trades)
+            self.state_manager.ledger.record_fill(fill)
+
+            log.info("[FILL] BUY filled @ %s", entry_price,
+                     extra=kv(_limit=False, price=entry_price, qty=qty, oid=order_id, fee=fill.commission,
+                              estimated=fill.estimated))
             send_telegram_message(self.settings, f"🟢 BUY FILLED {self.settings.SYMBOL} @ {entry_price:.4f} | Qty {qty:.4f} | oid={order_id}")
             self.state_manager.log_trade("BUY_FILLED_CONFIRMED", entry_price, qty, 0.0, f"orderId={order_id}")
 
@@ -319,200 +467,232 @@ class GridManager:
             tp_id = str(od.get("orderId", "n/a"))
             tp_price = self.broker.clamp_price(entry_price + self.settings.TAKE_PROFIT_USD)
 
-            self.state.positions.append(Position(entry=entry_price, qty=qty, tp_price=tp_price, tp_id=tp_id))
+            self.state.positions.append(Position(
+                entry=entry_price, qty=qty, tp_price=tp_price, tp_id=tp_id,
+                entry_fill=fill.price, entry_fee=fill.commission, opened_at=fill.ts,
+            ))
             self.state.tp_blocked_entries.add(entry_price)
 
-            print(f"[TP] OPEN reduce-only @ {tp_price} for entry {entry_price} qty={qty} (tp_id={tp_id})")
+            log.info("[TP] OPEN reduce-only @ %s for entry %s", tp_price, entry_price,
+                     extra=kv(_limit=False, price=tp_price, entry=entry_price, qty=qty, tp_id=tp_id))
             send_telegram_message(self.settings, f"✅ TP OPEN {self.settings.SYMBOL} @ {tp_price:.4f} | Qty {qty:.4f}")
             self.state_manager.log_trade("LIMIT_TP_OPEN", tp_price, qty, 0.0, f"tpId={tp_id}")
 
             self.state_manager.save_state()
         except Exception as e:
-            dprint(f"[ERROR] limit_tp_reduce failed @ entry {entry_price}: {e}")
+            log.error("limit_tp_reduce failed @ entry %s: %s", entry_price, e, extra=kv(entry=entry_price, qty=qty))
             self.state_manager.log_trade("LIMIT_TP_ERROR", entry_price + self.settings.TAKE_PROFIT_USD, qty, 0.0, str(e))
 
-    def on_tp_fill(self, entry_price: float, qty: float):
-        """Handles a TP fill: cancels farthest BUY and triggers refill."""
-        
-        # Option-B: cancel farthest BUY on the book to keep depth constant
-        if self.state.open_buy_price_to_id:
-            far_px = min(self.state.open_buy_price_to_id.keys())
-            far_oid = self.state.open_buy_price_to_id.get(far_px)
-            try:
-                if far_oid:
-                    self.broker.cancel_order(far_oid)
-            except Exception as e:
-                self.state_manager.log_trade("CANCEL_FAR_ERROR", far_px, 0.0, 0.0, str(e))
-            
-            self.state.open_buy_price_to_id.pop(far_px, None)
-            self.price_suppress_until[far_px] = max(self.price_suppress_until.get(far_px, 0.0), time.time() + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
-
+    def on_tp_fill(self, entry_price: float, qty: float) -> None:
+        """Handles a TP fill: schedules the farthest-BUY cancel and a refill."""
         self.state.tp_blocked_entries.discard(self.broker.clamp_price(entry_price))
 
-        # Refill depth immediately after TP fill
+        # Option-B: cancel farthest BUY on the book to keep depth constant (batched with the refill)
+        self.request_refill(cancel_far=1)
+
+    def request_refill(self, cancel_far: int = 0) -> None:
+        """
+        Asks for a refill pass. Requests are coalesced: the processor runs one pass per tick
+        (or per REFILL_COALESCE_SEC window) via `flush_refill`, however many fills asked.
+        """
+        self.far_cancels += cancel_far
+        if self.refill_due_at is None:
+            self.refill_due_at = self.clock.time() + self.settings.REFILL_COALESCE_SEC
+
+    def flush_refill(self, force: bool = False) -> bool:
+        """Runs the pending refill once it is due: one batch cancel of the farthest BUYs, then one refill."""
+        if self.refill_due_at is None or (not force and self.clock.time() < self.refill_due_at):
+            return False
+        n, self.far_cancels, self.refill_due_at = self.far_cancels, 0, None
+
+        far = self.state.open_buy_price_to_id.lowest(n)
+        if far:
+            now = self.clock.time()
+            results = self.broker.cancel_orders([oid for _, oid in far])
+            gone: List[Tuple[float, str]] = []
+            for (px, oid), r in zip(far, results):
+                if isinstance(r, dict) and "code" in r:
+                    self.state_manager.log_trade("CANCEL_FAR_ERROR", px, 0.0, 0.0, str(r.get("msg", r)))
+                    gone.append((px, oid))
+                self.state.open_buy_price_to_id.pop(px, None)
+                self._suppress(px, now + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
+            if gone:
+                # Usually filled under us; the confirmation's own refill request lands in this pass
+                self.confirm_and_process_vanished(gone)
+                self.refill_due_at = None
+
         self.refill_now()
+        return True
 
-    def refill_now(self):
-        """Refill grid immediately (single pass) – used right after a BUY fill or TP fill."""
+    def refill_now(self) -> None:
+        """Refill grid immediately (single pass); fills go through request_refill/flush_refill instead."""
         self.sync_open_from_exchange_full()
         levels = self.build_grid_candidates(self.state.base_price)
         if len(self.state.open_buy_price_to_id) < self.settings.MAX_LADDERS:
             self.place_missing_buys(levels, ignore_recent=True)
-            self.state_manager.save_state()
-
-    def process_positions_vs_market(self, bid: float):
-        """Checks if any TP targets have been hit by the current bid price."""
+            self.state_manager.save_state(durable=True)
+
+    def _tp_exit_fill(self, lot: Position, orders: Dict[str, Dict], trades: Dict[str, List[Dict]]) -> Optional[Fill]:
+        """
+        Confirms the TP execution of a lot whose target was crossed, from a bulk lookup
+        (`Broker.lookup_orders`) covering all crossed lots. None -> not (yet) filled.
+        A TP that ended without filling loses its `tp_id`, so a new one is placed for the lot;
+        a lot without a live TP is never booked (the long is still open on the exchange).
+        """
+        if self.settings.DRY_RUN:
+            return self._estimated_fill("SELL", lot.tp_id, lot.tp_price, lot.qty)
+        if not lot.tp_id or lot.tp_id == "n/a":
+            return None
+
+        od = orders.get(lot.tp_id)
+        if od is None:
+            return None
+        status = str(od.get("status", "")).upper()
+        if status in ("NEW", "PARTIALLY_FILLED"):
+            return None
+        if status == "FILLED":
+            return self._execution_fill("SELL", lot.tp_id, lot.tp_price, lot.qty, od, trades.get(lot.tp_id, []))
+        if status in ("CANCELED", "EXPIRED", "REJECTED"):
+            # The long is still open on the exchange: keep the lot and protect it again
+            log.warning("[TP] %s for entry %s ended %s unfilled; replacing it", lot.tp_id, lot.entry, status,
+                        extra=kv(_limit=False, entry=lot.entry, tp_id=lot.tp_id, status=status))
+            note = f"tpId={lot.tp_id} status={status}"
+            self.state_manager.log_trade("TP_ENDED_UNFILLED", lot.tp_price, lot.qty, 0.0, note)
+            lot.tp_id = ""
+        return None
+
+    def process_positions_vs_market(self, bid: float, predicted: Iterable[str] = ()) -> None:
+        """
+        Checks if any TP targets have been hit by the current bid price (or are `predicted`
+        filled by the book mirror) and books confirmed exits.
+        """
+        predicted = set(predicted)
+        crossed = [p.tp_id for p in self.state.positions if (bid >= p.tp_price or p.tp_id in predicted) and p.tp_id and p.tp_id != "n/a"]
+        orders, trades = self.broker.lookup_orders(crossed) if crossed and not self.settings.DRY_RUN else ({}, {})
+
+        ledger = self.state_manager.ledger
         remaining: List[Position] = []
+        closed = unprotected = 0
         for lot in self.state.positions:
             entry = lot.entry
             qty = lot.qty
-            tp_price = lot.tp_price
-            
-            if bid >= tp_price:
-                # TP hit
-                pnl_gross = (tp_price - entry) * qty
-                
-                # Use broker's actual taker fee if available, otherwise use settings default
-                taker_fee = self.broker.taker_fee if self.broker.taker_fee is not None else self.settings.TAKER_FEE
-                
-                fee_open = entry * qty * taker_fee
-                fee_close = tp_price * qty * taker_fee
-                pnl = pnl_gross - (fee_open + fee_close)
-                
-                self.state.realized_pnl += pnl
-                self.state.total_sells += 1
-                
-                self.state_manager.log_trade("TP_FILLED", tp_price, qty, pnl, f"entry={entry}")
-                send_telegram_message(self.settings, f"✅ GRID CLOSE PnL +${pnl:.2f} (Total ${self.state.realized_pnl:.2f}) | {entry:.4f}→{tp_price:.4f}")
-                
-                self.on_tp_fill(entry, qty)
-            else:
+
+            if bid < lot.tp_price and lot.tp_id not in predicted:
                 remaining.append(lot)
-        
-        self.state.positions = remaining
-        if len(remaining) != len(self.state.positions):
-            self.state_manager.save_state()
+                continue
 
-    # --- Fill Detection ---
+            exit_fill = self._tp_exit_fill(lot, orders, trades)
+            if exit_fill is None:
+                unprotected += not lot.tp_id or lot.tp_id == "n/a"
+                remaining.append(lot)
+                continue
 
-    def confirm_and_process_vanished(self, vanished: List[Tuple[float, str]]):
-        """Checks orders that vanished from the open orders list (filled/canceled)."""
-        now = time.time()
+            # Lots from older state files carry no entry execution; assume taker like before
+            entry_px = lot.entry_fill or entry
+            entry_fee = lot.entry_fee if lot.opened_at > 0 else entry_px * qty * self._fee_rate(False)
+            pnl = ledger.close_round_trip(entry, entry_px, entry_fee, lot.opened_at, exit_fill)
 
-        for price, oid in vanished:
-            # Remove from local map temporarily
-            self.state.open_buy_price_to_id.pop(price, None)
+            self.state.realized_pnl += pnl
+            self.state.total_sells += 1
+            closed += 1
 
-            # Instant refill path (no debounce)
-            if self.settings.INSTANT_TP_REFILL:
-                od = self.broker.get_order(oid)
-                if od is None:
-                    self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
-                    continue
+            note = f"entry={entry} fee={entry_fee + exit_fill.commission:.6f} {'maker' if exit_fill.maker else 'taker'}"
+            if exit_fill.estimated:
+                note += " est"
+            self.state_manager.log_trade("TP_FILLED", exit_fill.price, exit_fill.qty, pnl, note)
+            log.info("[TP] FILLED @ %s for entry %s", exit_fill.price, entry,
+                     extra=kv(_limit=False, pnl=round(pnl, 6), qty=exit_fill.qty, fee=exit_fill.commission,
+                              maker=exit_fill.maker, estimated=exit_fill.estimated))
+            send_telegram_message(self.settings, f"✅ GRID CLOSE PnL +${pnl:.2f} (Total ${self.state.realized_pnl:.2f}) | {entry:.4f}→{exit_fill.price:.4f}")
 
-                status = str(od.get("status", "")).upper()
-                
-                if status == "FILLED":
-                    if oid in self.state.handled_fills:
-                        self.refill_now()
-                        continue
-
-                    try:
-                        exec_qty = float(od.get("executedQty", "0") or "0")
-                    except Exception:
-                        exec_qty = 0.0
-
-                    want_qty = max(self.settings.QTY_PER_LADDER, 0.0)
-                    if exec_qty >= want_qty * 0.999:
-                        self.on_buy_fill_confirmed(price, self.settings.QTY_PER_LADDER, oid)
-                        self.refill_now()
-                    else:
-                        self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
-                    continue
+            self.on_tp_fill(entry, qty)
 
-                elif status in ("CANCELED", "EXPIRED", "REJECTED"):
-                    self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
-                    self.state_manager.log_trade("BUY_CANCELED_OR_EXPIRED", price, 0.0, 0.0, f"orderId={oid}, status={status}")
-                    continue
+        self.state.positions = remaining
+        if closed:
+            self.state_manager.save_state()
+        if unprotected:
+            self.ensure_tps_for_positions()
 
-                elif status in ("NOT_FOUND", "UNKNOWN"):
-                    self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
-                    continue
+    # --- Fill Detection ---
 
-                elif status in ("NEW", "PARTIALLY_FILLED"):
-                    # Order is actually still alive, restore to map
-                    self.state.open_buy_price_to_id[price] = oid
-                    continue
+    def confirm_and_process_vanished(self, vanished: List[Tuple[float, str]], debounce: bool = True) -> None:
+        """
+        Checks orders that vanished from the open orders list (filled/canceled). Every order
+        due for a check is resolved by one bulk lookup; fills request a (coalesced) refill.
+        `debounce=False` checks right away (BUYs the book mirror predicts filled).
+        """
+        now = self.clock.time()
+        due: List[Tuple[float, str]] = []
+        open_buys = self.state.open_buy_price_to_id
+        cids: Dict[float, str] = {}  # restored entries keep their clientOrderId
 
-                else:
-                    self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
-                    self.state_manager.log_trade("BUY_UNKNOWN_STATUS_REMOVED", price, 0.0, 0.0, f"orderId={oid}, status={status}")
+        for price, oid in vanished:
+            # Remove from local map temporarily
+            cids[price] = open_buys.client_id_at(price)
+            open_buys.pop(price, None)
+
+            # Debounce (INSTANT_TP_REFILL=False): only check once the order has been gone for 2s
+            if debounce and not self.settings.INSTANT_TP_REFILL:
+                first = self.suspected_filled.get(oid)
+                if first is None:
+                    self.suspected_filled[oid] = now
+                if first is None or now - first < 2.0:
+                    open_buys.set(price, oid, cids[price]) # Restore to map for debounce period
                     continue
-
-            # Old path (with debounce) if INSTANT_TP_REFILL=False
-            first = self.suspected_filled.get(oid)
-            if first is None:
-                self.suspected_filled[oid] = now
-                self.state.open_buy_price_to_id[price] = oid # Restore to map for debounce period
-                continue
-            if now - first < 2.0:
-                self.state.open_buy_price_to_id[price] = oid # Restore to map for debounce period
-                continue
-
-            # Debounce period passed, check status
-            od = self.broker.get_order(oid)
-            if od is None:
-                self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
                 self.suspected_filled.pop(oid, None)
-                continue
+            due.append((price, oid))
 
-            status = str(od.get("status", ""))
-            self.suspected_filled.pop(oid, None)
+        orders, trades = self.broker.lookup_orders([oid for _, oid in due]) if due else ({}, {})
+        filled = 0
+        for price, oid in due:
+            od = orders.get(oid) or {}
+            status = str(od.get("status", "")).upper() if od else "NOT_FOUND"
 
-            if status.upper() == "FILLED":
+            if status == "FILLED":
                 if oid in self.state.handled_fills:
+                    filled += 1
                     continue
                 try:
                     exec_qty = float(od.get("executedQty", "0") or "0")
                 except Exception:
                     exec_qty = 0.0
                 if exec_qty >= max(self.settings.QTY_PER_LADDER, 0.0) * 0.999:
-                    self.on_buy_fill_confirmed(price, self.settings.QTY_PER_LADDER, oid)
+                    self.on_buy_fill_confirmed(price, self.settings.QTY_PER_LADDER, oid, od, trades.get(oid, []))
+                    filled += 1
                 else:
-                    self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
+                    self._suppress(price, now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
                     self.state_manager.log_trade("BUY_PARTIAL_OR_ZERO_EXEC", price, 0.0, 0.0, f"orderId={oid}, executedQty={od.get('executedQty')}")
-            elif status.upper() in ("CANCELED", "EXPIRED", "REJECTED"):
-                self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
+            elif status in ("CANCELED", "EXPIRED", "REJECTED"):
+                self._suppress(price, now + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
                 self.state_manager.log_trade("BUY_CANCELED_OR_EXPIRED", price, 0.0, 0.0, f"orderId={oid}, status={status}")
-            elif status.upper() in ("NOT_FOUND", "UNKNOWN"):
-                self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
-            elif status.upper() in ("NEW", "PARTIALLY_FILLED"):
-                self.state.open_buy_price_to_id[price] = oid # Restore to map
+            elif status in ("NOT_FOUND", "UNKNOWN") and not debounce:
+                # Predicted fill with no answer: the order never left the open list, keep tracking it
+                open_buys.set(price, oid, cids[price])
+            elif status in ("NOT_FOUND", "UNKNOWN"):
+                self._suppress(price, now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
+            elif status in ("NEW", "PARTIALLY_FILLED"):
+                # Order is actually still alive, restore to map
+                open_buys.set(price, oid, cids[price] or str(od.get("clientOrderId") or ""))
             else:
-                self.price_suppress_until[price] = max(self.price_suppress_until.get(price, 0.0), now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
+                self._suppress(price, now + self.settings.SUPPRESS_SEC_ON_UNKNOWN)
                 self.state_manager.log_trade("BUY_UNKNOWN_STATUS_REMOVED", price, 0.0, 0.0, f"orderId={oid}, status={status}")
-        
-        self.state_manager.save_state()
 
+        if filled and self.settings.INSTANT_TP_REFILL:
+            self.request_refill()
+        # TPs acknowledged for new fills must survive a crash
+        self.state_manager.save_state(durable=filled > 0)
 
-    def detect_filled_buys_and_restore(self):
+    def detect_filled_buys_and_restore(self) -> None:
         """Compares local open BUY map against live exchange orders to find vanished orders."""
         if not self.broker or self.settings.DRY_RUN:
             return
         try:
             orders = self.broker.get_open_orders()
         except Exception as e:
-            print(f"[WARN] get_open_orders failed: {e}")
+            log.warning("get_open_orders failed: %s", e)
             return
 
-        live_ids: Set[str] = set()
-        for o in orders:
-            side = str(o.get("side"))
-            st = str(o.get("status", ""))
-            reduce_only = str(o.get("reduceOnly") or o.get("reduce_only") or o.get("reduce_only_flag") or "").lower() in ("true", "1")
-            if side == "BUY" and not reduce_only and st in ("NEW", "PARTIALLY_FILLED"):
-                oid = str(o.get("orderId", ""))
-                live_ids.add(oid)
+        live_ids = orders.buy_ids
 
         vanished = []
         for px, oid in list(self.state.open_buy_price_to_id.items()):
@@ -520,12 +700,12 @@ class GridManager:
                 vanished.append((px, oid))
 
         if vanished:
-            dprint(f"[CHECK] vanished candidates: {vanished}")
+            log.debug("[CHECK] vanished candidates: %s", vanished)
             self.confirm_and_process_vanished(vanished)
 
     # --- Trailing ---
 
-    def reanchor_up_if_needed(self, mid: float):
+    def reanchor_up_if_needed(self, mid: float) -> None:
         """Adjusts the base price upwards if trailing is enabled and conditions are met."""
         if not self.settings.TRAIL_UP:
             return
@@ -541,29 +721,75 @@ class GridManager:
 
         new_base = self.state.base_price + steps_up * self.settings.GRID_STEP_USD
         new_low = new_base - self.settings.GRID_STEP_USD * self.settings.MAX_LADDERS
-
-        cancels = 0
-        for px, oid in sorted(list(self.state.open_buy_price_to_id.items())):
-            if px < new_low:
-                try:
-                    if oid:
-                        self.broker.cancel_order(oid)
-                        dprint(f"[REANCHOR] cancel BUY {oid} at {px} (below new_low {new_low})")
-                except Exception as e:
-                    self.state_manager.log_trade("TRAIL_CANCEL_ERROR", px, 0.0, 0.0, str(e))
-                
+        now = self.clock.time()
+
+        # Only the lowest BUYs below the new range (up to the per-reanchor cap) are stale; the rest stay put
+        current = dict(self.state.open_buy_price_to_id)
+        below = self.state.open_buy_price_to_id.below(new_low)
+        stale = {px for px, _ in below[: self.settings.TRAIL_MAX_CANCEL_PER_REANCHOR]}
+
+        # Levels a stale order may be moved onto: same guards as a fresh placement
+        levels = self.build_grid_candidates(new_base)
+        qty = self.settings.QTY_PER_LADDER
+        est_budget = self.settings.MAX_DAILY_USDT - self.state.spent_today
+        target = {px for px in current if px not in stale}
+        for px in ([] if self.state.HALT_PLACEMENT else levels):
+            if px in current or px in self.state.tp_blocked_entries or self.cooldowns.reason(px, now) is not None:
+                continue
+            est_cost = px * max(qty, self.broker.min_qty)
+            if est_cost > est_budget:
+                continue
+            est_budget -= est_cost
+            target.add(px)
+
+        plan = plan_ladder(current, target, max_place=0)
+        cancel_ids = [oid for _, oid in plan.cancel]
+        cancel_px = {oid: px for px, oid in plan.cancel}
+
+        # Amend in place: one batched request per 5 orders instead of a cancel + place pair each
+        if plan.amend:
+            results = self.broker.modify_buys([(oid, new_px, qty) for oid, _, new_px in plan.amend])
+            for (oid, old_px, new_px), r in zip(plan.amend, results):
+                # Binance keeps the clientOrderId across a modify; the response echoes it
+                cid = self.state.open_buy_price_to_id.client_id_at(old_px)
+                self.state.open_buy_price_to_id.pop(old_px, None)
+                self._suppress(old_px, now + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
+                if not isinstance(r, dict) or "code" in r or not r.get("orderId"):
+                    self.state_manager.log_trade("TRAIL_AMEND_ERROR", new_px, 0.0, 0.0, f"orderId={oid} {r}")
+                    cancel_ids.append(oid)
+                    cancel_px[oid] = old_px
+                    continue
+                new_oid = str(r.get("orderId"))
+                self.state.open_buy_price_to_id.set(new_px, new_oid, str(r.get("clientOrderId") or cid))
+                self.state.spent_today += new_px * max(qty, self.broker.min_qty)
+                self._mark_submitted(new_px, now)
+                log.debug("[REANCHOR] amend BUY %s %s -> %s", oid, old_px, new_px)
+                self.state_manager.log_trade("TRAIL_AMEND", new_px, qty, 0.0, f"orderId={new_oid} from={old_px}")
+
+        gone: List[Tuple[float, str]] = []
+        if cancel_ids:
+            results = self.broker.cancel_orders(cancel_ids)
+            for oid, r in zip(cancel_ids, results):
+                px = cancel_px[oid]
+                if isinstance(r, dict) and "code" in r:
+                    # Usually the order filled under us: confirm it like any vanished BUY
+                    self.state_manager.log_trade("TRAIL_CANCEL_ERROR", px, 0.0, 0.0, str(r.get("msg", r)))
+                    gone.append((px, oid))
+                else:
+                    log.debug("[REANCHOR] cancel BUY %s at %s (below new_low %s)", oid, px, new_low)
                 self.state.open_buy_price_to_id.pop(px, None)
-                self.price_suppress_until[px] = max(self.price_suppress_until.get(px, 0.0), time.time() + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
-                cancels += 1
-                if cancels >= self.settings.TRAIL_MAX_CANCEL_PER_REANCHOR:
-                    break
+                self._suppress(px, now + self.settings.SUPPRESS_SEC_AFTER_CANCEL)
 
         self.state.base_price = new_base
-        self.state_manager.log_trade("REANCHOR_UP", self.state.base_price, 0.0, 0.0, f"steps={steps_up}")
+        self.state_manager.log_trade(
+            "REANCHOR_UP", self.state.base_price, 0.0, 0.0,
+            f"steps={steps_up} amended={len(plan.amend)} canceled={len(cancel_ids)}",
+        )
         send_telegram_message(self.settings, f"↗️ RE-ANCHOR BASE to {self.state.base_price:.0f} (steps {steps_up})")
+        if gone:
+            self.confirm_and_process_vanished(gone)
 
-        self.sync_open_from_exchange_full()
-        levels = self.build_grid_candidates(self.state.base_price)
+        # Local map already reflects the batch results; only levels still missing need new orders
         if not self.state.HALT_PLACEMENT:
             self.place_missing_buys(levels)
-            self.state_manager.save_state()
\ No newline at end of file
+        self.state_manager.save_state(durable=True)
@@ -0,0 +1,145 @@
+"""
+Hedged requests for idempotent exchange reads.
+
+A read goes to the primary host first. If it has not answered within the hedge
+delay, an identical request goes to the next alternate host and the first answer
+wins. The delay is the `percentile` of recent latencies of the same endpoint,
+clamped to [min_sec, max_sec]; only primaries are measured, so duplicates do
+not skew it. If the duplicate is late too, another one follows after the same
+delay, up to `max_hedges`. Slower requests finish in the background. With no
+alternate hosts configured the duplicate goes to the primary on a fresh
+connection, which already avoids a stalled socket.
+
+Only reads are hedged. A duplicated order placement is not idempotent; see
+`Broker._futures_order` for how placements are retried.
+"""
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+
+from gridbot.config.settings import Settings
+from gridbot.core.utils import set_hedger
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# Answers needed before the percentile is trusted; until then the delay is max_sec
+_MIN_SAMPLES = 10
+
+
+class LatencyTracker:
+    """The last `window` latencies (seconds) per endpoint."""
+
+    def __init__(self, window: int = 128):
+        self.window = max(1, window)
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key: str, sec: float) -> None:
+        with self._lock:
+            d = self._samples.get(key)
+            if d is None:
+                d = self._samples[key] = deque(maxlen=self.window)
+            d.append(sec)
+
+    def percentile(self, key: str, q: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            d = self._samples.get(key)
+            if d is None or len(d) < min_samples:
+                return None
+            s = sorted(d)
+        return s[min(len(s) - 1, int(q * len(s)))]
+
+
+class RequestHedger:
+    def __init__(
+        self,
+        hosts: List[str],
+        percentile: float = 0.9,
+        min_sec: float = 0.1,
+        max_sec: float = 1.5,
+        window: int = 128,
+        max_hedges: int = 2,
+        workers: int = 8,
+        send: Callable[..., requests.Response] = requests.request,
+    ):
+        self.hosts = [h.rstrip("/") for h in hosts if h]
+        self.percentile = percentile
+        self.min_sec = min_sec
+        self.max_sec = max(min_sec, max_sec)
+        self.max_hedges = max(1, max_hedges)
+        self.send = send
+        self.latency = LatencyTracker(window)
+        self.hedged = 0  # duplicates sent
+        self.won = 0     # duplicates that answered first
+        self._pool = ThreadPoolExecutor(max_workers=max(2, workers), thread_name_prefix="hedge")
+
+    def delay(self, key: str) -> float:
+        """How long the primary gets before a duplicate is sent."""
+        p = self.latency.percentile(key, self.percentile, _MIN_SAMPLES)
+        return self.max_sec if p is None else min(self.max_sec, max(self.min_sec, p))
+
+    def routes(self, url: str) -> List[str]:
+        """`url` followed by its duplicates: the same request on the alternate hosts in turn, the primary last."""
+        for i, host in enumerate(self.hosts):
+            if url.startswith(host + "/"):
+                rest = url[len(host):]
+                order = self.hosts[i + 1:] + self.hosts[:i + 1]
+                return [url] + [order[k % len(order)] + rest for k in range(self.max_hedges)]
+        return [url] * (self.max_hedges + 1)
+
+    def _timed(self, key: Optional[str], method: str, url: str, kwargs: Dict) -> Tuple[requests.Response, float, float]:
+        t0 = time.time()
+        r = self.send(method, url, **kwargs)
+        t1 = time.time()
+        if key is not None:
+            self.latency.observe(key, t1 - t0)
+        return r, t0, t1
+
+    def request(self, method: str, url: str, **kwargs: Any) -> Tuple[requests.Response, float, float]:
+        """(response, send time, receive time) of the first attempt to answer; raises the last error if none does."""
+        key = f"{method} {urlsplit(url).path}"
+        urls = self.routes(url)
+        delay = self.delay(key)
+        primary = self._pool.submit(self._timed, key, method, urls[0], kwargs)
+        pending = {primary}
+        alternates = iter(urls[1:])
+        error: Optional[BaseException] = None
+        while True:
+            done, pending = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            for f in done:
+                try:
+                    res = f.result()
+                except Exception as e:
+                    error = e
+                    continue
+                if f is not primary:
+                    self.won += 1
+                return res
+            # Primary is late or failed: send the next duplicate
+            nxt = next(alternates, None)
+            if nxt is not None:
+                self.hedged += 1
+                log.debug("[HEDGE] %s after %.0f ms -> %s", key, delay * 1000, urlsplit(nxt).netloc)
+                pending.add(self._pool.submit(self._timed, None, method, nxt, kwargs))
+            elif not pending:
+                raise error if error is not None else requests.exceptions.ConnectionError(f"{key}: no answer")
+
+
+def install_hedging(settings: Settings) -> RequestHedger:
+    """Builds a hedger for the configured hosts and installs it for `request_with_retry(..., hedge=True)`."""
+    alternates = [h.strip() for h in settings.HEDGE_HOSTS.split(",") if h.strip()]
+    hedger = RequestHedger(
+        [settings.FUTURES_HTTP_BASE] + alternates,
+        percentile=settings.HEDGE_PERCENTILE,
+        min_sec=settings.HEDGE_MIN_MS / 1000.0,
+        max_sec=settings.HEDGE_MAX_MS / 1000.0,
+    )
+    set_hedger(hedger)
+    log.info("[HEDGE] idempotent reads hedged across %d host(s)", len(hedger.hosts))
+    return hedger
@@ -0,0 +1,164 @@
+"""
+Streaming market statistics.
+
+`MarketStats.observe` runs once per price message and updates every figure in O(1)
+with fixed memory: time-decayed EWMAs (exact for irregular tick spacing) and
+fixed-size ring buffers with running sums for the rolling windows. Nothing ever
+rescans history.
+"""
+import math
+import time
+from typing import Dict, List, Optional
+
+from gridbot.config.settings import Settings
+
+
+class Ewma:
+    """Mean with time constant `tau` seconds; a sample's weight depends on the time since the last one."""
+
+    __slots__ = ("tau", "value", "ready")
+
+    def __init__(self, tau: float):
+        self.tau = max(tau, 1e-9)
+        self.value = 0.0
+        self.ready = False
+
+    def update(self, x: float, dt: float) -> float:
+        if not self.ready:
+            self.value = x
+            self.ready = True
+        elif dt > 0:
+            self.value += (1.0 - math.exp(-dt / self.tau)) * (x - self.value)
+        return self.value
+
+
+class RollingWindow:
+    """Mean / standard deviation of the last `size` samples (ring buffer + running sums)."""
+
+    __slots__ = ("size", "buf", "pos", "n", "total", "total_sq")
+
+    def __init__(self, size: int):
+        self.size = max(1, size)
+        self.buf: List[float] = [0.0] * self.size
+        self.pos = 0
+        self.n = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def push(self, x: float) -> None:
+        if self.n == self.size:
+            old = self.buf[self.pos]
+            self.total -= old
+            self.total_sq -= old * old
+        else:
+            self.n += 1
+        self.buf[self.pos] = x
+        self.total += x
+        self.total_sq += x * x
+        self.pos += 1
+        if self.pos == self.size:
+            self.pos = 0
+            # Once per lap: drop the rounding drift of the running sums (amortized O(1))
+            self.total = math.fsum(self.buf)
+            self.total_sq = math.fsum(v * v for v in self.buf)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.n if self.n else 0.0
+
+    @property
+    def std(self) -> float:
+        if self.n < 2:
+            return 0.0
+        m = self.total / self.n
+        return math.sqrt(max(0.0, self.total_sq / self.n - m * m))
+
+
+class MarketStats:
+    """
+    Spread, volatility, tick rate and price velocity from the price stream.
+
+    - spread: last tick, EWMA over `STATS_SPREAD_TAU_SEC` (what gating reads) and the
+      mean over the last `STATS_WINDOW` ticks
+    - volatility: EWMA of squared log returns per second, reported in bps per minute,
+      and the std of per-tick returns over the window
+    - tick rate: exponentially decayed tick count over `STATS_TAU_SEC`
+    - velocity: EWMA of signed d(mid)/dt, plus fast/slow EWMAs of its magnitude for
+      the polling scheduler
+    """
+
+    def __init__(self, settings: Settings, fast_tau_sec: float = 3.0, slow_tau_sec: float = 30.0):
+        self.settings = settings
+        tau = settings.STATS_TAU_SEC
+        self.tau_sec = max(tau, 1e-9)
+        self.bid = 0.0
+        self.ask = 0.0
+        self.mid = 0.0
+        self.spread_bps = 0.0
+        self.ticks = 0
+        self.last_ts = 0.0
+        self.spread_ewma = Ewma(settings.STATS_SPREAD_TAU_SEC)
+        self.spread_window = RollingWindow(settings.STATS_WINDOW)
+        self.returns_window = RollingWindow(settings.STATS_WINDOW)  # per-tick log returns, bps
+        self.variance = Ewma(tau)  # squared log return per second
+        self.velocity = Ewma(tau)  # signed USD/sec
+        self.speed_fast = Ewma(fast_tau_sec)  # |USD/sec|
+        self.speed_slow = Ewma(slow_tau_sec)
+        self._rate_count = 0.0
+
+    def observe(self, bid: float, ask: float, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        mid = (bid + ask) / 2.0
+        spread = (ask - bid) / ask * 10000 if ask > 0 else 9999.0
+        dt = now - self.last_ts
+
+        if self.ticks and dt > 0:
+            self._rate_count = self._rate_count * math.exp(-dt / self.tau_sec) + 1.0
+            if mid > 0 and self.mid > 0:
+                r = math.log(mid / self.mid)
+                self.variance.update(r * r / dt, dt)
+                self.returns_window.push(r * 10000)
+            v = (mid - self.mid) / dt
+            self.velocity.update(v, dt)
+            self.speed_fast.update(abs(v), dt)
+            self.speed_slow.update(abs(v), dt)
+        elif not self.ticks:
+            self._rate_count = 1.0
+
+        self.spread_ewma.update(spread, dt if self.ticks else 0.0)
+        self.spread_window.push(spread)
+        self.bid, self.ask, self.mid, self.spread_bps = bid, ask, mid, spread
+        self.last_ts = now
+        self.ticks += 1
+
+    # --- Derived values ---
+
+    @property
+    def spread_avg_bps(self) -> float:
+        """Smoothed spread: a single wide or tight tick barely moves it."""
+        return self.spread_ewma.value
+
+    @property
+    def volatility_bps(self) -> float:
+        """Mid volatility in bps per sqrt(minute)."""
+        return math.sqrt(max(self.variance.value, 0.0) * 60.0) * 10000
+
+    @property
+    def tick_rate(self) -> float:
+        """Price messages per second."""
+        return self._rate_count / self.tau_sec
+
+    def speed_steps(self) -> float:
+        """|d mid|/dt in grid steps per second; the fast average catches sudden moves, the slow one recent activity."""
+        return max(self.speed_fast.value, self.speed_slow.value) / max(self.settings.GRID_STEP_USD, 1e-12)
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "spread_bps": round(self.spread_bps, 3),
+            "spread_avg_bps": round(self.spread_avg_bps, 3),
+            "spread_window_bps": round(self.spread_window.mean, 3),
+            "volatility_bps": round(self.volatility_bps, 3),
+            "return_std_bps": round(self.returns_window.std, 3),
+            "tick_rate": round(self.tick_rate, 3),
+            "velocity": round(self.velocity.value, 6),
+        }
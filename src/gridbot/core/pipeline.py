@@ -0,0 +1,99 @@
+"""
+Pipelined order submission.
+
+`OrderPipeline` keeps up to `depth` placements in flight at once, each keyed by
+its clientOrderId. The caller generates the id and reconciles each outcome
+(an acknowledgement or an error) on its own thread, in completion order. The
+network round trip runs on the pool. A placement that times out is not sent
+again blindly. `Broker._futures_order` looks the clientOrderId up first and only
+resubmits if the exchange has never seen it.
+
+Sends are also bounded by the exchange's order-count limit: at most `rate_10s`
+placements in any 10 s window. With `depth` 1 each call runs inline on the
+caller's thread, which keeps the stress harness and replays deterministic.
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import functools
+import queue
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from gridbot.core.clock import WALL, Clock
+
+# (clientOrderId, caller's key, exchange answer or None, error or None)
+Outcome = Tuple[str, Any, Optional[Dict], Optional[BaseException]]
+
+RATE_WINDOW_SEC = 10.0
+
+
+class OrderPipeline:
+    def __init__(self, depth: int = 4, rate_10s: int = 250, clock: Clock = WALL):
+        self.depth = max(1, depth)
+        self.rate_10s = max(1, rate_10s)
+        self.clock = clock
+        self.inflight: Dict[str, Tuple[Any, float]] = {}  # clientOrderId -> (key, sent at)
+        self.sent = 0
+        self._sent_at: Deque[float] = deque()
+        self._done: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._pool = ThreadPoolExecutor(self.depth, thread_name_prefix="orders") if self.depth > 1 else None
+
+    def submit(self, cid: str, key: Any, fn: Callable[..., Dict], *args: Any, **kwargs: Any) -> List[Outcome]:
+        """Sends `fn(*args, **kwargs)` for order `cid`; returns the outcomes that completed meanwhile."""
+        if cid in self.inflight:
+            raise ValueError(f"clientOrderId {cid} is already in flight")
+        out: List[Outcome] = []
+        while len(self.inflight) >= self.depth:
+            out.append(self._reap(block=True))
+        self._throttle()
+        self.inflight[cid] = (key, self.clock.time())
+        self.sent += 1
+        if self._pool is None:
+            try:
+                res, err = fn(*args, **kwargs), None
+            except Exception as e:
+                res, err = None, e
+            del self.inflight[cid]
+            return out + [(cid, key, res, err)]
+        fut = self._pool.submit(fn, *args, **kwargs)
+        fut.add_done_callback(functools.partial(self._finished, cid))
+        return out + self.poll()
+
+    def _finished(self, cid: str, fut: Future) -> None:
+        self._done.put((cid, fut))
+
+    def poll(self) -> List[Outcome]:
+        """Outcomes that have completed, without waiting."""
+        out = []
+        while True:
+            try:
+                out.append(self._reap(block=False))
+            except queue.Empty:
+                return out
+
+    def drain(self) -> List[Outcome]:
+        """Waits for every order in flight and returns their outcomes."""
+        out = []
+        while self.inflight:
+            out.append(self._reap(block=True))
+        return out
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+
+    def _reap(self, block: bool) -> Outcome:
+        cid, fut = self._done.get(block=block)
+        key, _ = self.inflight.pop(cid)
+        err = fut.exception()
+        return cid, key, None if err is not None else fut.result(), err
+
+    def _throttle(self) -> None:
+        # Sliding window: the oldest send must leave it before another goes out
+        now = self.clock.time()
+        while self._sent_at and now - self._sent_at[0] >= RATE_WINDOW_SEC:
+            self._sent_at.popleft()
+        if len(self._sent_at) >= self.rate_10s:
+            self.clock.sleep(self._sent_at[0] + RATE_WINDOW_SEC - now)
+            self._sent_at.popleft()
+            now = self.clock.time()
+        self._sent_at.append(now)
@@ -0,0 +1,87 @@
+import math
+import time
+from typing import Optional
+
+from gridbot.config.settings import Settings
+from gridbot.core.marketstats import MarketStats
+from gridbot.core.utils import used_weight_ratio
+
+
+class PollScheduler:
+    """
+    Chooses REST polling intervals from market context.
+
+    The key quantity is the expected time until price can reach our nearest resting
+    level: distance in grid steps divided by recent price speed in steps/sec. We poll
+    a few times within that horizon (`POLL_LOOKAHEAD`), never faster than the base
+    refresh and never slower than `POLL_MAX_SEC`, and back off further as the
+    exchange's used request weight approaches the limit. Price speed comes from the
+    shared `MarketStats` engine, which the processor feeds with every price message.
+    """
+
+    def __init__(self, settings: Settings, stats: Optional[MarketStats] = None):
+        self.settings = settings
+        self.stats = stats or MarketStats(settings)
+        self.min_sec = max(0.1, settings.PRICE_REFRESH_SEC)
+        self.max_sec = max(self.min_sec, settings.POLL_MAX_SEC)
+        self.distance = math.inf  # grid steps to nearest BUY/TP
+        self.urgent = True
+        self.book_live = False  # a live BookMirror watches our levels; the sweep is only a backstop
+        self._last_orders_poll = 0.0
+
+    @property
+    def speed(self) -> float:
+        """|d mid| / dt in grid steps per second (max of fast/slow EWMA)."""
+        return self.stats.speed_steps()
+
+    # --- Inputs ---
+
+    def observe_price(self, bid: float, ask: float, now: Optional[float] = None) -> None:
+        self.stats.observe(bid, ask, now)
+
+    def update_levels(self, highest_buy: Optional[float], lowest_tp: Optional[float], urgent: bool = False) -> None:
+        """A BUY fills when ask drops to it, a TP when bid rises to it. `urgent` -> ladder has room to fill."""
+        if not self.stats.ticks:
+            self.distance = math.inf
+        else:
+            step = max(self.settings.GRID_STEP_USD, 1e-12)
+            d = math.inf
+            if highest_buy is not None:
+                d = min(d, max(0.0, self.stats.ask - highest_buy) / step)
+            if lowest_tp is not None:
+                d = min(d, max(0.0, lowest_tp - self.stats.bid) / step)
+            self.distance = d
+        self.urgent = urgent
+
+    # --- Outputs ---
+
+    def _interval(self) -> float:
+        if self.urgent or self.distance <= 0:
+            base = self.min_sec
+        elif math.isinf(self.distance):
+            base = self.max_sec
+        else:
+            # A floor on speed keeps a dead-quiet market from looking infinitely far away
+            eta = self.distance / max(self.speed, 0.01)
+            base = eta * self.settings.POLL_LOOKAHEAD
+        used = used_weight_ratio()
+        if used > 0.8:
+            base *= 1.0 + (used - 0.8) * 20.0  # x5 at the limit
+        return max(self.min_sec, min(self.max_sec, base))
+
+    def price_interval(self) -> float:
+        if not self.settings.ADAPTIVE_POLL:
+            return self.min_sec
+        return self._interval()
+
+    def orders_due(self, now: Optional[float] = None) -> bool:
+        if not self.settings.ADAPTIVE_POLL:
+            return True
+        now = time.time() if now is None else now
+        interval = self._interval()
+        if self.book_live and not self.urgent:
+            interval = max(interval, self.settings.BOOK_POLL_SEC)
+        return now - self._last_orders_poll >= interval
+
+    def mark_orders_polled(self, now: Optional[float] = None) -> None:
+        self._last_orders_poll = time.time() if now is None else now
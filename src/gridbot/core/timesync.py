@@ -0,0 +1,190 @@
+from collections import deque
+import email.utils
+import math
+import threading
+import time
+from typing import Deque, Optional, Tuple
+
+from gridbot.config.settings import Settings
+from gridbot.core.utils import set_time_estimator, timed_request
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+# One sample: (local midpoint ms, offset ms, round-trip ms)
+Sample = Tuple[float, float, float]
+
+
+class ServerClock:
+    """
+    Continuous server-clock offset estimator (NTP-style).
+
+    Each `/time` probe is timestamped locally before and after the request. The
+    server time is assumed to be taken at the midpoint, so the offset error of a
+    sample is bounded by half its round-trip. From a sliding window we keep the
+    lowest-RTT sample as the offset anchor (clock filter) and fit a linear skew
+    over the low-RTT half, so `offset_ms()` stays accurate between probes.
+    """
+
+    def __init__(
+        self,
+        futures_base_url: str,
+        window: int = 32,
+        max_drift_ppm: float = 100.0,
+        min_recv_window_ms: int = 1000,
+        max_recv_window_ms: int = 5000,
+    ):
+        self.futures_base_url = futures_base_url
+        self.samples: Deque[Sample] = deque(maxlen=max(4, window))
+        self.max_drift_ppm = max_drift_ppm
+        self.min_recv_window_ms = min_recv_window_ms
+        self.max_recv_window_ms = max_recv_window_ms
+        self.skew = 0.0  # ms of offset change per ms of local time
+        self._anchor: Optional[Sample] = None
+        self._lock = threading.Lock()
+        self._resync = threading.Event()
+
+    # --- Sampling ---
+
+    def _fetch_server_time(self) -> Tuple[float, float, float]:
+        """Returns (local_send_ms, server_ms, local_recv_ms) for one `/time` probe."""
+        # Hedged like the other reads; the times are those of the attempt that answered
+        r, t0, t1 = timed_request("GET", f"{self.futures_base_url}/time", hedge=True, timeout=5)
+        r.raise_for_status()
+        return t0, float(r.json()["serverTime"]), t1
+
+    def add_sample(self, t0_ms: float, server_ms: float, t1_ms: float) -> None:
+        """Records one probe and refreshes the filtered estimate."""
+        rtt = max(0.0, t1_ms - t0_ms)
+        mid = (t0_ms + t1_ms) / 2.0
+        offset = server_ms - mid
+        with self._lock:
+            # Sample inconsistent with the current estimate beyond both error bounds -> local clock was stepped
+            anchor, skew = self._anchor, self.skew
+            if anchor is not None:
+                jump = offset - self._offset_at(anchor, skew, mid)
+                if abs(jump) > rtt / 2.0 + self._error_at(anchor, mid) + 1.0:
+                    log.debug("[TIME] clock step detected (%+.1f ms); resetting filter", jump)
+                    self.samples.clear()
+            self.samples.append((mid, offset, rtt))
+            self._refit()
+
+    def _refit(self) -> None:
+        samples = list(self.samples)
+        self._anchor = min(samples, key=lambda s: s[2])
+
+        # Skew from the low-RTT half only; high-RTT samples carry asymmetric delay noise
+        rtts = sorted(s[2] for s in samples)
+        cutoff = rtts[len(rtts) // 2]
+        good = [s for s in samples if s[2] <= cutoff]
+        if len(good) < 3 or good[-1][0] - good[0][0] < 60_000:
+            self.skew = 0.0
+            return
+        n = float(len(good))
+        mx = sum(s[0] for s in good) / n
+        my = sum(s[1] for s in good) / n
+        sxx = sum((s[0] - mx) ** 2 for s in good)
+        if sxx <= 0:
+            self.skew = 0.0
+            return
+        skew = sum((s[0] - mx) * (s[1] - my) for s in good) / sxx
+        # Anything beyond the drift bound is noise, not oscillator drift
+        bound = self.max_drift_ppm * 1e-6
+        self.skew = max(-bound, min(bound, skew))
+
+    def sample_once(self) -> bool:
+        try:
+            t0, server, t1 = self._fetch_server_time()
+        except Exception as e:
+            log.debug("[TIME] probe failed: %s", e)
+            return False
+        self.add_sample(t0, server, t1)
+        return True
+
+    def sync(self, probes: int = 5) -> bool:
+        """Takes a short burst of probes so the filter has a low-RTT anchor to start from."""
+        ok = False
+        for _ in range(max(1, probes)):
+            ok = self.sample_once() or ok
+        if ok:
+            log.info("[TIME] server-local offset: %.1f ms (±%.1f ms)", self.offset_ms(), self.error_ms())
+        else:
+            log.warning("time sync failed")
+        return ok
+
+    def observe_date_header(self, date_header: Optional[str], t0_ms: float, t1_ms: float) -> None:
+        """
+        Cheap consistency check from an HTTP `Date` header (1 s resolution).
+        If the estimate falls outside the interval the header allows, request an immediate re-probe.
+        """
+        if not date_header or self._anchor is None:
+            return
+        try:
+            server_s = email.utils.parsedate_to_datetime(date_header).timestamp()
+        except Exception:
+            return
+        lo = server_s * 1000.0 - t1_ms
+        hi = (server_s + 1.0) * 1000.0 - t0_ms
+        est = self.offset_ms((t0_ms + t1_ms) / 2.0)
+        if not (lo - self.error_ms() <= est <= hi + self.error_ms()):
+            log.debug("[TIME] Date header disagrees with offset %.0f ms (allowed %.0f..%.0f); resync", est, lo, hi)
+            self._resync.set()
+
+    # --- Estimates ---
+
+    def _offset_at(self, anchor: Sample, skew: float, local_ms: float) -> float:
+        return anchor[1] + skew * (local_ms - anchor[0])
+
+    def _error_at(self, anchor: Sample, local_ms: float) -> float:
+        return anchor[2] / 2.0 + abs(local_ms - anchor[0]) * self.max_drift_ppm * 1e-6
+
+    def offset_ms(self, local_ms: Optional[float] = None) -> float:
+        # Anchor and skew are refitted together; read them as a pair
+        with self._lock:
+            anchor, skew = self._anchor, self.skew
+        if anchor is None:
+            return 0.0
+        if local_ms is None:
+            local_ms = time.time() * 1000.0
+        return self._offset_at(anchor, skew, local_ms)
+
+    def error_ms(self, local_ms: Optional[float] = None) -> float:
+        """Upper bound on |offset error|: half the anchor RTT plus worst-case drift since it was taken."""
+        with self._lock:
+            anchor = self._anchor
+        if anchor is None:
+            return math.inf
+        if local_ms is None:
+            local_ms = time.time() * 1000.0
+        return self._error_at(anchor, local_ms)
+
+    def recv_window_ms(self) -> int:
+        """recvWindow that covers the clock error plus network slack, clamped to configured bounds."""
+        err = self.error_ms()
+        if math.isinf(err):
+            return self.max_recv_window_ms
+        want = int(math.ceil(self.min_recv_window_ms + 2.0 * err))
+        return max(self.min_recv_window_ms, min(self.max_recv_window_ms, want))
+
+    # --- Background thread ---
+
+    def run(self, stop_evt: threading.Event, interval_sec: float = 30.0) -> None:
+        """Thread function: probes every `interval_sec`, or sooner when a resync is requested."""
+        while not stop_evt.is_set():
+            self._resync.wait(timeout=max(1.0, interval_sec))
+            self._resync.clear()
+            if stop_evt.is_set():
+                break
+            self.sample_once()
+
+
+def sync_server_time(settings: Settings, probes: int = 5) -> ServerClock:
+    """Builds an estimator, runs the initial probe burst and installs it as the source for `ts_ms()`."""
+    clock = ServerClock(
+        settings.FUTURES_BASE_URL,
+        min_recv_window_ms=settings.RECV_WINDOW_MIN_MS,
+        max_recv_window_ms=settings.RECV_WINDOW_MS,
+    )
+    clock.sync(probes)
+    set_time_estimator(clock)
+    return clock
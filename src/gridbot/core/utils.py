@@ -1,40 +1,59 @@
+from decimal import ROUND_CEILING, ROUND_DOWN, Decimal
 import time
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
+
 import requests
-from typing import Tuple
-from decimal import Decimal, ROUND_DOWN, ROUND_CEILING
-
-# Global time offset for server time synchronization
-_time_offset_ms = 0
-_DEBUG_VERBOSE = True # Will be set by main
-
-def set_debug_verbose(verbose: bool):
-    global _DEBUG_VERBOSE
-    _DEBUG_VERBOSE = verbose
-
-def dprint(msg: str):
-    if _DEBUG_VERBOSE:
-        print(msg)
-
-def ts_ms() -> int:
-    """Returns current Unix timestamp in milliseconds, adjusted by server time offset."""
-    return int(time.time() * 1000 + _time_offset_ms)
-
-def sync_server_time(futures_base_url: str):
-    """Synchronizes local time with Binance server time."""
-    global _time_offset_ms
-    try:
-        r = requests.get(f"{futures_base_url}/time", timeout=5)
-        r.raise_for_status()
-        server_time = int(r.json().get("serverTime", 0))
-        _time_offset_ms = server_time - int(time.time() * 1000)
-        print(f"[TIME] server-local offset: {_time_offset_ms} ms")
-    except Exception as e:
-        print(f"[WARN] time sync failed: {e}")
+
+from gridbot.utils.logger import get_logger
+
+if TYPE_CHECKING:
+    from gridbot.core.hedge import RequestHedger
+    from gridbot.core.timesync import ServerClock
+
+log = get_logger(__name__)
+
+# Server time estimator (see gridbot.core.timesync); None -> no offset applied
+_time_estimator: Optional["ServerClock"] = None
+_DEFAULT_RECV_WINDOW_MS = 5000
+# Hedging policy for idempotent reads (see gridbot.core.hedge); None -> plain requests
+_hedger: Optional["RequestHedger"] = None
+# Request weight reported by the exchange (X-MBX-USED-WEIGHT-1M) and the per-minute limit
+_used_weight_1m = 0
+_weight_limit_1m = 2400
+
+def set_time_estimator(estimator: Optional["ServerClock"]) -> None:
+    global _time_estimator
+    _time_estimator = estimator
+
+def set_hedger(hedger: Optional["RequestHedger"]) -> None:
+    global _hedger
+    _hedger = hedger
+
+def ts_ms(now: Optional[float] = None) -> int:
+    """Returns current (or `now`'s) Unix timestamp in milliseconds, adjusted by the estimated server time offset."""
+    now_ms = (time.time() if now is None else now) * 1000
+    if _time_estimator is None:
+        return int(now_ms)
+    return int(now_ms + _time_estimator.offset_ms(now_ms))
+
+def set_weight_limit(limit_1m: int) -> None:
+    global _weight_limit_1m
+    _weight_limit_1m = max(1, int(limit_1m))
+
+def used_weight_ratio() -> float:
+    """Fraction of the per-minute request weight already used, as last reported by the exchange."""
+    return _used_weight_1m / _weight_limit_1m
+
+def recv_window_ms() -> int:
+    """recvWindow for signed requests, sized from the current clock error estimate."""
+    if _time_estimator is None:
+        return _DEFAULT_RECV_WINDOW_MS
+    return _time_estimator.recv_window_ms()
 
 def _decimal_places(step: float) -> int:
     """Calculates the number of decimal places in a float step."""
-    ds = Decimal(str(step)).normalize()
-    return -ds.as_tuple().exponent if ds.as_tuple().exponent < 0 else 0
+    exp = int(Decimal(str(step)).normalize().as_tuple().exponent)
+    return -exp if exp < 0 else 0
 
 def format_step(x: float, step: float) -> str:
     """Formats a float to align with a given step size (e.g., price or quantity precision)."""
@@ -58,26 +77,53 @@ def align_to_grid(mid: float, step: float) -> float:
     # Use ROUND_CEILING to ensure the base price is always above the mid-price
     return float(((dm / ds).to_integral_value(rounding=ROUND_CEILING)) * ds)
 
-def request_with_retry(method: str, url: str, *, headers=None, data=None, params=None, timeout=5.0, retries=3):
-    """Performs an HTTP request with exponential backoff retry logic."""
+def timed_request(
+    method: str, url: str, *, hedge: bool = False, **kwargs: Any
+) -> Tuple[requests.Response, float, float]:
+    """
+    One HTTP attempt: (response, send ms, receive ms). `hedge=True` marks an idempotent read
+    that may be hedged; duplicates cost request weight, so they stop near the weight limit.
+    """
+    if hedge and _hedger is not None and used_weight_ratio() < 0.8:
+        r, t0, t1 = _hedger.request(method, url, **kwargs)
+        return r, t0 * 1000, t1 * 1000
+    t0 = time.time() * 1000
+    r = requests.request(method, url, **kwargs)
+    return r, t0, time.time() * 1000
+
+def request_with_retry(
+    method: str, url: str, *, headers: Optional[Dict[str, str]] = None, data: Union[bytes, str, None] = None,
+    params: Optional[Dict[str, Any]] = None, timeout: float = 5.0, retries: int = 3, hedge: bool = False,
+) -> requests.Response:
+    """Performs an HTTP request with exponential backoff retry logic; `hedge` as in `timed_request`."""
+    global _used_weight_1m
     delay = 0.5
     for i in range(retries):
         try:
-            r = requests.request(method, url, headers=headers, data=data, params=params, timeout=timeout)
+            r, t0, t1 = timed_request(
+                method, url, hedge=hedge, headers=headers, data=data, params=params, timeout=timeout
+            )
+            if _time_estimator is not None:
+                _time_estimator.observe_date_header(r.headers.get("Date"), t0, t1)
+            w = r.headers.get("X-MBX-USED-WEIGHT-1M") or r.headers.get("X-MBX-USED-WEIGHT-1m")
+            if w is not None and str(w).isdigit():
+                _used_weight_1m = int(w)
             r.raise_for_status()
             return r
         except requests.exceptions.HTTPError as e:
-            dprint(f"[WARN] HTTP Error {e.response.status_code} on {url} (Attempt {i+1}/{retries})")
+            status = e.response.status_code if e.response is not None else "?"
+            log.debug("HTTP Error %s on %s (Attempt %d/%d)", status, url, i + 1, retries)
             if i == retries - 1:
                 raise
             time.sleep(delay)
             delay = min(delay * 2, 8.0)
         except requests.exceptions.RequestException as e:
-            dprint(f"[WARN] Request Error on {url}: {e} (Attempt {i+1}/{retries})")
+            log.debug("Request Error on %s: %s (Attempt %d/%d)", url, e, i + 1, retries)
             if i == retries - 1:
                 raise
             time.sleep(delay)
             delay = min(delay * 2, 8.0)
+    raise ValueError(f"request_with_retry needs retries >= 1, got {retries}")
 
 def sanitize_tag(tag: str, max_len: int = 6) -> str:
     """Sanitizes a session tag for use in client order IDs."""
@@ -0,0 +1,202 @@
+"""
+Shared-memory price feed: one process polls the book ticker and publishes ticks into a
+memory-mapped ring buffer; any number of bot processes on the same host read it.
+
+    python -m gridbot.feed                       # path from PRICE_FEED_PATH or /dev/shm default
+    PRICE_FEED_PATH=/dev/shm/gridbot-SOLUSDT.feed python -m gridbot   # bot consumes the feed
+
+Layout (little endian):
+    header  : magic u32 | version u32 | capacity u32 | record u32 | symbol 16s | last_seq u64
+    records : seq u64 | ts f64 | bid f64 | ask f64 | mid f64 | seq u64   (x capacity)
+
+The writer fills a record, stamping its sequence number at both ends, then publishes
+`last_seq` in the header. A reader unpacks a record straight from the mapping and accepts
+it only if both stamps equal the sequence it expects, so a torn read is detected
+rather than returned.
+"""
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+from typing import Optional, Tuple
+
+from gridbot.config.settings import Settings, load_settings
+from gridbot.core.clock import WALL, Clock
+from gridbot.price import PriceMessage, get_book_full
+from gridbot.ticks import TickRecorder
+from gridbot.utils.logger import get_logger, setup_logger, shutdown_logger
+
+log = get_logger(__name__)
+
+MAGIC = 0x47424644  # "GBFD"
+VERSION = 1
+_HEADER = struct.Struct("<IIII16sQ")
+_RECORD = struct.Struct("<QddddQ")
+_SEQ_OFF = _HEADER.size - 8
+
+
+def default_feed_path(symbol: str) -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else "."
+    return os.path.join(base, f"gridbot-{symbol.upper()}.feed")
+
+
+class FeedWriter:
+    def __init__(self, path: str, symbol: str, capacity: int = 4096):
+        self.path = path
+        self.capacity = capacity
+        size = _HEADER.size + capacity * _RECORD.size
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.ftruncate(fd, size)
+            self._mm = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        # Continue the sequence of an existing compatible feed so readers don't see it go backwards
+        magic, version, cap, rec, sym, last = _HEADER.unpack_from(self._mm, 0)
+        same = magic == MAGIC and version == VERSION and cap == capacity and rec == _RECORD.size
+        self.seq = last if same and sym.rstrip(b"\0") == symbol.encode() else 0
+        _HEADER.pack_into(self._mm, 0, MAGIC, VERSION, capacity, _RECORD.size, symbol.encode()[:16], self.seq)
+
+    def publish(self, bid: float, ask: float, ts: Optional[float] = None) -> int:
+        seq = self.seq + 1
+        off = _HEADER.size + (seq % self.capacity) * _RECORD.size
+        _RECORD.pack_into(self._mm, off, seq, time.time() if ts is None else ts, bid, ask, (bid + ask) / 2.0, seq)
+        struct.pack_into("<Q", self._mm, _SEQ_OFF, seq)
+        self.seq = seq
+        return seq
+
+    def close(self) -> None:
+        self._mm.close()
+
+
+class FeedReader:
+    """
+    Reads the ring in place. Exposes `get(timeout)` with `queue.Queue` semantics so
+    `processor_loop` can use it instead of the in-process price queue; it returns the
+    newest tick (older unread ticks are conflated) and raises `queue.Empty` on timeout
+    or when the feed is stale.
+    """
+
+    def __init__(self, path: str, symbol: str, stale_sec: float = 5.0, poll_sec: float = 0.005, clock: Clock = WALL):
+        self.path = path
+        self.clock = clock
+        self.symbol = symbol.encode()
+        self.stale_sec = stale_sec
+        self.poll_sec = poll_sec
+        self.last_seq = 0
+        self.dropped = 0
+        self.stale = False
+        self._mm: Optional[mmap.mmap] = None
+        self.capacity = 0
+
+    def _open(self) -> Optional[mmap.mmap]:
+        if self._mm is not None:
+            return self._mm
+        try:
+            with open(self.path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+        magic, version, cap, rec, sym, _ = _HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION or rec != _RECORD.size or sym.rstrip(b"\0") != self.symbol:
+            mm.close()
+            log.warning("[FEED] %s is not a %s feed", self.path, self.symbol.decode())
+            return None
+        self._mm, self.capacity = mm, cap
+        return mm
+
+    def head(self) -> int:
+        mm = self._open()
+        if mm is None:
+            return 0
+        return int(struct.unpack_from("<Q", mm, _SEQ_OFF)[0])
+
+    def read(self, seq: int) -> Optional[Tuple[float, float, float, float]]:
+        """(ts, bid, ask, mid) of record `seq`, or None if it was overwritten or is mid-write."""
+        if self._mm is None:
+            return None
+        off = _HEADER.size + (seq % self.capacity) * _RECORD.size
+        s0, ts, bid, ask, mid, s1 = _RECORD.unpack_from(self._mm, off)
+        if s0 != seq or s1 != seq:
+            return None
+        return ts, bid, ask, mid
+
+    def latest(self) -> Optional[Tuple[int, float, float, float, float]]:
+        for _ in range(3):
+            seq = self.head()
+            if seq == 0:
+                return None
+            rec = self.read(seq)
+            if rec is not None:
+                return (seq,) + rec
+        return None
+
+    def get(self, timeout: float = 0.6) -> PriceMessage:
+        deadline = self.clock.time() + timeout
+        while True:
+            rec = self.latest()
+            if rec is not None and rec[0] != self.last_seq:
+                seq, ts, bid, ask, mid = rec
+                if self.last_seq and seq - self.last_seq > 1:
+                    self.dropped += seq - self.last_seq - 1
+                self.last_seq = seq
+                if self.clock.time() - ts > self.stale_sec:
+                    self._mark_stale(ts)
+                    raise queue.Empty
+                if self.stale:
+                    log.info("[FEED] feed recovered")
+                    self.stale = False
+                return bid, ask, mid
+            if rec is not None and self.clock.time() - rec[1] > self.stale_sec:
+                self._mark_stale(rec[1])
+            left = deadline - self.clock.time()
+            if left <= 0:
+                raise queue.Empty
+            self.clock.sleep(min(self.poll_sec, left))
+
+    def _mark_stale(self, ts: float) -> None:
+        if not self.stale:
+            log.warning("[FEED] stale: last tick %.1fs ago (%s)", self.clock.time() - ts, self.path)
+            self.stale = True
+
+
+def run_feed(settings: Settings, path: str, stop_evt: threading.Event) -> None:
+    """Feed process main loop: poll the book ticker and publish every tick."""
+    writer = FeedWriter(path, settings.SYMBOL)
+    recorder = TickRecorder(settings.TICK_RECORD_DIR, settings.SYMBOL) if settings.TICK_RECORD_DIR else None
+    log.info("[FEED] publishing %s to %s", settings.SYMBOL, path)
+    try:
+        while not stop_evt.is_set():
+            try:
+                bid, ask, exch_ms, update_id = get_book_full(settings)
+                writer.publish(bid, ask)
+                if recorder:
+                    recorder.append(bid, ask, exch_ms, update_id)
+            except Exception as e:
+                log.warning("[FEED] price fetch failed: %s", e)
+            time.sleep(max(0.1, settings.PRICE_REFRESH_SEC))
+    finally:
+        writer.close()
+        if recorder:
+            recorder.close()
+
+
+def main() -> int:
+    settings = load_settings()
+    setup_logger(settings.LOG_LEVEL, rate_period=settings.LOG_RATE_PERIOD_SEC, rate_burst=settings.LOG_RATE_BURST)
+    path = settings.PRICE_FEED_PATH or default_feed_path(settings.SYMBOL)
+    stop_evt = threading.Event()
+    try:
+        run_feed(settings, path, stop_evt)
+    except KeyboardInterrupt:
+        stop_evt.set()
+    finally:
+        shutdown_logger()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
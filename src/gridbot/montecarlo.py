@@ -0,0 +1,329 @@
+"""
+Monte Carlo exposure simulator for ladder configurations.
+
+    python -m gridbot.montecarlo --paths 100000 --days 1 --vol 0.05
+    python -m gridbot.montecarlo --ticks ticks/ --paths 20000 --json
+
+Runs the ladder / TP / trailing rules over many synthetic price paths at once and
+reports the distributions of peak notional, open lots, realized PnL and time spent
+at MAX_OPEN_TRADES. The configuration (MAX_LADDERS, MAX_OPEN_TRADES, QTY_PER_LADDER,
+GRID_STEP_USD, TAKE_PROFIT_USD, TRAIL_UP, MAX_DAILY_USDT, MAKER_FEE) comes from the
+environment like the bot's. Paths are GBM, or block-bootstrapped from recorded ticks
+(`gridbot.ticks`); both are generated one step at a time, so memory is O(paths)
+whatever the horizon.
+
+Each path's grid is a 64-bit mask over the levels below its base (bit j is the level
+j+1 steps under it). A step compares every path's price with its next TP, top BUY and
+trail threshold, and only the paths that reach one are updated, with bit operations
+over those rows. Per step, in the processor's order:
+- exits: lots whose TP the price reached close (maker fee on both legs);
+- trail: the base moves up to the grid-aligned price (TRAIL_UP), lots shift deeper;
+- ladder: BUYs rest on the nearest levels without a lot, up to MAX_LADDERS, to
+  MAX_OPEN_TRADES minus open lots, and to what the day's budget still affords;
+- fills: BUYs at or above the price become lots and are charged to the day.
+Not modelled: latency, cooldowns, partial fills and the spread (the mid trades).
+"""
+import argparse
+import json
+import math
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from gridbot.config.settings import Settings, load_settings
+from gridbot.ticks import TickSegment, list_segments
+
+_BITS = 64
+_ONE = np.uint64(1)
+# _LOW[d]: bits 0 .. d-1 (the d levels nearest the base)
+_LOW = np.array([(1 << d) - 1 for d in range(_BITS + 1)], dtype=np.uint64)
+# _POS[k]: bits whose index has bit k set; sum(2**k * popcount(x & _POS[k])) = sum of set bit indices
+_POS = [np.uint64(sum(1 << j for j in range(_BITS) if j >> k & 1)) for k in range(6)]
+
+
+def _popcount_swar(x: np.ndarray) -> np.ndarray:
+    x = x - ((x >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    x = (x & np.uint64(0x3333333333333333)) + ((x >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    x = (x + (x >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    counts: np.ndarray = (x * np.uint64(0x0101010101010101)) >> np.uint64(56)
+    return counts
+
+
+# numpy < 2.0 has no bitwise_count
+_popcount: Callable[[np.ndarray], np.ndarray] = getattr(np, "bitwise_count", _popcount_swar)
+
+
+def _count(x: np.ndarray) -> np.ndarray:
+    return _popcount(x).astype(np.int64)
+
+
+def _index_sum(x: np.ndarray) -> np.ndarray:
+    """Sum of the set bit indices of each mask."""
+    return sum((_count(x & m) << k for k, m in enumerate(_POS)), np.zeros(x.shape, dtype=np.int64))
+
+
+def _below(mask_depth: np.ndarray) -> np.ndarray:
+    """Masks of the first `mask_depth` levels (clipped to 0..64)."""
+    masks: np.ndarray = _LOW[np.clip(mask_depth, 0, _BITS)]
+    return masks
+
+
+# ===== Price paths =====
+
+def gbm_paths(n_paths: int, steps: int, s0: float, daily_vol: float, steps_per_day: float,
+              daily_drift: float = 0.0, seed: Optional[int] = None) -> Iterator[np.ndarray]:
+    """`steps + 1` price vectors (one entry per path), starting at `s0`."""
+    rng = np.random.default_rng(seed)
+    dt = 1.0 / steps_per_day
+    mu = (daily_drift - 0.5 * daily_vol ** 2) * dt
+    sigma = daily_vol * math.sqrt(dt)
+    log_px = np.full(n_paths, math.log(s0))
+    yield np.exp(log_px)
+    for _ in range(steps):
+        log_px += mu + sigma * rng.standard_normal(n_paths)
+        yield np.exp(log_px)
+
+
+def tick_returns(directory: str, symbol: str, step_sec: float) -> np.ndarray:
+    """Log returns of the recorded mid sampled every `step_sec` (last tick of each step)."""
+    times: List[np.ndarray] = []
+    mids: List[np.ndarray] = []
+    for path in list_segments(directory, symbol):
+        seg = TickSegment(path)
+        try:
+            rec = seg.to_numpy()
+            ms = rec["exchange_ms"].astype(np.float64)
+            # Ticks without an exchange timestamp fall back to the local monotonic clock
+            ms = np.where(ms > 0, ms, rec["mono_ns"] / 1e6)
+            times.append(ms / 1000.0)
+            mids.append((rec["bid"] + rec["ask"]) / 2.0)
+            del rec  # release the view so the segment can unmap
+        finally:
+            seg.close()
+    if not times:
+        return np.zeros(0)
+    t, mid = np.concatenate(times), np.concatenate(mids)
+    grid = np.arange(t[0] + step_sec, t[-1] + step_sec, step_sec)
+    closes = mid[np.clip(np.searchsorted(t, grid, side="right") - 1, 0, len(mid) - 1)]
+    closes = closes[closes > 0]
+    return np.diff(np.log(closes))
+
+
+def bootstrap_paths(returns: np.ndarray, n_paths: int, steps: int, s0: float,
+                    block: int = 60, seed: Optional[int] = None) -> Iterator[np.ndarray]:
+    """Paths stitched from random blocks of recorded returns (blocks keep volatility clustering)."""
+    if returns.size == 0:
+        raise ValueError("no recorded returns to bootstrap from")
+    rng = np.random.default_rng(seed)
+    block = max(1, min(block, returns.size))
+    log_px = np.full(n_paths, math.log(s0))
+    start = np.zeros(n_paths, dtype=np.int64)
+    yield np.exp(log_px)
+    for t in range(steps):
+        if t % block == 0:
+            start = rng.integers(0, returns.size, n_paths)
+        log_px += returns[(start + t % block) % returns.size]
+        yield np.exp(log_px)
+
+
+# ===== Simulation =====
+
+def _check(settings: Settings) -> None:
+    step = settings.GRID_STEP_USD
+    if step <= 0 or settings.QTY_PER_LADDER <= 0:
+        raise ValueError("GRID_STEP_USD and QTY_PER_LADDER must be positive")
+    depth = max(settings.MAX_LADDERS + settings.MAX_OPEN_TRADES, math.ceil(settings.TAKE_PROFIT_USD / step) + 1)
+    if depth > _BITS:
+        raise ValueError(f"ladder reaches {depth} levels deep; the simulator tracks {_BITS}")
+
+
+def _lowest_bit(x: np.ndarray) -> np.ndarray:
+    """Index of the lowest set bit (64 for 0)."""
+    return _count((x & (~x + _ONE)) - _ONE)
+
+
+def _highest_bit(x: np.ndarray) -> np.ndarray:
+    """Index of the highest set bit (-1 for 0)."""
+    for s in (1, 2, 4, 8, 16, 32):
+        x = x | (x >> np.uint64(s))
+    return _count(x) - 1
+
+
+def simulate(settings: Settings, paths: Iterable[np.ndarray], steps_per_day: float) -> Dict[str, np.ndarray]:
+    """
+    Per-path results for the price vectors in `paths` (the first one is the start):
+    max_notional (entry value of open lots), max_lots, realized_pnl, unrealized_pnl
+    (at the last price) and at_capacity (share of steps with MAX_OPEN_TRADES lots open).
+
+    A step costs a handful of whole-array comparisons against per-path triggers (next TP,
+    top BUY, trail threshold); only the paths that trip one are updated.
+    """
+    _check(settings)
+    step, qty, tp = settings.GRID_STEP_USD, settings.QTY_PER_LADDER, settings.TAKE_PROFIT_USD
+    fee, tp_steps, eps = settings.MAKER_FEE, settings.TAKE_PROFIT_USD / settings.GRID_STEP_USD, 1e-9
+    it = iter(paths)
+    px = np.asarray(next(it), dtype=np.float64)
+    n = px.size
+    everyone = np.arange(n)
+
+    base = np.ceil(px / step - eps)  # align_to_grid, in steps
+    lots = np.zeros(n, dtype=np.uint64)
+    buys = np.zeros(n, dtype=np.uint64)
+    n_lots = np.zeros(n, dtype=np.int64)
+    lot_value = np.zeros(n)  # sum of open lot entry prices
+    spent = np.zeros(n)
+    realized = np.zeros(n)
+    max_value = np.zeros(n)
+    max_lots = np.zeros(n, dtype=np.int64)
+    full = np.zeros(n, dtype=bool)
+    full_steps = np.zeros(n, dtype=np.int64)
+    # Triggers, in steps: a path needs work only when its price reaches one of them
+    next_tp = np.full(n, np.inf)
+    top_buy = np.full(n, -np.inf)
+    trail_at = np.full(n, np.inf)
+
+    def entry_sum(rows: np.ndarray, mask: np.ndarray, cnt: np.ndarray) -> np.ndarray:
+        total: np.ndarray = step * (cnt * (base[rows] - 1) - _index_sum(mask))
+        return total
+
+    def relayer(rows: np.ndarray) -> None:
+        """Rebuilds the ladder and triggers of `rows` after their lots, base or budget changed."""
+        b, held, nl = base[rows], lots[rows], n_lots[rows]
+        afford = np.floor(np.maximum(settings.MAX_DAILY_USDT - spent[rows], 0.0) / (qty * step * np.maximum(b - 1, 1)))
+        room = np.minimum(settings.MAX_LADDERS, settings.MAX_OPEN_TRADES - nl)
+        cap = np.clip(np.minimum(afford, room), 0, None).astype(np.int64)
+        # The `cap` nearest levels without a lot: depth d with d - (lots within d) = cap
+        depth = cap.copy()
+        todo = np.flatnonzero(held)
+        for _ in range(settings.MAX_OPEN_TRADES + 1):
+            if not todo.size:
+                break
+            nxt = np.minimum(cap[todo] + _count(held[todo] & _LOW[depth[todo]]), _BITS)
+            grew = nxt != depth[todo]
+            depth[todo] = nxt
+            todo = todo[grew]
+        ladder = _LOW[depth] & ~held
+        buys[rows] = ladder
+        top_buy[rows] = np.where(ladder != 0, b - 1 - _lowest_bit(ladder), -np.inf)
+        next_tp[rows] = np.where(held != 0, b - 1 - _highest_bit(held) + tp_steps, np.inf)
+        trail_at[rows] = b + (settings.TRAIL_TRIGGER_STEPS - 1) if settings.TRAIL_UP else np.inf
+        full[rows] = nl >= settings.MAX_OPEN_TRADES
+
+    relayer(everyone)
+    t = 0
+    for t, px in enumerate(it, 1):
+        x = px / step
+        dirty = []
+        if t % steps_per_day < 1:  # daily budget rollover
+            spent[:] = 0.0
+            dirty.append(everyone)
+
+        # Exits: lot level (base-1-j) + TP <= price
+        rows = np.flatnonzero(x >= next_tp - eps)
+        if rows.size:
+            held = lots[rows]
+            exits = held & ~_below(np.ceil(base[rows] - 1 - x[rows] + tp_steps - eps).astype(np.int64))
+            cnt = _count(exits)
+            entries = entry_sum(rows, exits, cnt)
+            realized[rows] += qty * (cnt * tp - fee * (2.0 * entries + cnt * tp))
+            lot_value[rows] -= entries
+            n_lots[rows] -= cnt
+            lots[rows] = held ^ exits
+            dirty.append(rows)
+
+        # Trail: the grid-aligned price is TRAIL_TRIGGER_STEPS above the base; lots sink deeper
+        rows = np.flatnonzero(x > trail_at + eps)
+        if rows.size:
+            target = np.ceil(x[rows] - eps)
+            shift = (target - base[rows]).astype(np.int64)
+            moved = lots[rows] << np.minimum(shift, _BITS - 1).astype(np.uint64)
+            lots[rows] = np.where(shift >= _BITS, np.uint64(0), moved)
+            base[rows] = target
+            dirty.append(rows)
+
+        if dirty:
+            relayer(np.unique(np.concatenate(dirty)) if len(dirty) > 1 else dirty[0])
+
+        # Fills: resting BUYs at levels (base-1-j) >= price
+        rows = np.flatnonzero(x <= top_buy + eps)
+        if rows.size:
+            fills = buys[rows] & _below(np.floor(base[rows] - x[rows] + eps).astype(np.int64))
+            cnt = _count(fills)
+            entries = entry_sum(rows, fills, cnt)
+            spent[rows] += qty * entries
+            lot_value[rows] += entries
+            n_lots[rows] += cnt
+            lots[rows] |= fills
+            max_value[rows] = np.maximum(max_value[rows], lot_value[rows])
+            max_lots[rows] = np.maximum(max_lots[rows], n_lots[rows])
+            relayer(rows)  # refill below
+
+        full_steps += full
+
+    return {
+        "max_notional": qty * max_value,
+        "max_lots": max_lots,
+        "realized_pnl": realized,
+        "unrealized_pnl": qty * (n_lots * px - lot_value),
+        "at_capacity": full_steps / max(t, 1),
+    }
+
+
+def summarize(results: Dict[str, np.ndarray]) -> Dict[str, Dict[str, float]]:
+    """mean / p50 / p90 / p99 / max of every per-path result."""
+    out = {}
+    for k, v in results.items():
+        v = np.asarray(v, dtype=np.float64)
+        p50, p90, p99 = np.percentile(v, [50, 90, 99])
+        out[k] = {"mean": round(float(v.mean()), 4), "p50": round(float(p50), 4), "p90": round(float(p90), 4),
+                  "p99": round(float(p99), 4), "max": round(float(v.max()), 4)}
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m gridbot.montecarlo",
+        description="Exposure distribution of the configured ladder over simulated price paths.",
+    )
+    ap.add_argument("--paths", type=int, default=100_000)
+    ap.add_argument("--days", type=float, default=1.0)
+    ap.add_argument("--step-sec", type=float, default=60.0, help="time between simulated prices")
+    ap.add_argument("--price", type=float, default=100.0, help="start price")
+    ap.add_argument("--vol", type=float, default=0.05, help="GBM daily volatility")
+    ap.add_argument("--drift", type=float, default=0.0, help="GBM daily drift")
+    ap.add_argument("--ticks", help="bootstrap returns from the tick recordings in this directory instead of GBM")
+    ap.add_argument("--block", type=int, default=60, help="bootstrap block length in steps")
+    ap.add_argument("--seed", type=int)
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+
+    settings = load_settings()
+    steps_per_day = 86400.0 / args.step_sec
+    steps = max(1, int(round(args.days * steps_per_day)))
+    if args.ticks:
+        returns = tick_returns(args.ticks, settings.SYMBOL, args.step_sec)
+        if returns.size == 0:
+            print(f"[MONTECARLO] no {settings.SYMBOL} ticks in {args.ticks}")
+            return 1
+        paths = bootstrap_paths(returns, args.paths, steps, args.price, args.block, args.seed)
+    else:
+        paths = gbm_paths(args.paths, steps, args.price, args.vol, steps_per_day, args.drift, args.seed)
+
+    t0 = time.perf_counter()
+    summary = summarize(simulate(settings, paths, steps_per_day))
+    report = {"paths": args.paths, "steps": steps, "sec": round(time.perf_counter() - t0, 2), **summary}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(f"{args.paths} paths x {steps} steps in {report['sec']}s")
+        print(f"{'':>15} {'mean':>10} {'p50':>10} {'p90':>10} {'p99':>10} {'max':>10}")
+        for k, s in summary.items():
+            print(f"{k:>15} " + " ".join(f"{s[q]:>10.2f}" for q in ("mean", "p50", "p90", "p99", "max")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
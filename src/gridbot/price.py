@@ -1,38 +1,68 @@
-import time
-import threading
 import queue
-from typing import Tuple, Optional
+import threading
+from typing import Optional, Protocol, Tuple
 
 from gridbot.config.settings import Settings
+from gridbot.core.clock import WALL, Clock
+from gridbot.core.scheduler import PollScheduler
 from gridbot.core.utils import request_with_retry
+from gridbot.ticks import TickRecorder
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 # Type alias for the message queue content: (bid, ask, mid)
 PriceMessage = Tuple[float, float, float]
 
-def get_book(settings: Settings) -> Tuple[float, float, float]:
-    """Fetches the current best bid and ask prices."""
+
+class PriceSource(Protocol):
+    """What processor_loop reads ticks from: the in-process queue, a FeedReader or a replay feed."""
+
+    def get(self, *, timeout: float = ...) -> PriceMessage: ...
+
+def get_book_full(settings: Settings) -> Tuple[float, float, int, int]:
+    """Fetches best bid/ask plus the exchange transaction time (ms) and book update id."""
     d = request_with_retry(
         "GET",
         f"{settings.FUTURES_BASE_URL}/ticker/bookTicker",
         params={"symbol": settings.SYMBOL},
-        timeout=4
+        timeout=4,
+        hedge=True,
     ).json()
-    bid = float(d["bidPrice"])
-    ask = float(d["askPrice"])
+    return float(d["bidPrice"]), float(d["askPrice"]), int(d.get("time", 0)), int(d.get("lastUpdateId", 0))
+
+def get_book(settings: Settings) -> Tuple[float, float, float]:
+    """Fetches the current best bid and ask prices."""
+    bid, ask, _, _ = get_book_full(settings)
     mid = (bid + ask) / 2.0
     return bid, ask, mid
 
-def refresh_prices(settings: Settings, stop_evt: threading.Event, msg_queue: "queue.Queue[PriceMessage]"):
+def refresh_prices(
+    settings: Settings,
+    stop_evt: threading.Event,
+    msg_queue: "queue.Queue[PriceMessage]",
+    scheduler: Optional[PollScheduler] = None,
+    recorder: Optional[TickRecorder] = None,
+    clock: Clock = WALL,
+) -> None:
     """Thread function to continuously fetch prices and put them into the queue."""
-    while not stop_evt.is_set():
-        try:
-            bid, ask, mid = get_book(settings)
+    try:
+        while not stop_evt.is_set():
             try:
-                msg_queue.put_nowait((bid, ask, mid))
-            except queue.Full:
-                # If the processor is too slow, skip this tick
-                pass
-        except Exception as e:
-            print(f"[REFRESH] price fetch failed: {e}")
-        
-        time.sleep(max(0.1, settings.PRICE_REFRESH_SEC))
\ No newline at end of file
+                bid, ask, exch_ms, update_id = get_book_full(settings)
+                mid = (bid + ask) / 2.0
+                try:
+                    msg_queue.put_nowait((bid, ask, mid))
+                except queue.Full:
+                    # If the processor is too slow, skip this tick
+                    pass
+                if recorder:
+                    recorder.append(bid, ask, exch_ms, update_id)
+            except Exception as e:
+                log.warning("[REFRESH] price fetch failed: %s", e)
+
+            interval = scheduler.price_interval() if scheduler else settings.PRICE_REFRESH_SEC
+            clock.sleep(max(0.1, interval))
+    finally:
+        if recorder:
+            recorder.close()
\ No newline at end of file
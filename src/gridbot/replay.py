@@ -0,0 +1,110 @@
+"""
+Deterministic replay of a recorded session (see gridbot.broker.cassette).
+
+    SESSION_RECORD_PATH=session.jsonl.gz python -m gridbot   # record while trading
+    python -m gridbot.replay session.jsonl.gz                # replay at full speed
+    python -m gridbot.replay session.jsonl.gz --cprofile replay.prof
+
+The session runs through the real `processor_loop` and `GridManager`, with the
+recorded settings and starting state, every exchange call answered from the
+cassette and the session itself as the bot's clock (recorded event times), so
+cooldowns and polling intervals behave as they did live. State and trade CSV go to a scratch
+directory; nothing touches the network or the live state file.
+"""
+import argparse
+import contextlib
+import dataclasses
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from gridbot.broker.cassette import ReplayBroker, ReplayFeed, ReplaySession, load_session
+from gridbot.config.settings import Settings
+from gridbot.core.grid_logic import GridManager
+from gridbot.core.scheduler import PollScheduler
+from gridbot.state.manager import StateManager
+from gridbot.utils.logger import setup_logger, shutdown_logger
+
+
+def replay_settings(header: Dict, workdir: str) -> Settings:
+    fields = {f.name for f in dataclasses.fields(Settings)}
+    values = {k: v for k, v in header["settings"].items() if k in fields}
+    values.update(
+        STATE_FILE=os.path.join(workdir, "replay_state.json"),
+        CSV_FILE=os.path.join(workdir, "replay_trades.csv"),
+        SESSION_RECORD_PATH="", TELEGRAM_BOT_TOKEN="", TELEGRAM_CHAT_ID="",
+        ORDER_PIPELINE_DEPTH=1,  # the session cursor is single-threaded
+    )
+    return dataclasses.replace(Settings(), **values)
+
+
+def replay_session(path: str, workdir: Optional[str] = None) -> Dict:
+    """Replays `path` and returns the divergence counters plus the resulting PnL/state totals."""
+    # Imported here: __main__ owns process-wide globals and signal handlers
+    from gridbot.__main__ import processor_loop
+
+    header, events = load_session(path)
+    with contextlib.ExitStack() as stack:
+        if workdir is None:
+            workdir = stack.enter_context(tempfile.TemporaryDirectory(prefix="gridbot-replay-"))
+        os.makedirs(workdir, exist_ok=True)
+        settings = replay_settings(header, workdir)
+        with open(settings.STATE_FILE, "w", encoding="utf-8") as f:
+            json.dump(header["state"], f)
+
+        session = ReplaySession(header, events)
+        stop_evt = threading.Event()
+        t0 = time.perf_counter()
+        state_manager = StateManager(settings, clock=session)
+        state_manager.load_state()
+        state_manager.init_csv()
+        grid_manager = GridManager(settings, state_manager, ReplayBroker(settings, session))
+        processor_loop(
+            settings, state_manager, grid_manager, ReplayFeed(session, stop_evt), stop_evt,
+            PollScheduler(settings), initial_mid=header["mid"],
+        )
+        elapsed = time.perf_counter() - t0
+
+    state = state_manager.state
+    out: Dict[str, Any] = dict(session.summary())
+    out.update({
+        "elapsed_sec": round(elapsed, 3),
+        "realized_pnl": round(state.realized_pnl, 6),
+        "total_buys": state.total_buys,
+        "total_sells": state.total_sells,
+        "positions": len(state.positions),
+        "open_buys": len(state.open_buy_price_to_id),
+    })
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m gridbot.replay", description="Replay a recorded gridbot session.")
+    ap.add_argument("session", help="cassette written with SESSION_RECORD_PATH")
+    ap.add_argument("--log-level", default="WARNING")
+    ap.add_argument("--cprofile", metavar="PATH", help="write cProfile stats of the replay to PATH")
+    args = ap.parse_args(argv)
+
+    setup_logger(args.log_level)
+    try:
+        if args.cprofile:
+            import cProfile
+            prof = cProfile.Profile()
+            result = prof.runcall(replay_session, args.session)
+            prof.dump_stats(args.cprofile)
+        else:
+            result = replay_session(args.session)
+    finally:
+        shutdown_logger()
+
+    for k, v in result.items():
+        print(f"{k:>14}: {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
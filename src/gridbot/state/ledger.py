@@ -0,0 +1,172 @@
+from dataclasses import dataclass
+import time
+from typing import Dict, List, Optional
+
+
+@dataclass
+class Fill:
+    """One execution as reported by the exchange (or estimated when no trade record is available)."""
+    ts: float
+    side: str
+    price: float
+    qty: float
+    commission: float
+    maker: bool
+    order_id: str
+    estimated: bool = False
+
+
+class RollingWindow:
+    """
+    Fixed-memory rolling totals over `window_sec`, kept in `buckets` time slots.
+    Updates are O(1); reads sum a constant number of slots.
+    """
+
+    FIELDS = ("pnl", "fees", "turnover", "fills", "round_trips")
+
+    def __init__(self, window_sec: float, buckets: int):
+        self.window_sec = float(window_sec)
+        self.buckets = int(buckets)
+        self.width = self.window_sec / self.buckets
+        self.epochs: List[int] = [-1] * self.buckets
+        self.slots: List[List[float]] = [[0.0] * len(self.FIELDS) for _ in range(self.buckets)]
+
+    def _slot(self, ts: float) -> List[float]:
+        epoch = int(ts // self.width)
+        i = epoch % self.buckets
+        if self.epochs[i] != epoch:
+            self.epochs[i] = epoch
+            self.slots[i] = [0.0] * len(self.FIELDS)
+        return self.slots[i]
+
+    def add(self, ts: float, pnl: float = 0.0, fees: float = 0.0, turnover: float = 0.0,
+            fills: int = 0, round_trips: int = 0) -> None:
+        slot = self._slot(ts)
+        slot[0] += pnl
+        slot[1] += fees
+        slot[2] += turnover
+        slot[3] += fills
+        slot[4] += round_trips
+
+    def totals(self, now: Optional[float] = None) -> Dict[str, float]:
+        now = time.time() if now is None else now
+        newest = int(now // self.width)
+        out = [0.0] * len(self.FIELDS)
+        for epoch, slot in zip(self.epochs, self.slots):
+            if newest - self.buckets < epoch <= newest:
+                for j, v in enumerate(slot):
+                    out[j] += v
+        return dict(zip(self.FIELDS, out))
+
+    def to_dict(self) -> Dict:
+        return {
+            "window_sec": self.window_sec, "buckets": self.buckets, "epochs": list(self.epochs),
+            "slots": [list(s) for s in self.slots],
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict, window_sec: float, buckets: int) -> "RollingWindow":
+        w = cls(window_sec, buckets)
+        if d.get("window_sec") == w.window_sec and d.get("buckets") == w.buckets:
+            w.epochs = [int(e) for e in d.get("epochs", w.epochs)][: w.buckets]
+            w.slots = [[float(v) for v in s] for s in d.get("slots", w.slots)][: w.buckets]
+        return w
+
+
+class PnLLedger:
+    """
+    Running aggregates over actual executions. Every update is O(1); nothing here rescans trades.csv.
+    Per-level stats are keyed by the grid entry price of the round trip.
+    """
+
+    WINDOWS = {"1h": (3600, 60), "24h": (86400, 96)}
+
+    def __init__(self) -> None:
+        self.realized_pnl = 0.0
+        self.fees = 0.0
+        self.turnover = 0.0
+        self.fills = 0
+        self.maker_fills = 0
+        self.taker_fills = 0
+        self.round_trips = 0
+        # level -> [round_trips, timed_round_trips, hold_sec_total, pnl]
+        self.levels: Dict[str, List[float]] = {}
+        self.windows: Dict[str, RollingWindow] = {k: RollingWindow(*v) for k, v in self.WINDOWS.items()}
+
+    def record_fill(self, fill: Fill) -> None:
+        notional = fill.price * fill.qty
+        self.fees += fill.commission
+        self.turnover += notional
+        self.fills += 1
+        if fill.maker:
+            self.maker_fills += 1
+        else:
+            self.taker_fills += 1
+        for w in self.windows.values():
+            w.add(fill.ts, fees=fill.commission, turnover=notional, fills=1)
+
+    def close_round_trip(
+        self, level: float, entry_price: float, entry_fee: float, opened_at: float, exit_fill: Fill
+    ) -> float:
+        """Books a TP exit against its entry. Returns the net PnL of the round trip."""
+        self.record_fill(exit_fill)
+        pnl = (exit_fill.price - entry_price) * exit_fill.qty - entry_fee - exit_fill.commission
+        self.realized_pnl += pnl
+        self.round_trips += 1
+
+        st = self.levels.setdefault(str(level), [0, 0, 0.0, 0.0])
+        st[0] += 1
+        if opened_at > 0 and exit_fill.ts >= opened_at:
+            st[1] += 1
+            st[2] += exit_fill.ts - opened_at
+        st[3] += pnl
+
+        for w in self.windows.values():
+            w.add(exit_fill.ts, pnl=pnl, round_trips=1)
+        return pnl
+
+    # --- Queries ---
+
+    def level_stats(self, level: float) -> Dict[str, float]:
+        trips, timed, hold, pnl = self.levels.get(str(level), [0, 0, 0.0, 0.0])
+        return {
+            "round_trips": int(trips),
+            "avg_hold_sec": (hold / timed) if timed else 0.0,
+            "pnl": pnl,
+        }
+
+    def window(self, name: str, now: Optional[float] = None) -> Dict[str, float]:
+        return self.windows[name].totals(now)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict:
+        return {
+            "realized_pnl": self.realized_pnl,
+            "fees": self.fees,
+            "turnover": self.turnover,
+            "fills": self.fills,
+            "maker_fills": self.maker_fills,
+            "taker_fills": self.taker_fills,
+            "round_trips": self.round_trips,
+            "windows": {k: w.totals(now) for k, w in self.windows.items()},
+        }
+
+    # --- Persistence ---
+
+    def to_dict(self) -> Dict:
+        keys = ("realized_pnl", "fees", "turnover", "fills", "maker_fills", "taker_fills", "round_trips")
+        d = {k: getattr(self, k) for k in keys}
+        d["levels"] = {k: list(v) for k, v in self.levels.items()}
+        d["windows"] = {k: w.to_dict() for k, w in self.windows.items()}
+        return d
+
+    @classmethod
+    def from_dict(cls, d: Dict) -> "PnLLedger":
+        led = cls()
+        for k in ("realized_pnl", "fees", "turnover"):
+            setattr(led, k, float(d.get(k, 0.0)))
+        for k in ("fills", "maker_fills", "taker_fills", "round_trips"):
+            setattr(led, k, int(d.get(k, 0)))
+        led.levels = {str(k): [float(x) for x in v] for k, v in d.get("levels", {}).items()}
+        wins = d.get("windows", {})
+        led.windows = {k: RollingWindow.from_dict(wins.get(k, {}), *v) for k, v in cls.WINDOWS.items()}
+        return led
@@ -1,16 +1,21 @@
-import os
-import json
 import csv
+from dataclasses import asdict, dataclass, field, fields
 import datetime
-import shutil
-import pathlib
-import time
-from typing import Dict, List, Set, Optional
+import json
 from json import JSONDecodeError
-from dataclasses import dataclass, field, asdict
+import os
+import pathlib
+import shutil
+from typing import Any, Dict, List, Optional, Set
 
 from gridbot.config.settings import Settings
-from gridbot.core.utils import dprint
+from gridbot.core.clock import WALL, Clock, day_of
+from gridbot.state.ledger import PnLLedger
+from gridbot.state.order_index import OrderIndex
+from gridbot.state.writer import StateWriter, write_json_atomic
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
 
 @dataclass
 class Position:
@@ -18,6 +23,9 @@ class Position:
     qty: float
     tp_price: float
     tp_id: str
+    entry_fill: float = 0.0  # Actual average fill price (0 -> unknown, use entry)
+    entry_fee: float = 0.0   # Commission paid on the BUY leg
+    opened_at: float = 0.0   # Unix ts of the BUY fill (0 -> unknown)
 
 @dataclass
 class BotState:
@@ -33,7 +41,7 @@ class BotState:
     spent_date: str = field(default_factory=lambda: datetime.datetime.now().strftime("%Y-%m-%d"))
 
     # Live Maps
-    open_buy_price_to_id: Dict[float, str] = field(default_factory=dict)
+    open_buy_price_to_id: OrderIndex = field(default_factory=OrderIndex)
     tp_blocked_entries: Set[float] = field(default_factory=set) # Derived, not persisted
 
     # Fill Tracking
@@ -43,49 +51,85 @@ class BotState:
     # Control
     HALT_PLACEMENT: bool = False
 
-    def __post_init__(self):
+    def __post_init__(self) -> None:
         # Ensure sets are initialized correctly from loaded data if needed
         self.handled_fills = set(self.handled_fills)
         self.tp_blocked_entries = set(self.tp_blocked_entries)
 
+    def __setattr__(self, name: str, value: Any) -> None:
+        # Plain price -> orderId dicts (old call sites, tests) are indexed on assignment
+        if name == "open_buy_price_to_id" and not isinstance(value, OrderIndex):
+            value = OrderIndex(value)
+        super().__setattr__(name, value)
+
 class StateManager:
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, clock: Clock = WALL):
         self.settings = settings
-        self.state = BotState()
+        self.clock = clock
+        self.state = BotState(spent_date=day_of(clock.time()))
+        self.ledger = PnLLedger()
         self.csv_file = settings.CSV_FILE
         self.state_file = settings.STATE_FILE
-
-    def init_csv(self):
+        self.writer: Optional[StateWriter] = None  # None -> save_state writes on the caller's thread
+
+    def start_writer(self, window_sec: Optional[float] = None) -> StateWriter:
+        """Moves state writes to a group-commit thread (see state/writer.py)."""
+        if self.writer is None:
+            window = self.settings.STATE_SAVE_WINDOW_MS / 1000.0 if window_sec is None else window_sec
+            self.writer = StateWriter(self.state_file, window)
+        return self.writer
+
+    def close(self) -> None:
+        """Flushes pending writes and stops the writer thread."""
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    def init_csv(self) -> None:
         new = not os.path.exists(self.csv_file)
         with open(self.csv_file, "a", newline="", encoding="utf-8") as f:
             w = csv.writer(f)
             if new:
                 w.writerow(["time","event","price","qty","pnl","total_pnl","note"])
 
-    def log_trade(self, event: str, price: float, qty: float = 0.0, pnl: float = 0.0, note: str = ""):
+    def log_trade(self, event: str, price: float, qty: float = 0.0, pnl: float = 0.0, note: str = "") -> None:
         with open(self.csv_file, "a", newline="", encoding="utf-8") as f:
             csv.writer(f).writerow([
-                datetime.datetime.now().isoformat(timespec="seconds"),
+                datetime.datetime.fromtimestamp(self.clock.time()).isoformat(timespec="seconds"),
                 event, price, qty, pnl, self.state.realized_pnl, note
             ])
 
-    def save_state(self):
-        s = asdict(self.state)
+    def snapshot(self) -> Dict:
+        """
+        The persisted form of the state (what save_state writes). Every container is
+        copied, so the result stays consistent while the state keeps changing.
+        """
+        # Field by field rather than asdict(): no deep copy of the order index or the fill set
+        s = {f.name: getattr(self.state, f.name) for f in fields(BotState) if f.name != "tp_blocked_entries"}
         # Convert non-serializable types for JSON
         s["positions"] = [asdict(p) for p in self.state.positions]
-        s["open_buy_price_to_id"] = {str(k): v for k, v in self.state.open_buy_price_to_id.items()}
+        s["open_buy_price_to_id"] = self.state.open_buy_price_to_id.to_dict()
         s["handled_fills"] = list(self.state.handled_fills)
-        s.pop("tp_blocked_entries", None) # Do not persist derived state
-
-        tmp = self.state_file + ".tmp"
+        s["recent_submissions"] = dict(self.state.recent_submissions)
+        s["ledger"] = self.ledger.to_dict()
+        return s
+
+    def save_state(self, durable: bool = False) -> bool:
+        """
+        Persists a snapshot of the state. With the writer running the write is queued and
+        coalesced with others; `durable=True` is a barrier that returns once it is on disk.
+        False -> the write failed.
+        """
+        s = self.snapshot()
+        if self.writer is not None:
+            version = self.writer.submit(s)
+            return self.writer.wait(version) if durable else True
         try:
-            with open(tmp, "w", encoding="utf-8") as f:
-                json.dump(s, f, ensure_ascii=False, separators=(",", ":"), indent=2)
-                f.flush()
-                os.fsync(f.fileno())
-            os.replace(tmp, self.state_file)
+            write_json_atomic(self.state_file, s)
+            return True
         except Exception as e:
-            dprint(f"[ERROR] Failed to save state: {e}")
+            log.error("Failed to save state: %s", e)
+            return False
 
     def load_state(self) -> bool:
         p = pathlib.Path(self.state_file)
@@ -95,7 +139,7 @@ class StateManager:
             if p.stat().st_size < 2:
                 backup = p.with_suffix(".json.empty.bak")
                 shutil.move(str(p), str(backup))
-                print(f"[WARN] state file was empty -> moved to {backup.name}")
+                log.warning("state file was empty -> moved to %s", backup.name)
                 return False
 
             with p.open("r", encoding="utf-8") as f:
@@ -111,24 +155,27 @@ class StateManager:
 
             # Load complex types
             self.state.positions = [Position(**p) for p in s.get("positions", [])]
-            self.state.open_buy_price_to_id = {float(k): str(v) for k, v in s.get("open_buy_price_to_id", {}).items()}
+            buys = s.get("open_buy_price_to_id", {})
+            self.state.open_buy_price_to_id = OrderIndex({float(k): str(v) for k, v in buys.items()})
             self.state.handled_fills = set(s.get("handled_fills", []))
             self.state.recent_submissions = dict(s.get("recent_submissions", {}))
+            self.ledger = PnLLedger.from_dict(s.get("ledger", {}))
 
             # Daily reset check
-            curr = datetime.datetime.now().strftime("%Y-%m-%d")
+            curr = day_of(self.clock.time())
             if curr != self.state.spent_date:
                 self.state.spent_today = 0.0
                 self.state.spent_date = curr
 
-            print(f"[STATE] Loaded. Positions: {len(self.state.positions)} | open-buy map: {len(self.state.open_buy_price_to_id)} | handled_fills={len(self.state.handled_fills)}")
+            log.info("[STATE] Loaded. Positions: %d | open-buy map: %d | handled_fills=%d",
+                     len(self.state.positions), len(self.state.open_buy_price_to_id), len(self.state.handled_fills))
             return True
 
         except (JSONDecodeError, ValueError, TypeError) as e:
             backup = p.with_suffix(".json.corrupt.bak")
             shutil.move(str(p), str(backup))
-            print(f"[WARN] load_state: corrupt JSON ({e}). Moved to {backup.name}. Starting fresh.")
+            log.warning("load_state: corrupt JSON (%s). Moved to %s. Starting fresh.", e, backup.name)
             return False
         except Exception as e:
-            print(f"[WARN] load_state failed: {e}")
+            log.warning("load_state failed: %s", e)
             return False
\ No newline at end of file
@@ -0,0 +1,139 @@
+"""
+Index of our resting grid BUYs.
+
+`OrderIndex` is the `price -> orderId` map the bot always kept in
+`BotState.open_buy_price_to_id` (and still behaves as one), plus reverse lookups by
+orderId and clientOrderId and the prices kept sorted, so the farthest/nearest BUY
+and "everything below X" are answered without rebuilding or sorting anything.
+Every mutation goes through `set` / `pop`, which keep all views in step.
+"""
+import bisect
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple
+
+# Placeholder id of a submission the exchange did not acknowledge; several may rest at once
+NO_ID = "n/a"
+
+
+class OrderIndex(MutableMapping[float, str]):
+    def __init__(self, items: Optional[Mapping[float, str]] = None):
+        self._by_price: Dict[float, str] = {}
+        self._by_id: Dict[str, float] = {}
+        self._by_cid: Dict[str, float] = {}
+        self._cid_at: Dict[float, str] = {}
+        self._prices: List[float] = []  # ascending
+        if items:
+            for px, oid in items.items():
+                self.set(px, oid)
+
+    # --- Mutation ---
+
+    def set(self, px: float, oid: str, client_id: str = "") -> None:
+        """Records `oid` resting at `px`, replacing whatever was at `px` and wherever `oid` was before."""
+        if self._by_price.get(px) == oid and (not client_id or self._cid_at.get(px) == client_id):
+            return
+        old_px = self._by_id.get(oid) if oid != NO_ID else None
+        if old_px is not None and old_px != px:
+            self.pop(old_px)
+        if px in self._by_price:
+            self._unlink(px)
+        else:
+            bisect.insort(self._prices, px)
+        self._by_price[px] = oid
+        if oid != NO_ID:
+            self._by_id[oid] = px
+        if client_id:
+            self._by_cid[client_id] = px
+            self._cid_at[px] = client_id
+
+    def _unlink(self, px: float) -> None:
+        oid = self._by_price.pop(px)
+        if self._by_id.get(oid) == px:
+            del self._by_id[oid]
+        cid = self._cid_at.pop(px, None)
+        if cid is not None and self._by_cid.get(cid) == px:
+            del self._by_cid[cid]
+
+    def pop(self, px: float, *default: Any) -> Any:
+        if px not in self._by_price:
+            if default:
+                return default[0]
+            raise KeyError(px)
+        oid = self._by_price[px]
+        self._unlink(px)
+        del self._prices[bisect.bisect_left(self._prices, px)]
+        return oid
+
+    def pop_id(self, oid: str) -> Optional[float]:
+        """Removes the order `oid`; returns the price it rested at (None if unknown)."""
+        px = self._by_id.get(oid)
+        if px is not None:
+            self.pop(px)
+        return px
+
+    def replace(self, items: Iterable[Tuple[float, str, str]]) -> None:
+        """Resets the index to `(price, orderId, clientOrderId)` rows."""
+        self.clear()
+        for px, oid, cid in items:
+            self.set(px, oid, cid)
+
+    def clear(self) -> None:
+        self._by_price.clear()
+        self._by_id.clear()
+        self._by_cid.clear()
+        self._cid_at.clear()
+        self._prices.clear()
+
+    # --- Lookups ---
+
+    def price_of(self, oid: str) -> Optional[float]:
+        return self._by_id.get(oid)
+
+    def price_of_client(self, client_id: str) -> Optional[float]:
+        return self._by_cid.get(client_id)
+
+    def client_id_at(self, px: float) -> str:
+        """clientOrderId of the BUY at `px` ("" if unknown)."""
+        return self._cid_at.get(px, "")
+
+    def min_price(self) -> Optional[float]:
+        """Farthest BUY from the market."""
+        return self._prices[0] if self._prices else None
+
+    def max_price(self) -> Optional[float]:
+        """Nearest BUY to the market."""
+        return self._prices[-1] if self._prices else None
+
+    def lowest(self, n: int) -> List[Tuple[float, str]]:
+        """The `n` farthest BUYs, ascending."""
+        return [(px, self._by_price[px]) for px in self._prices[:max(n, 0)]]
+
+    def below(self, px: float) -> List[Tuple[float, str]]:
+        """BUYs priced strictly below `px`, ascending."""
+        return [(p, self._by_price[p]) for p in self._prices[:bisect.bisect_left(self._prices, px)]]
+
+    def to_dict(self) -> Dict[str, str]:
+        """Persisted form (the state file's `open_buy_price_to_id`)."""
+        return {str(px): oid for px, oid in self._by_price.items()}
+
+    # --- Mapping protocol (iteration is in ascending price order) ---
+
+    def __getitem__(self, px: float) -> str:
+        return self._by_price[px]
+
+    def __setitem__(self, px: float, oid: str) -> None:
+        self.set(px, oid)
+
+    def __delitem__(self, px: float) -> None:
+        self.pop(px)
+
+    def __contains__(self, px: object) -> bool:
+        return px in self._by_price
+
+    def __iter__(self) -> Iterator[float]:
+        return iter(list(self._prices))
+
+    def __len__(self) -> int:
+        return len(self._by_price)
+
+    def __repr__(self) -> str:
+        return f"OrderIndex({dict(self.items())})"
@@ -0,0 +1,110 @@
+"""
+Group-commit persistence of the state file.
+
+`StateWriter` runs the fsync'd write on its own thread. Each save request hands over a
+snapshot and returns at once. Requests that arrive within `window_sec` of the first
+pending one are coalesced: only the newest snapshot is written. A caller that needs a
+durability barrier waits for the write that covers its request with `wait`. While
+someone waits, the write starts without waiting out the window.
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+def write_json_atomic(path: str, data: Dict) -> None:
+    """Writes `data` to a temp file, fsyncs it and renames it over `path`."""
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, separators=(",", ":"), indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class StateWriter:
+    def __init__(self, path: str, window_sec: float = 0.05):
+        self.path = path
+        self.window_sec = max(0.0, window_sec)
+        self.requests = 0  # save requests
+        self.writes = 0    # durable writes they were coalesced into
+        self._cond = threading.Condition()
+        self._pending: Optional[Dict] = None
+        self._pending_since = 0.0
+        self._version = 0    # last request
+        self._attempted = 0  # last request a write was attempted for
+        self._durable = 0    # last request known to be on disk
+        self._waiters = 0
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="state-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, snapshot: Dict) -> int:
+        """Queues `snapshot` (replacing any not yet written); returns the request's version for `wait`."""
+        with self._cond:
+            if self._pending is None:
+                self._pending_since = time.monotonic()
+            self._pending = snapshot
+            self._version += 1
+            self.requests += 1
+            self._cond.notify_all()
+            return self._version
+
+    def wait(self, version: Optional[int] = None, timeout: Optional[float] = None) -> bool:
+        """Blocks until request `version` (default: the latest) is on disk; False on a failed write or timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            version = self._version if version is None else version
+            self._waiters += 1
+            self._cond.notify_all()
+            try:
+                while self._attempted < version:
+                    left = None if deadline is None else deadline - time.monotonic()
+                    if (left is not None and left <= 0) or not self._thread.is_alive():
+                        return False
+                    self._cond.wait(left)
+                return self._durable >= version
+            finally:
+                self._waiters -= 1
+
+    def close(self, timeout: Optional[float] = 5.0) -> None:
+        """Writes whatever is pending and stops the thread."""
+        self.wait(timeout=timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                # Group commit: let more requests join unless a barrier is waiting
+                while not self._waiters and not self._closed:
+                    left = self._pending_since + self.window_sec - time.monotonic()
+                    if left <= 0:
+                        break
+                    self._cond.wait(left)
+                snapshot, version = self._pending, self._version
+                self._pending = None
+            ok = True
+            try:
+                write_json_atomic(self.path, snapshot)
+            except Exception as e:
+                ok = False
+                log.error("Failed to save state: %s", e)
+            with self._cond:
+                self._attempted = version
+                if ok:
+                    self._durable = version
+                    self.writes += 1
+                self._cond.notify_all()
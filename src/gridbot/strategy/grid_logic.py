@@ -1,4 +1,118 @@
-from typing import List
+"""
+Vectorized grid engine.
+
+Ladders for many mids at once as a (mids x levels) NumPy array, snapped to the
+tick size the same way `Broker.clamp_price` does it (round down to the tick, then
+the exact decimal value), so entries compare equal to clamped exchange prices.
+Blocked-level masks and capacity-limited selections run over the whole array in
+one pass; the live `GridManager` calls this with a single mid, backtests and
+simulations with millions.
+"""
+from decimal import Decimal
+from typing import Iterable, List, Tuple
+
+import numpy as np
+from numpy.typing import ArrayLike
+
+# Slack for x / tick landing a hair below an exact multiple (e.g. 0.3 / 0.1)
+_SNAP_EPS = 1e-9
+
+
+def tick_decimals(tick: float) -> int:
+    exp = int(Decimal(str(tick)).as_tuple().exponent)
+    return -exp if exp < 0 else 0
+
+
+def tick_units(prices: np.ndarray, tick: float) -> np.ndarray:
+    """Integer number of ticks, rounded down: the exact key of a snapped price."""
+    units: np.ndarray = np.floor(np.asarray(prices, dtype=np.float64) / tick + _SNAP_EPS).astype(np.int64)
+    return units
+
+
+def snap_to_tick(prices: np.ndarray, tick: float) -> np.ndarray:
+    """Rounds down to a multiple of `tick`, returning the nearest double to the decimal value."""
+    if tick <= 0:
+        return np.asarray(prices, dtype=np.float64)
+    scale = 10 ** tick_decimals(tick)
+    step = int(round(tick * scale))
+    # integer / power of ten is correctly rounded, i.e. equals float(f"{price:.{decimals}f}")
+    snapped: np.ndarray = (tick_units(prices, tick) * step) / scale
+    return snapped
+
+
+def arithmetic_ladders(
+    mids: ArrayLike, step: float, levels: int, tick: float = 0.0, start: int = 1, side: int = -1
+) -> np.ndarray:
+    """`mid + side * step * k` for k = start .. start+levels-1, one row per mid (side -1 -> BUYs below)."""
+    if levels < 0 or step <= 0:
+        raise ValueError("levels must be >= 0 and step positive")
+    mids = np.asarray(mids, dtype=np.float64).reshape(-1, 1)
+    steps = step / tick if tick > 0 else 0.0
+    if tick > 0 and abs(steps - round(steps)) < _SNAP_EPS:
+        # Step is a whole number of ticks: snap each mid once and shift in integer ticks,
+        # exact and a single pass over the (mids x levels) output
+        scale = 10 ** tick_decimals(tick)
+        unit = int(round(tick * scale))
+        k = np.arange(start, start + levels, dtype=np.int64) * (side * int(round(steps)))
+        out = (tick_units(mids, tick) + k) * unit
+        ladders: np.ndarray = np.divide(out, scale, out=np.empty(out.shape), casting="unsafe")
+        return ladders
+    kf = np.arange(start, start + levels, dtype=np.float64)
+    return snap_to_tick(mids + (side * step) * kf, tick)
+
+
+def geometric_ladders(
+    mids: ArrayLike, ratio: float, levels: int, tick: float = 0.0, start: int = 1, side: int = -1
+) -> np.ndarray:
+    """`mid * (1 + ratio) ** (side * k)`: constant percentage spacing instead of constant dollars."""
+    if levels < 0 or ratio <= 0:
+        raise ValueError("levels must be >= 0 and ratio positive")
+    k = np.arange(start, start + levels, dtype=np.float64)
+    out = np.asarray(mids, dtype=np.float64).reshape(-1, 1) * np.power(1.0 + ratio, side * k)
+    return snap_to_tick(out, tick)
+
+
+def blocked_mask(ladders: np.ndarray, blocked: Iterable[float], tick: float) -> np.ndarray:
+    """
+    True where a level is in `blocked`. Both sides are snapped to the same exact decimal
+    values, so plain float equality is reliable.
+    """
+    blocked = np.unique(snap_to_tick(np.fromiter(blocked, dtype=np.float64), tick))
+    if blocked.size > 16:
+        return np.isin(ladders, blocked)
+    mask = np.zeros(ladders.shape, dtype=bool)
+    for b in blocked.tolist():
+        mask |= ladders == b
+    return mask
+
+
+def select_capacity(blocked: np.ndarray, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Per row, the first `capacity` unblocked levels. Returns (selected mask, depth), where
+    depth is how many leading levels it takes to reach that capacity (the row length
+    when the row does not have enough free levels).
+    """
+    free = ~np.atleast_2d(blocked)
+    rows, width = free.shape
+    if capacity <= 0 or width == 0:
+        return np.zeros_like(free), np.zeros(rows, dtype=np.int64)
+    taken = np.cumsum(free, axis=1, dtype=np.int16 if width < 32767 else np.int64)
+    selected = free & (taken <= capacity)
+    depth = np.where(taken[:, -1] >= capacity, np.argmax(taken >= capacity, axis=1) + 1, width)
+    return selected, depth
+
+
+def buy_ladder(base: float, step: float, capacity: int, tick: float, blocked: Iterable[float] = ()) -> List[float]:
+    """
+    BUY levels below `base`, descending, deep enough to hold `capacity` levels that are not
+    `blocked` (blocked levels inside that range are included, as the caller filters them).
+    """
+    blocked = list(blocked)
+    ladder = arithmetic_ladders([base], step, capacity + len(blocked), tick)
+    _, depth = select_capacity(blocked_mask(ladder, blocked, tick), capacity)
+    # Levels collapse onto each other when step < tick
+    return list(dict.fromkeys(ladder[0, : int(depth[0])].tolist()))
+
 
 def compute_grid_levels(mid: float, grid_size: int, spacing: float) -> List[float]:
     """
@@ -7,13 +121,10 @@ def compute_grid_levels(mid: float, grid_size: int, spacing: float) -> List[floa
     """
     if grid_size <= 0 or spacing <= 0:
         raise ValueError("grid_size and spacing must be positive")
-    
+
     # Calculate how many steps away from the center the lowest level is
     half_size = (grid_size - 1) // 2
-    
-    levels = []
-    for i in range(-half_size, half_size + 1):
-        levels.append(mid + i * spacing)
-        
+    levels = arithmetic_ladders([mid], spacing, 2 * half_size + 1, start=-half_size, side=1)
+
     # Ensure floating point precision is handled for comparison in tests
-    return [round(level, 10) for level in levels]
\ No newline at end of file
+    return [round(level, 10) for level in levels[0].tolist()]
@@ -0,0 +1,47 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+
+@dataclass
+class LadderPlan:
+    """Actions that turn the current BUY ladder into the target ladder."""
+    keep: List[float] = field(default_factory=list)
+    amend: List[Tuple[str, float, float]] = field(default_factory=list)  # (orderId, from_px, to_px)
+    cancel: List[Tuple[float, str]] = field(default_factory=list)       # (px, orderId)
+    place: List[float] = field(default_factory=list)
+
+    @property
+    def requests(self) -> int:
+        """Single-order request count if executed one call per action."""
+        return len(self.amend) + len(self.cancel) + len(self.place)
+
+
+def plan_ladder(current: Dict[float, str], target: Iterable[float], max_place: int = -1) -> LadderPlan:
+    """
+    Minimal diff between `current` (price -> orderId) and the `target` price set.
+
+    Orders already on a target level are kept. Each stale order is moved onto a missing
+    level with one amend instead of a cancel + place; the farthest stale order goes to the
+    missing level closest to the market (highest BUY), so the levels that matter most are
+    covered first. Leftover stale orders are cancelled and leftover missing levels placed,
+    at most `max_place` of them (-1 -> no limit).
+    """
+    target_set = set(target)
+    plan = LadderPlan()
+
+    stale: List[Tuple[float, str]] = []
+    for px, oid in sorted(current.items()):
+        if px in target_set:
+            plan.keep.append(px)
+        else:
+            stale.append((px, oid))
+
+    missing = sorted((px for px in target_set if px not in current), reverse=True)
+
+    n = min(len(stale), len(missing))
+    for (old_px, oid), new_px in zip(stale[:n], missing[:n]):
+        plan.amend.append((oid, old_px, new_px))
+    plan.cancel = stale[n:]
+    rest = missing[n:]
+    plan.place = rest if max_place < 0 else rest[:max_place]
+    return plan
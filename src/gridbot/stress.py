@@ -0,0 +1,441 @@
+"""
+Burst stress harness: drives the real `processor_loop` / `GridManager` against a
+simulated exchange through scripted flash moves.
+
+    python -m gridbot.stress                 # all scenarios
+    python -m gridbot.stress waterfall --json
+
+Everything runs on a simulated clock: ticks arrive at scripted times, every broker
+call costs a fixed latency, and a "dropped" response costs the full timeout before
+the broker reports failure the way the live Broker does. Processor CPU time is not
+part of the clock, so a run measures how the request pattern copes with a burst
+and the numbers are identical from run to run.
+
+Reported per scenario: BUY fills and how fast they were turned into TPs
+(fills/sec), fill -> TP-placement latency percentiles, fills still unhedged at the
+end, the backlog of ticks queued behind the processor, request counts and BUY
+fills per calendar day.
+"""
+import argparse
+import bisect
+from collections import Counter
+import dataclasses
+import json
+import queue
+import sys
+import tempfile
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from gridbot.book import BookMirror
+from gridbot.broker.binance_connector import Broker
+from gridbot.broker.orders import OpenOrders, OrderParser
+from gridbot.config.settings import Settings
+from gridbot.core.clock import VirtualClock, day_of
+from gridbot.core.grid_logic import GridManager
+from gridbot.core.scheduler import PollScheduler
+from gridbot.state.manager import StateManager
+from gridbot.utils.logger import setup_logger, shutdown_logger
+
+T0 = 1_700_000_000.0  # fixed epoch keeps day rollover and client ids reproducible
+SPREAD = 0.01
+
+Tick = Tuple[float, float, float]  # (t, bid, ask)
+Scenario = Tuple[List[Tick], Dict[str, Any], Dict[str, int]]  # ticks, settings overrides, dropped calls
+
+# Baseline config; scenarios override individual fields
+BASE_SETTINGS = dict(
+    GRID_STEP_USD=1.0, TAKE_PROFIT_USD=1.0, MAX_LADDERS=15, MAX_OPEN_TRADES=40, QTY_PER_LADDER=1.0,
+    MAX_SPREAD_BPS=50.0, MAX_DAILY_USDT=1e9, DRY_RUN=False, INSTANT_TP_REFILL=True, TRAIL_UP=True,
+    TRAIL_TRIGGER_STEPS=1, ADAPTIVE_POLL=True, PRICE_REFRESH_SEC=0.1, POLL_MAX_SEC=2.0,
+    DUPLICATE_COOLDOWN_SEC=5.0, INTERVAL_STATUS_SEC=3600.0, TELEGRAM_BOT_TOKEN="", TELEGRAM_CHAT_ID="",
+    SESSION_RECORD_PATH="",
+)
+
+
+def price_path(waypoints: Sequence[Tuple[float, float]], dt: float = 0.05) -> List[Tick]:
+    """Ticks every `dt` seconds, linear between (seconds from start, bid) waypoints."""
+    ticks: List[Tick] = []
+    for (t_a, p_a), (t_b, p_b) in zip(waypoints, waypoints[1:]):
+        n = max(1, int(round((t_b - t_a) / dt)))
+        for i in range(n):
+            bid = round(p_a + (p_b - p_a) * i / n, 2)
+            ticks.append((T0 + t_a + i * dt, bid, round(bid + SPREAD, 2)))
+    t_end, p_end = waypoints[-1]
+    ticks.append((T0 + t_end, p_end, round(p_end + SPREAD, 2)))
+    return ticks
+
+
+class SimBroker(Broker):
+    """
+    In-memory exchange behind the Broker interface. Resting orders are matched
+    against every scripted tick up to the current time (BUY when ask <= price, TP
+    SELL when bid >= price), so a fill carries the tick time it actually happened.
+    `drop={"lookup_orders": 3}` makes every 3rd lookup_orders response never arrive.
+    """
+
+    def __init__(self, settings: Settings, clock: VirtualClock, ticks: List[Tick], latency: float = 0.03,
+                 timeout: float = 5.0, drop: Optional[Dict[str, int]] = None):
+        self.settings = settings
+        self.clock: VirtualClock = clock
+        self.ticks = ticks
+        self.times = [t for t, _, _ in ticks]
+        self.latency = latency
+        self.timeout = timeout
+        self.drop = drop or {}
+        self.order_nonce = 0
+        self.tick_size, self.step_size, self.min_qty, self.min_notional = 0.01, 0.1, 0.1, 0.0
+        self.price_precision, self.qty_precision = 2, 1
+        self.session_tag = "stress"
+        self.maker_fee, self.taker_fee = settings.MAKER_FEE, settings.TAKER_FEE
+        self.fee_rate = settings.MAKER_FEE  # every simulated fill is a maker fill
+        self.order_parser = OrderParser(self.clamp_price, self.clamp_qty, self.session_tag)
+
+        self.orders: Dict[str, Dict] = {}
+        self.resting: Dict[str, Dict] = {}
+        self.next_id = 1
+        self._matched_to = 0  # ticks [0, _matched_to) already applied
+        self.calls: Counter = Counter()
+        self.dropped = 0
+        self.buy_fill_times: Dict[float, List[float]] = {}  # entry price -> unhedged fill times
+        self.tp_latencies: List[float] = []
+        self.first_fill: Optional[float] = None
+        self.last_tp: Optional[float] = None
+        self.buy_fills = 0
+        self.tp_fills = 0
+        self.buys_by_day: Counter = Counter()
+
+    # --- Simulation ---
+
+    def _book(self, t: float) -> Tuple[float, float]:
+        i = max(0, bisect.bisect_right(self.times, t) - 1)
+        return self.ticks[i][1], self.ticks[i][2]
+
+    def _fill(self, o: Dict, t: float) -> None:
+        o.update(status="FILLED", executedQty=o["origQty"], avgPrice=o["price"], updateTime=int(t * 1000))
+        self.resting.pop(o["orderId"], None)
+        if o["side"] == "BUY":
+            self.buy_fills += 1
+            self.buys_by_day[day_of(t)] += 1
+            self.first_fill = t if self.first_fill is None else self.first_fill
+            self.buy_fill_times.setdefault(float(o["price"]), []).append(t)
+        else:
+            self.tp_fills += 1
+
+    def _crosses(self, o: Dict, bid: float, ask: float) -> bool:
+        px = float(o["price"])
+        return ask <= px if o["side"] == "BUY" else bid >= px
+
+    def _match(self) -> None:
+        end = bisect.bisect_right(self.times, self.clock.now)
+        for i in range(self._matched_to, end):
+            t, bid, ask = self.ticks[i]
+            for o in [o for o in self.resting.values() if self._crosses(o, bid, ask)]:
+                self._fill(o, t)
+        self._matched_to = max(self._matched_to, end)
+
+    def _request(self, method: str) -> bool:
+        """Spends the round trip on the clock; False -> the response never arrived."""
+        self.calls[method] += 1
+        n = self.drop.get(method)
+        if n and self.calls[method] % n == 0:
+            self.clock.advance(self.timeout)
+            self.dropped += 1
+            self._match()
+            return False
+        self.clock.advance(self.latency)
+        self._match()
+        return True
+
+    def _new(self, side: str, price: float, qty: float, cid: str, reduce_only: bool = False) -> Dict:
+        oid = str(self.next_id)
+        self.next_id += 1
+        o = {
+            "orderId": oid, "clientOrderId": cid, "side": side, "status": "NEW", "price": f"{price:.2f}",
+            "origQty": f"{qty:.1f}", "executedQty": "0", "reduceOnly": reduce_only,
+        }
+        self.orders[oid] = self.resting[oid] = o
+        if self._crosses(o, *self._book(self.clock.now)):
+            self._fill(o, self.clock.now)
+        return {"orderId": oid, "status": "NEW"}
+
+    # --- Broker interface ---
+
+    def limit_buy(self, price: float, qty: float, client_order_id: Optional[str] = None) -> dict:
+        if not self._request("limit_buy"):
+            raise TimeoutError("limit_buy: no response")
+        price = self.clamp_price(price)
+        return self._new("BUY", price, self.clamp_qty(qty), client_order_id or self._cid("B", price))
+
+    def limit_tp_reduce(self, entry: float, qty: float, client_order_id: Optional[str] = None) -> dict:
+        if not self._request("limit_tp_reduce"):
+            raise TimeoutError("limit_tp_reduce: no response")
+        entry = self.clamp_price(entry)
+        pending = self.buy_fill_times.get(entry)
+        if pending:
+            self.tp_latencies.append(self.clock.now - pending.pop(0))
+            self.last_tp = self.clock.now
+        px = self.clamp_price(entry + self.settings.TAKE_PROFIT_USD)
+        return self._new("SELL", px, self.clamp_qty(qty), client_order_id or self._cid("T", px), reduce_only=True)
+
+    def cancel_order(self, order_id: str) -> None:
+        if self._request("cancel_order") and order_id in self.resting:
+            self.resting.pop(order_id)["status"] = "CANCELED"
+
+    def modify_buys(self, amends: List[Tuple[str, float, float]]) -> List[dict]:
+        out: List[dict] = []
+        for i in range(0, len(amends), 5):
+            chunk = amends[i:i + 5]
+            if not self._request("modify_buys"):
+                out.extend({"code": -1, "msg": "timeout"} for _ in chunk)
+                continue
+            for oid, px, _ in chunk:
+                o = self.resting.get(oid)
+                if o is None:
+                    out.append({"code": -2013, "msg": "Order does not exist."})
+                    continue
+                o["price"] = f"{self.clamp_price(px):.2f}"
+                out.append({"orderId": oid, "status": "NEW", "price": o["price"]})
+                if self._crosses(o, *self._book(self.clock.now)):
+                    self._fill(o, self.clock.now)
+        return out
+
+    def cancel_orders(self, order_ids: List[str]) -> List[dict]:
+        out: List[dict] = []
+        for i in range(0, len(order_ids), 10):
+            chunk = order_ids[i:i + 10]
+            if not self._request("cancel_orders"):
+                out.extend({"code": -1, "msg": "timeout"} for _ in chunk)
+                continue
+            for oid in chunk:
+                o = self.resting.pop(oid, None)
+                if o is None:
+                    out.append({"code": -2011, "msg": "Unknown order sent."})
+                else:
+                    o["status"] = "CANCELED"
+                    out.append({"orderId": oid, "status": "CANCELED"})
+        return out
+
+    def get_open_orders(self) -> OpenOrders:
+        if not self._request("get_open_orders"):
+            return OpenOrders()
+        return self.order_parser.parse(list(self.resting.values()))
+
+    def get_order(self, order_id: str) -> Optional[Dict]:
+        if not self._request("get_order"):
+            return None
+        o = self.orders.get(order_id)
+        if o is None:
+            return {"status": "NOT_FOUND", "executedQty": "0", "origQty": str(self.settings.QTY_PER_LADDER)}
+        return dict(o)
+
+    def get_order_trades(self, order_id: str) -> List[Dict]:
+        if not self._request("get_order_trades"):
+            return []
+        o = self.orders.get(order_id)
+        if o is None or o["status"] != "FILLED":
+            return []
+        px, qty = float(o["price"]), float(o["origQty"])
+        return [{
+            "price": o["price"], "qty": o["origQty"], "commission": px * qty * self.fee_rate, "maker": True,
+            "time": o["updateTime"],
+        }]
+
+    def lookup_orders(self, order_ids: List[str], limit: int = 1000) -> Tuple[Dict[str, Dict], Dict[str, List[Dict]]]:
+        # Same request shape as the live broker: one allOrders page, one userTrades page if anything traded
+        if not order_ids or not self._request("lookup_orders"):
+            return {}, {}
+        orders = {oid: dict(self.orders[oid]) for oid in order_ids if oid in self.orders}
+        filled = [oid for oid, o in orders.items() if o["status"] == "FILLED"]
+        if not filled or not self._request("userTrades"):
+            return orders, {}
+        trades: Dict[str, List[Dict]] = {}
+        for oid in filled:
+            o = orders[oid]
+            px, qty = float(o["price"]), float(o["origQty"])
+            trades[oid] = [{"orderId": oid, "price": o["price"], "qty": o["origQty"],
+                            "commission": px * qty * self.fee_rate, "maker": True, "time": o["updateTime"]}]
+        return orders, trades
+
+
+class SimFeed:
+    """
+    FIFO tick source like the in-process price queue; records how many ticks wait behind
+    each one read. With a `book` mirror, the newest tick at the current time (not the one
+    being read: the stream runs on its own thread) is published to it as a depth diff that
+    moves the top of book.
+    """
+
+    def __init__(
+        self, clock: VirtualClock, ticks: List[Tick], stop_evt: threading.Event, book: Optional[BookMirror] = None
+    ):
+        self.clock = clock
+        self.ticks = ticks
+        self.times = [t for t, _, _ in ticks]
+        self.stop_evt = stop_evt
+        self.pos = 0
+        self.backlog: List[int] = []
+        self.book = book
+        if book is not None:
+            _, bid, ask = ticks[0]
+            book.book.load_snapshot({"lastUpdateId": 1, "bids": [[bid, 10.0]], "asks": [[ask, 10.0]]})
+            self._top = (bid, ask)
+
+    def _publish(self, book: BookMirror, bid: float, ask: float) -> None:
+        d = book.book
+        uid = d.last_update_id
+        old_bid, old_ask = self._top
+        self._top = (bid, ask)
+        book.handle({"e": "depthUpdate", "U": uid + 1, "u": uid + 1, "pu": uid,
+                          "b": [[old_bid, 0.0], [bid, 10.0]], "a": [[old_ask, 0.0], [ask, 10.0]]})
+
+    def get(self, timeout: float = 0.6) -> Tuple[float, float, float]:
+        if self.pos >= len(self.ticks):
+            self.stop_evt.set()
+            raise queue.Empty
+        t, bid, ask = self.ticks[self.pos]
+        if t > self.clock.now:
+            if t - self.clock.now > timeout:
+                self.clock.advance(timeout)
+                raise queue.Empty
+            self.clock.advance_to(t)
+        self.pos += 1
+        newest = bisect.bisect_right(self.times, self.clock.now)
+        self.backlog.append(newest - self.pos)
+        if self.book is not None:
+            # A liquid book sends a diff every interval, moved or not
+            _, top_bid, top_ask = self.ticks[newest - 1]
+            self._publish(self.book, top_bid, top_ask)
+        return bid, ask, (bid + ask) / 2.0
+
+
+# ===== Scenarios =====
+
+def _waterfall() -> Scenario:
+    """15 levels fill within one second, then the market goes flat."""
+    return price_path([(0, 100.0), (2, 100.0), (3, 84.0), (30, 84.0)]), {}, {}
+
+
+def _tp_cascade() -> Scenario:
+    """A fast dip fills 10 levels, then a one-second rally takes out every TP."""
+    return price_path([(0, 100.0), (2, 100.0), (2.5, 90.0), (8, 90.0), (9, 101.0), (30, 101.0)]), {}, {}
+
+
+def _reanchor_inflight() -> Scenario:
+    """Dip and immediate rally: fills are still being confirmed while the grid trails up."""
+    return price_path([(0, 100.0), (2, 100.0), (2.5, 94.0), (3.5, 106.0), (30, 106.0)]), {}, {}
+
+
+def _day() -> Scenario:
+    """24 hours of hourly 4-dollar swings on a daily budget of about six BUYs, across a day rollover."""
+    waypoints = [(h * 3600 + m, p) for h in range(24) for m, p in ((0, 100.0), (1800, 96.0))] + [(86400, 100.0)]
+    return price_path(waypoints, dt=30.0), {"MAX_DAILY_USDT": 600.0}, {}
+
+
+def _blackhole() -> Scenario:
+    """Waterfall while some exchange responses never arrive (each costs the full timeout)."""
+    ticks, overrides, _ = _waterfall()
+    return ticks, overrides, {"lookup_orders": 3, "get_open_orders": 7, "limit_tp_reduce": 5}
+
+
+SCENARIOS: Dict[str, Callable[[], Scenario]] = {
+    "waterfall": _waterfall,
+    "tp_cascade": _tp_cascade,
+    "reanchor_inflight": _reanchor_inflight,
+    "blackhole": _blackhole,
+    "day": _day,
+}
+
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    s = sorted(xs)
+    return s[min(len(s) - 1, max(0, int(round(q * len(s))) - 1))]
+
+
+def run_scenario(
+    name: str, latency: float = 0.03, timeout: float = 5.0, workdir: Optional[str] = None, book: bool = False
+) -> Dict:
+    # Imported here: __main__ owns process-wide globals and signal handlers
+    from gridbot.__main__ import processor_loop
+
+    ticks, overrides, drop = SCENARIOS[name]()
+    with tempfile.TemporaryDirectory(prefix="gridbot-stress-") as tmp:
+        base = workdir or tmp
+        settings = dataclasses.replace(
+            # One placement at a time: the simulated exchange runs on the processor's virtual clock
+            Settings(), **{**BASE_SETTINGS, **overrides, "ORDER_PIPELINE_DEPTH": 1,
+                           "STATE_FILE": f"{base}/stress_state.json", "CSV_FILE": f"{base}/stress_trades.csv"},
+        )
+        clock = VirtualClock(ticks[0][0])
+        stop_evt = threading.Event()
+        broker = SimBroker(settings, clock, ticks, latency=latency, timeout=timeout, drop=drop)
+        mirror = BookMirror(settings, clock) if book else None
+        feed = SimFeed(clock, ticks, stop_evt, mirror)
+        state_manager = StateManager(settings, clock=clock)
+        state_manager.init_csv()
+        grid_manager = GridManager(settings, state_manager, broker)
+        processor_loop(settings, state_manager, grid_manager, feed, stop_evt, PollScheduler(settings),
+                       initial_mid=(ticks[0][1] + ticks[0][2]) / 2.0, book=mirror)
+
+    lat = broker.tp_latencies
+    burst = 0.0
+    if broker.first_fill is not None and broker.last_tp is not None:
+        burst = broker.last_tp - broker.first_fill
+    return {
+        "scenario": name,
+        "buy_fills": broker.buy_fills,
+        "tp_placed": len(lat),
+        "tp_fills": broker.tp_fills,
+        "unhedged": sum(len(v) for v in broker.buy_fill_times.values()),
+        "fills_per_sec": round(len(lat) / burst, 3) if burst > 0 else float(len(lat)),
+        "tp_latency_p50": round(_pct(lat, 0.50), 3),
+        "tp_latency_p90": round(_pct(lat, 0.90), 3),
+        "tp_latency_p99": round(_pct(lat, 0.99), 3),
+        "tp_latency_max": round(max(lat), 3) if lat else 0.0,
+        "ticks": len(feed.backlog),
+        "backlog_max": max(feed.backlog, default=0),
+        "backlog_mean": round(sum(feed.backlog) / len(feed.backlog), 2) if feed.backlog else 0.0,
+        "requests": sum(broker.calls.values()),
+        "dropped": broker.dropped,
+        "realized_pnl": round(state_manager.state.realized_pnl, 6),
+        "buys_by_day": dict(sorted(broker.buys_by_day.items())),
+        "sim_sec": round(clock.now - ticks[0][0], 3),
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(
+        prog="python -m gridbot.stress", description="Burst stress scenarios against a simulated exchange."
+    )
+    ap.add_argument("scenarios", nargs="*", metavar="SCENARIO", help=f"one of {', '.join(SCENARIOS)} (default: all)")
+    ap.add_argument("--latency", type=float, default=0.03, help="simulated round trip per request (s)")
+    ap.add_argument("--timeout", type=float, default=5.0, help="cost of a response that never arrives (s)")
+    ap.add_argument("--book", action="store_true", help="detect fills through a simulated book mirror (gridbot.book)")
+    ap.add_argument("--json", action="store_true")
+    args = ap.parse_args(argv)
+    unknown = [n for n in args.scenarios if n not in SCENARIOS]
+    if unknown:
+        ap.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    setup_logger("ERROR")
+    try:
+        names = args.scenarios or list(SCENARIOS)
+        results = [run_scenario(n, args.latency, args.timeout, book=args.book) for n in names]
+    finally:
+        shutdown_logger()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            print(f"== {r['scenario']}")
+            for k, v in r.items():
+                if k != "scenario":
+                    print(f"{k:>16}: {v}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,153 @@
+"""
+Binary tick recorder / reader.
+
+Every tick is one fixed-width little-endian record (40 bytes):
+    mono_ns i64 | exchange_ms i64 | bid f64 | ask f64 | seq u64
+
+Records go to one segment file per UTC day, `<dir>/<SYMBOL>-YYYYMMDD.ticks`. A segment
+has no header, so a partially written trailing record (crash mid-write) is simply
+ignored by the reader.
+"""
+from array import array
+import datetime
+import glob
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import TYPE_CHECKING, Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    import numpy as np
+
+RECORD = struct.Struct("<qqddQ")
+FIELDS = ("mono_ns", "exchange_ms", "bid", "ask", "seq")
+_TYPECODES = ("q", "q", "d", "d", "Q")
+
+Tick = Tuple[int, int, float, float, int]
+
+
+def segment_path(directory: str, symbol: str, day: datetime.date) -> str:
+    return os.path.join(directory, f"{symbol.upper()}-{day.strftime('%Y%m%d')}.ticks")
+
+
+class TickRecorder:
+    """
+    Appends ticks through a buffered file handle; the OS write happens every
+    `flush_every` records or `flush_sec` seconds, so the price path only pays for a
+    struct pack and a memory copy. `close` flushes and may be called from any thread;
+    later appends are ignored.
+    """
+
+    def __init__(self, directory: str, symbol: str, flush_every: int = 256, flush_sec: float = 1.0):
+        self.directory = directory
+        self.symbol = symbol
+        self.flush_every = flush_every
+        self.flush_sec = flush_sec
+        self.seq = 0
+        self._day: Optional[datetime.date] = None
+        self._f: Optional[BinaryIO] = None
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        self._closed = False
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _roll(self, day: datetime.date) -> BinaryIO:
+        self._close_segment()
+        path = segment_path(self.directory, self.symbol, day)
+        f = open(path, "ab", buffering=RECORD.size * self.flush_every)
+        # Drop a torn trailing record left by a crash so records stay aligned
+        tail = f.tell() % RECORD.size
+        if tail:
+            f.truncate(f.tell() - tail)
+            f.seek(0, os.SEEK_END)
+        self._f, self._day = f, day
+        return f
+
+    def append(self, bid: float, ask: float, exchange_ms: int = 0, seq: int = 0) -> None:
+        """Records one tick. `seq` defaults to a local counter when the source has none."""
+        ts = (exchange_ms / 1000.0) if exchange_ms else time.time()
+        day = datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc).date()
+        with self._lock:
+            if self._closed:
+                return
+            self.seq = seq if seq else self.seq + 1
+            f = self._f if day == self._day and self._f is not None else self._roll(day)
+            f.write(RECORD.pack(time.monotonic_ns(), exchange_ms, bid, ask, self.seq))
+            self._pending += 1
+            now = time.monotonic()
+            if self._pending >= self.flush_every or now - self._last_flush >= self.flush_sec:
+                f.flush()
+                self._pending = 0
+                self._last_flush = now
+
+    def _close_segment(self) -> None:
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        self._pending = 0
+
+    def close(self) -> None:
+        """Flushes buffered ticks to disk; idempotent."""
+        with self._lock:
+            self._closed = True
+            self._close_segment()
+
+
+class TickSegment:
+    """Read-only memory map over one segment file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.fstat(self._f.fileno()).st_size
+        self.count = size // RECORD.size
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self) -> Iterator[Tick]:
+        if not self.count or self._mm is None:
+            return
+        # Unpack straight from the mapping; release the view so close() can unmap
+        with memoryview(self._mm) as mv, mv[: self.count * RECORD.size] as view:
+            yield from RECORD.iter_unpack(view)
+
+    def columns(self) -> Dict[str, array]:
+        """Column arrays (mono_ns, exchange_ms, bid, ask, seq) in one pass."""
+        cols: List["array[Any]"] = [array(tc) for tc in _TYPECODES]
+        for rec in self:
+            for c, v in zip(cols, rec):
+                c.append(v)
+        return dict(zip(FIELDS, cols))
+
+    def to_numpy(self) -> "np.ndarray":
+        """Zero-copy structured NumPy view over the mapping (requires numpy; keep the segment open while it is used)."""
+        import numpy as np
+
+        dtype = np.dtype([("mono_ns", "<i8"), ("exchange_ms", "<i8"), ("bid", "<f8"), ("ask", "<f8"), ("seq", "<u8")])
+        if not self.count or self._mm is None:
+            return np.zeros(0, dtype=dtype)
+        return np.frombuffer(self._mm, dtype=dtype, count=self.count)
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+        self._f.close()
+
+
+def list_segments(directory: str, symbol: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, f"{symbol.upper()}-*.ticks")))
+
+
+def replay(directory: str, symbol: str) -> Iterator[Tick]:
+    """Yields every recorded tick for `symbol`, oldest segment first."""
+    for path in list_segments(directory, symbol):
+        seg = TickSegment(path)
+        try:
+            yield from seg
+        finally:
+            seg.close()
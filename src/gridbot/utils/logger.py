@@ -1,51 +1,154 @@
 """
 Centralized logging configuration for the grid trading bot.
+
+Call sites log with %-style arguments (`log.debug("[SKIP %s] ...", px)`), so nothing
+is formatted unless the level is enabled. Records that pass the level and the
+rate limiter are handed to a queue as-is; formatting and all stdout/file I/O
+happen on the listener thread, not on the processor thread.
 """
+import copy
 import logging
-import sys
+import logging.handlers
 from pathlib import Path
-from typing import Optional
+import queue
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def kv(_limit: bool = True, **fields: Any) -> Dict[str, Any]:
+    """
+    Structured fields for a log call: `log.info("...", extra=kv(price=px, oid=oid))`.
+    `_limit=False` exempts the record from rate limiting (e.g. a periodic status line). Trade
+    events (orders opened, fills) always pass it: each one is an audit record.
+    """
+    return {"fields": fields, "no_limit": not _limit}
+
+
+class StructuredFormatter(logging.Formatter):
+    """Appends `key=value` pairs from `extra=kv(...)` to the formatted message."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        s = super().format(record)
+        dropped = getattr(record, "suppressed", 0)
+        if dropped:
+            s += f" (+{dropped} similar suppressed)"
+        fields = getattr(record, "fields", None)
+        if fields:
+            s += " | " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return s
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Lets at most `burst` records per call site (logger + message template) through per
+    `period` seconds; the next record after a quiet spell reports how many were dropped.
+    ERROR and above are never limited.
+    """
+
+    def __init__(self, period: float = 10.0, burst: int = 5):
+        super().__init__()
+        self.period = period
+        self.burst = burst
+        self._sites: Dict[Tuple[str, str], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR or self.burst <= 0 or getattr(record, "no_limit", False):
+            return True
+        key = (record.name, record.msg if isinstance(record.msg, str) else repr(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.period:
+                dropped = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                if dropped:
+                    record.suppressed = dropped
+                return True
+            if site[1] < self.burst:
+                site[1] += 1
+                return True
+            site[2] += 1
+            return False
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread."""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return copy.copy(record)
+
 
 def setup_logger(
     log_level: str = "INFO",
     log_file: Optional[Path] = None,
     log_format: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    rate_period: float = 10.0,
+    rate_burst: int = 5,
 ) -> None:
     """
     Setup centralized logging configuration.
-    
+
     Args:
         log_level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
         log_file: Optional path to log file. If None, logs only to console
         log_format: Format string for log messages
+        rate_period: Window (seconds) of the per-call-site rate limiter
+        rate_burst: Records allowed per call site per window (0 disables limiting)
     """
-    # Create logger
+    global _listener
+    shutdown_logger()
+
     root_logger = logging.getLogger("gridbot")
     root_logger.setLevel(getattr(logging, log_level.upper()))
+    root_logger.propagate = False
+    for h in list(root_logger.handlers):
+        root_logger.removeHandler(h)
 
-    # Create formatter
-    formatter = logging.Formatter(log_format)
+    formatter = StructuredFormatter(log_format)
 
-    # Console handler
+    handlers: List[logging.Handler] = []
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setFormatter(formatter)
-    root_logger.addHandler(console_handler)
+    handlers.append(console_handler)
 
-    # File handler (if log_file specified)
     if log_file:
         log_file.parent.mkdir(parents=True, exist_ok=True)
         file_handler = logging.FileHandler(log_file)
         file_handler.setFormatter(formatter)
-        root_logger.addHandler(file_handler)
+        handlers.append(file_handler)
+
+    q: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    qh = _DeferredQueueHandler(q)
+    qh.addFilter(RateLimitFilter(rate_period, rate_burst))
+    root_logger.addHandler(qh)
+
+    _listener = logging.handlers.QueueListener(q, *handlers, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logger() -> None:
+    """Drains the queue and stops the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
 
 def get_logger(name: str) -> logging.Logger:
     """
     Get a logger instance with the specified name.
-    
+
     Args:
         name: Name for the logger, typically __name__ of the module
-        
+
     Returns:
         Logger instance
     """
-    return logging.getLogger(f"gridbot.{name}")
\ No newline at end of file
+    if name == "gridbot" or name.startswith("gridbot."):
+        return logging.getLogger(name)
+    return logging.getLogger(f"gridbot.{name}")
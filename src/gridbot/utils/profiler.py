@@ -0,0 +1,175 @@
+"""
+On-demand sampling profiler for the running bot.
+
+A daemon thread periodically snapshots the stacks of the watched threads via
+`sys._current_frames()`. While off it only waits on an event (and checks the
+optional control file once a second), so it costs nothing on the hot path.
+Toggle it with SIGUSR1 or by creating/removing the control file; every stop
+writes a collapsed-stack file (flamegraph.pl / speedscope compatible) and a
+speedscope JSON into the output directory.
+"""
+from collections import Counter
+import json
+import os
+import sys
+import threading
+import time
+from types import CodeType, FrameType
+from typing import Any, Dict, List
+
+from gridbot.utils.logger import get_logger
+
+log = get_logger(__name__)
+
+
+_labels: Dict[CodeType, str] = {}
+
+
+def _frame_label(frame: FrameType) -> str:
+    """`module:function:first line`, from the code object only; other threads' frame state is never read."""
+    code = frame.f_code
+    label = _labels.get(code)
+    if label is None:
+        mod = os.path.splitext(os.path.basename(code.co_filename))[0]
+        label = _labels[code] = f"{mod}:{code.co_name}:{code.co_firstlineno}"
+    return label
+
+
+class SamplingProfiler:
+    def __init__(self, out_dir: str = "profiles", hz: float = 100.0, control_file: str = ""):
+        self.out_dir = out_dir
+        self.interval = 1.0 / max(1.0, hz)
+        self.control_file = control_file
+        self.threads: Dict[int, str] = {}
+        self.samples: Dict[str, Counter] = {}
+        self.active = False
+        self.started_at = 0.0
+        self._toggle = threading.Event()
+        self._lock = threading.Lock()
+
+    def watch(self, thread: threading.Thread) -> None:
+        if thread.ident is not None:
+            self.threads[thread.ident] = thread.name
+
+    # --- Control ---
+
+    def toggle(self, *_: Any) -> None:
+        """Safe to call from a signal handler: just wakes the sampler thread."""
+        self._toggle.set()
+
+    def _set_active(self, on: bool) -> None:
+        if on == self.active:
+            return
+        if on:
+            with self._lock:
+                self.samples = {name: Counter() for name in self.threads.values()}
+            self.started_at = time.time()
+            self.active = True
+            log.info("[PROFILE] sampling ON (%.0f Hz, threads=%s)", 1.0 / self.interval, list(self.threads.values()))
+        else:
+            self.active = False
+            paths = self.dump()
+            log.info("[PROFILE] sampling OFF -> %s", ", ".join(paths) if paths else "no samples")
+
+    # --- Sampling ---
+
+    def _sample(self) -> None:
+        frames = sys._current_frames()
+        for ident, name in self.threads.items():
+            frame = frames.get(ident)
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                stack.reverse()
+                self.samples[name][tuple(stack)] += 1
+
+    def run(self, stop_evt: threading.Event) -> None:
+        """Sampler thread body."""
+        last_ctl = 0.0
+        ctl_present = False
+        while not stop_evt.is_set():
+            if self.active:
+                t0 = time.perf_counter()
+                with self._lock:
+                    self._sample()
+                wait = self.interval - (time.perf_counter() - t0)
+                if self._toggle.wait(max(0.0, wait)):
+                    self._toggle.clear()
+                    self._set_active(False)
+            elif self._toggle.wait(1.0):
+                self._toggle.clear()
+                self._set_active(True)
+
+            # Control file is edge-triggered so it does not fight with SIGUSR1 toggles
+            if self.control_file:
+                now = time.time()
+                if now - last_ctl >= 1.0:
+                    last_ctl = now
+                    present = os.path.exists(self.control_file)
+                    if present != ctl_present:
+                        ctl_present = present
+                        self._set_active(present)
+
+        if self.active:
+            self._set_active(False)
+
+    # --- Output ---
+
+    def dump(self) -> List[str]:
+        with self._lock:
+            samples = {k: v for k, v in self.samples.items() if v}
+        if not samples:
+            return []
+        os.makedirs(self.out_dir, exist_ok=True)
+        ms = int(self.started_at * 1000) % 1000
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self.started_at)) + f"-{ms:03d}"
+        base = os.path.join(self.out_dir, f"profile-{stamp}")
+        n = 1
+        while os.path.exists(base + ".collapsed"):
+            n += 1
+            base = os.path.join(self.out_dir, f"profile-{stamp}-{n}")
+
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for thread, counts in samples.items():
+                for stack, n in counts.most_common():
+                    f.write(f"{thread};{';'.join(stack)} {n}\n")
+
+        frames: List[Dict] = []
+        index: Dict[str, int] = {}
+        profiles = []
+        for thread, counts in samples.items():
+            stacks, weights = [], []
+            for stack, n in counts.most_common():
+                ids = []
+                for label in stack:
+                    i = index.get(label)
+                    if i is None:
+                        i = index[label] = len(frames)
+                        frames.append({"name": label})
+                    ids.append(i)
+                stacks.append(ids)
+                weights.append(n * self.interval)
+            profiles.append({
+                "type": "sampled", "name": thread, "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights), "samples": stacks, "weights": weights,
+            })
+        with open(base + ".speedscope.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "$schema": "https://www.speedscope.app/file-format-schema.json",
+                "shared": {"frames": frames},
+                "profiles": profiles,
+                "name": f"gridbot {stamp}",
+            }, f)
+        return [base + ".collapsed", base + ".speedscope.json"]
+
+
+def start_profiler(
+    out_dir: str, hz: float, control_file: str, threads: List[threading.Thread], stop_evt: threading.Event
+) -> SamplingProfiler:
+    prof = SamplingProfiler(out_dir, hz, control_file)
+    for t in threads:
+        prof.watch(t)
+    threading.Thread(target=prof.run, args=(stop_evt,), name="profiler", daemon=True).start()
+    return prof
@@ -0,0 +1,43 @@
+"""Tests for analytics.py"""
+from gridbot.analytics import TradeLogStats, scan, seek_day
+
+ROWS = [
+    "time,event,price,qty,pnl,total_pnl,note",
+    "2025-01-01T10:00:00,LIMIT_BUY_OPEN,99.0,1.0,0.0,0.0,orderId=1",
+    "2025-01-01T10:05:00,BUY_FILLED_CONFIRMED,99.0,1.0,0.0,0.0,orderId=1",
+    '2025-01-01T11:00:00,LIMIT_OPEN_ERROR,98.0,0.0,0.0,0.0,"boom, with comma"',
+    "2025-01-02T09:00:00,TP_FILLED,100.0,1.0,0.9,0.9,entry=99.0 fee=0.1 maker",
+    "2025-01-02T09:00:01,LIMIT_BUY_OPEN,99.0,1.0,0.0,0.9,orderId=2",
+]
+
+
+def _write(tmp_path, rows):
+    p = tmp_path / "trades.csv"
+    p.write_text("\n".join(rows) + "\n", encoding="utf-8")
+    return str(p)
+
+
+def test_scan_aggregates(tmp_path):
+    path = _write(tmp_path, ROWS)
+    st = TradeLogStats()
+    scan(path, st, chunk_size=64)
+    d = st.to_dict()
+    assert d["rows"] == 5 and d["bad_rows"] == 0
+    assert d["errors"] == {"LIMIT_OPEN_ERROR": 1}
+    assert d["days"]["2025-01-02"]["pnl"] == 0.9
+    assert d["levels"]["99.0"] == {"opens": 2, "fills": 1, "tp_closes": 1, "fill_rate": 0.5}
+
+
+def test_seek_day_and_partial_tail(tmp_path):
+    path = _write(tmp_path, ROWS)
+    start = seek_day(path, "2025-01-02")
+    st = TradeLogStats()
+    scan(path, st, start)
+    assert list(st.to_dict()["days"]) == ["2025-01-02"]
+
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("2025-01-03T00:00:00,TP_FI")  # half-written row
+    st = TradeLogStats()
+    offset = scan(path, st)
+    assert st.rows == 5
+    assert offset < len(open(path, "rb").read())
@@ -0,0 +1,58 @@
+"""Tests for broker/binance_connector.py (Broker.lookup_orders paging)"""
+import dataclasses
+
+from gridbot.broker.binance_connector import Broker
+from gridbot.config.settings import Settings
+
+
+class _Exchange(Broker):
+    """Serves /allOrders and /userTrades from a list of orders 1..n, one trade per filled order."""
+
+    def __init__(self, n, filled):
+        self.settings = dataclasses.replace(Settings(), DRY_RUN=False)
+        self.orders = [
+            {"orderId": i, "executedQty": "1" if i in filled else "0", "time": i * 1000, "updateTime": i * 1000 + 500}
+            for i in range(1, n + 1)
+        ]
+        self.trades = [
+            {"id": i, "orderId": i, "price": "100", "qty": "1", "time": i * 1000 + 500} for i in sorted(filled)
+        ]
+        self.calls = []
+
+    def _signed_call(self, method, path, params):
+        self.calls.append((path, dict(params)))
+        if path == "/allOrders":
+            rows = [od for od in self.orders if od["orderId"] >= params["orderId"]]
+        elif "fromId" in params:
+            rows = [t for t in self.trades if t["id"] >= params["fromId"]]
+        else:
+            rows = [t for t in self.trades if t["time"] >= params["startTime"]]
+        return rows[:params["limit"]]
+
+
+def test_old_resting_order_does_not_page_through_everything_since():
+    ex = _Exchange(5000, filled={3, 4990, 4995})
+    orders, trades = ex.lookup_orders(["3", "4990", "4995", "4999"], limit=100)
+
+    assert set(orders) == {"3", "4990", "4995", "4999"}
+    assert {oid: [t["id"] for t in ts] for oid, ts in trades.items()} == {"3": [3], "4990": [4990], "4995": [4995]}
+    assert [p for p, _ in ex.calls].count("/allOrders") == 2
+    assert [p for p, _ in ex.calls].count("/userTrades") == 1  # only 3 trades: one page covers both clusters
+
+
+def test_trades_jump_to_the_next_cluster_across_a_gap():
+    filled = set(range(1, 401)) | {4990}
+    ex = _Exchange(5000, filled=filled)
+    orders, trades = ex.lookup_orders(["150", "4990"], limit=100)
+
+    assert [t["id"] for t in trades["150"]] == [150] and [t["id"] for t in trades["4990"]] == [4990]
+    trade_calls = [q for p, q in ex.calls if p == "/userTrades"]
+    assert trade_calls[0] == {"startTime": 149000, "limit": 100}
+    assert trade_calls[-1] == {"startTime": 4989000, "limit": 100}
+    assert len(trade_calls) == 2
+
+
+def test_unknown_ids_are_left_out():
+    ex = _Exchange(50, filled=set())
+    orders, trades = ex.lookup_orders(["7", "999", "n/a"])
+    assert set(orders) == {"7"} and trades == {}
@@ -0,0 +1,85 @@
+"""Tests for gridbot/book.py"""
+import dataclasses
+
+from gridbot.book import BookMirror, DepthBook, LevelWatch
+from gridbot.config.settings import Settings
+from gridbot.core.clock import VirtualClock
+
+
+def _snapshot(uid=100):
+    return {"lastUpdateId": uid, "bids": [["99.0", "5"], ["98.0", "7"]], "asks": [["100.0", "4"], ["101.0", "2"]]}
+
+
+def _diff(first, last, prev, bids=(), asks=()):
+    return {"e": "depthUpdate", "U": first, "u": last, "pu": prev, "b": list(bids), "a": list(asks)}
+
+
+def test_depth_book_sequencing_and_best_prices():
+    book = DepthBook()
+    book.load_snapshot(_snapshot(100))
+    assert book.apply(_diff(90, 99, 89))  # older than the snapshot: dropped
+    assert book.apply(_diff(95, 105, 94, bids=[["99.5", "3"]]))
+    assert book.best_bid == 99.5
+    assert book.apply(_diff(106, 110, 105, bids=[["99.5", "0"]], asks=[["100.0", "0"]]))
+    assert book.best_bid == 99.0 and book.best_ask == 101.0
+    assert not book.apply(_diff(120, 125, 118))  # pu != previous u
+    assert not book.synced
+
+    book.load_snapshot(_snapshot(200))
+    assert not book.apply(_diff(205, 210, 204))  # first diff must straddle lastUpdateId
+    book.load_snapshot(_snapshot(200))
+    assert book.apply(_diff(201, 203, 200))
+
+
+def test_queue_ahead_is_traded_through():
+    book = DepthBook()
+    book.load_snapshot(_snapshot())
+    watch = LevelWatch(recheck_sec=2.0)
+    watch.track([("BUY", 98.0, "b1", 1.0), ("SELL", 101.0, "t1", 1.0)], book, now=0.0)
+    assert watch.levels["b1"].ahead == 7.0
+
+    watch.on_trade(98.0, 5.0, buyer_is_maker=True)
+    book.apply(_diff(95, 101, 94, bids=[["98.0", "3"]]))  # 2 more cancelled ahead of us
+    watch.on_book(book)
+    assert watch.levels["b1"].ahead == 2.0
+    watch.on_trade(98.0, 2.5, buyer_is_maker=True)
+    assert watch.pop_hits(1.0) == []
+    watch.on_trade(98.0, 0.5, buyer_is_maker=True)
+    assert watch.pop_hits(1.0) == [("BUY", 98.0, "b1")]
+
+    # Still open after the check: not re-reported until the recheck interval passes
+    watch.track([("BUY", 98.0, "b1", 1.0), ("SELL", 101.0, "t1", 1.0)], book, now=1.5)
+    assert "b1" not in watch.levels
+    watch.track([("BUY", 98.0, "b1", 1.0), ("SELL", 101.0, "t1", 1.0)], book, now=3.5)
+    assert "b1" in watch.levels
+
+
+def test_crossing_trade_and_book_report_levels():
+    book = DepthBook()
+    book.load_snapshot(_snapshot())
+    watch = LevelWatch()
+    watch.track([("BUY", 98.0, "b1", 1.0), ("SELL", 101.0, "t1", 1.0), ("SELL", 103.0, "t2", 1.0)], book, now=0.0)
+    watch.on_trade(97.9, 0.1, buyer_is_maker=True)
+    watch.on_trade(101.0, 0.1, buyer_is_maker=False)  # at the TP, behind 2 resting
+    assert watch.pop_hits(0.0) == [("BUY", 98.0, "b1")]
+    book.apply(_diff(95, 101, 94, bids=[["103.0", "1"]]))
+    watch.on_book(book)
+    assert sorted(watch.pop_hits(0.0)) == [("SELL", 101.0, "t1"), ("SELL", 103.0, "t2")]
+
+    # A level already through the book when first tracked is reported without waiting for a diff
+    watch.track([("BUY", 104.0, "b2", 1.0)], book, now=5.0)
+    assert watch.pop_hits(5.0) == [("BUY", 104.0, "b2")]
+
+
+def test_mirror_buffers_until_snapshot_and_splits_hits():
+    settings = dataclasses.replace(Settings(), QTY_PER_LADDER=1.0, BOOK_STALE_SEC=3.0)
+    clock = VirtualClock(1000.0)
+    mirror = BookMirror(settings, clock)
+    assert not mirror.handle({"stream": "x@depth@100ms", "data": _diff(95, 101, 94, bids=[["97.0", "1"]])})
+    mirror.book.load_snapshot(_snapshot())  # what resync() does with the REST snapshot
+    assert mirror.live()
+    mirror.track([(98.0, "b1")], [(101.0, "t1", 1.0)], now=clock.time())
+    mirror.handle({"data": {"e": "aggTrade", "p": "97.5", "q": "1", "m": True}})
+    assert mirror.hits(clock.time()) == ([(98.0, "b1")], [])
+    clock.advance(5.0)
+    assert not mirror.live()
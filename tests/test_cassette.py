@@ -0,0 +1,154 @@
+"""Record/replay round trip for broker/cassette.py and gridbot.replay"""
+import dataclasses
+import queue
+import threading
+import time
+
+import pytest
+
+from gridbot.__main__ import processor_loop
+from gridbot.broker.binance_connector import Broker
+from gridbot.broker.cassette import (
+    VERSION,
+    CassetteWriter,
+    RecordingBroker,
+    RecordingFeed,
+    ReplaySession,
+    load_session,
+    session_header,
+)
+from gridbot.broker.orders import OrderParser
+from gridbot.config.settings import Settings
+from gridbot.core.grid_logic import GridManager
+from gridbot.replay import replay_session
+from gridbot.state.manager import StateManager
+
+
+class _Exchange(Broker):
+    """In-memory matching: BUYs fill when ask reaches them, TPs when bid does."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.order_nonce = 0
+        self.tick_size, self.step_size, self.min_qty, self.min_notional = 0.01, 0.1, 0.1, 0.0
+        self.price_precision, self.qty_precision = 2, 1
+        self.session_tag, self.maker_fee, self.taker_fee = "t1", 0.0002, 0.0005
+        self.order_parser = OrderParser(self.clamp_price, self.clamp_qty, self.session_tag)
+        self.orders, self.bid, self.ask, self.next_id = {}, 0.0, 0.0, 1
+        self.lock = threading.Lock()
+
+    def _new(self, side, price, qty, cid, ro=False):
+        with self.lock:  # BUYs arrive from the placement pipeline's threads
+            oid = str(self.next_id)
+            self.next_id += 1
+        self.orders[oid] = {"orderId": oid, "clientOrderId": cid, "side": side, "status": "NEW",
+                            "price": str(price), "origQty": str(qty), "executedQty": "0", "reduceOnly": ro}
+        return {"orderId": oid, "status": "NEW"}
+
+    def limit_buy(self, price, qty, client_order_id=None):
+        return self._new("BUY", self.clamp_price(price), self.clamp_qty(qty), client_order_id or self._cid("B", price))
+
+    def limit_tp_reduce(self, entry, qty, client_order_id=None):
+        px = self.clamp_price(entry + self.settings.TAKE_PROFIT_USD)
+        return self._new("SELL", px, self.clamp_qty(qty), client_order_id or self._cid("T", px), ro=True)
+
+    def cancel_order(self, order_id):
+        if order_id in self.orders:
+            self.orders[order_id]["status"] = "CANCELED"
+
+    def cancel_orders(self, order_ids):
+        for oid in order_ids:
+            self.cancel_order(oid)
+        return [{"orderId": oid, "status": "CANCELED"} for oid in order_ids]
+
+    def _match(self):
+        for o in self.orders.values():
+            px = float(o["price"])
+            crossed = self.ask <= px if o["side"] == "BUY" else self.bid >= px
+            if o["status"] == "NEW" and crossed:
+                o.update(status="FILLED", executedQty=o["origQty"], avgPrice=o["price"])
+
+    def get_open_orders(self):
+        self._match()
+        return self.order_parser.parse([o for o in self.orders.values() if o["status"] == "NEW"])
+
+    def get_order(self, order_id):
+        self._match()
+        return dict(self.orders[order_id]) if order_id in self.orders else None
+
+    def get_order_trades(self, order_id):
+        return []
+
+    def lookup_orders(self, order_ids, limit=1000):
+        self._match()
+        return {oid: dict(self.orders[oid]) for oid in order_ids if oid in self.orders}, {}
+
+
+class _Feed:
+    def __init__(self, prices, exchange, stop_evt):
+        self.prices, self.exchange, self.stop_evt = list(prices), exchange, stop_evt
+
+    def get(self, timeout=0.6):
+        if not self.prices:
+            self.stop_evt.set()
+            raise queue.Empty
+        bid = self.prices.pop(0)
+        self.exchange.bid, self.exchange.ask = bid, bid + 0.01
+        return bid, bid + 0.01, bid + 0.005
+
+
+def test_record_then_replay_matches(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), DRY_RUN=False, INSTANT_TP_REFILL=True, TRAIL_UP=False, MAX_LADDERS=3, MAX_SPREAD_BPS=50.0,
+        GRID_STEP_USD=1.0, TAKE_PROFIT_USD=1.0, QTY_PER_LADDER=1.0, TELEGRAM_BOT_TOKEN="", ADAPTIVE_POLL=False,
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    exchange = _Exchange(settings)
+    sm = StateManager(settings)
+    sm.init_csv()
+    path = str(tmp_path / "session.jsonl.gz")
+    writer = CassetteWriter(path, session_header(settings, exchange, sm.snapshot(), 100.005))
+    gm = GridManager(settings, sm, RecordingBroker(exchange, writer))
+    stop_evt = threading.Event()
+    prices = [100.0, 99.5, 98.9, 98.2, 99.0, 99.6, 100.1, 100.0]
+    feed = RecordingFeed(_Feed(prices, exchange, stop_evt), writer)
+    processor_loop(settings, sm, gm, feed, stop_evt, initial_mid=100.005)
+    writer.close()
+    assert sm.state.total_sells > 0
+
+    out = replay_session(path, workdir=str(tmp_path / "replay"))
+    assert (out["missed"], out["unexpected"], out["arg_mismatch"]) == (0, 0, 0)
+    assert out["realized_pnl"] == round(sm.state.realized_pnl, 6)
+    assert (out["total_buys"], out["total_sells"]) == (sm.state.total_buys, sm.state.total_sells)
+
+
+class _SlowBroker:
+    def cancel_order(self, order_id):
+        time.sleep(0.05)
+        raise RuntimeError("unknown order")
+
+    def get_order(self, order_id):
+        time.sleep(0.05)
+        return {"orderId": order_id, "status": "FILLED"}
+
+
+def test_replay_reproduces_recorded_call_latency(tmp_path):
+    path = str(tmp_path / "session.jsonl.gz")
+    writer = CassetteWriter(path, {"v": VERSION, "t": 0.0})
+    broker = RecordingBroker(_SlowBroker(), writer)
+    with pytest.raises(RuntimeError):
+        broker.cancel_order("1")
+    assert broker.get_order(order_id="2")["status"] == "FILLED"
+    writer.close()
+
+    header, events = load_session(path)
+    assert [ev[0] for ev in events] == ["x", "c"] and all(ev[5] >= 0.05 for ev in events)
+    session = ReplaySession(header, events)
+    for ev, method in zip(events, ["cancel_order", "get_order"]):
+        assert session.next_call(method, [ev[3][0]]) is ev
+        assert session.time() == ev[1] + ev[5]  # the call returns after its recorded duration
+
+    # Version 1 cassettes carry no duration
+    session = ReplaySession({"v": 1, "t": 0.0}, [["c", 5.0, "get_order", ["2"], {"status": "NEW"}]])
+    session.next_call("get_order", ["2"])
+    assert session.time() == 5.0
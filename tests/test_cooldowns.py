@@ -0,0 +1,44 @@
+"""Tests for core/cooldowns.py and GridManager's use of it"""
+import dataclasses
+
+from gridbot.config.settings import Settings
+from gridbot.core.clock import VirtualClock
+from gridbot.core.cooldowns import PENDING, RECENT, SUPPRESSED, CooldownRegistry
+from gridbot.core.grid_logic import GridManager
+from gridbot.state.manager import StateManager
+
+
+def test_blocks_report_their_reason_and_expire_on_the_wheel():
+    reg = CooldownRegistry(now=100.0, resolution=1.0, slots=8)
+    reg.block(95.0, SUPPRESSED, 103.0)
+    reg.block(95.0, SUPPRESSED, 101.0)  # a shorter block does not cut the longer one
+    reg.block(94.0, PENDING, 102.5)
+    reg.block(93.0, RECENT, 130.0)      # several revolutions out
+    assert reg.reason(95.0, 102.0) == SUPPRESSED and reg.reason(95.0, 103.0) is None
+    assert reg.reason(93.0, 110.0, ignore=(RECENT,)) is None
+
+    reg.release(94.0, PENDING)
+    assert reg.expire(104.0) == [(95.0, SUPPRESSED)] and len(reg) == 1
+    assert reg.expire(120.0) == []
+    assert reg.expire(1000.0) == [(93.0, RECENT)] and len(reg) == 0
+
+
+def test_recent_submissions_survive_a_restart_and_are_pruned_once_expired(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+        TELEGRAM_BOT_TOKEN="", DUPLICATE_COOLDOWN_SEC=90.0,
+    )
+    clock = VirtualClock(1000.0)
+    sm = StateManager(settings, clock=clock)
+    sm.state.recent_submissions = {"95.0": 950.0, "94.0": 800.0}
+    gm = GridManager(settings, sm, broker=None)
+
+    assert gm.cooldowns.reason(95.0, clock.time()) == RECENT
+    assert gm.cooldowns.reason(94.0, clock.time()) is None
+    clock.advance(1.0)  # swept once its wheel slot has passed
+    gm._expire_cooldowns(clock.time())
+    assert sm.state.recent_submissions == {"95.0": 950.0}
+
+    clock.advance(40.0)
+    gm._expire_cooldowns(clock.time())
+    assert sm.state.recent_submissions == {}
@@ -0,0 +1,106 @@
+"""Tests for the shared-memory price feed in gridbot/feed.py"""
+import queue
+
+import pytest
+
+from gridbot.core.clock import VirtualClock
+from gridbot.feed import _HEADER, _RECORD, FeedReader, FeedWriter
+
+
+class _Clock(VirtualClock):
+    """Virtual clock that runs `on_sleep` (once) when the reader backs off."""
+
+    def __init__(self, now, on_sleep=None):
+        super().__init__(now)
+        self.on_sleep = on_sleep
+        self.sleeps = 0
+
+    def sleep(self, sec):
+        self.sleeps += 1
+        if self.on_sleep is not None:
+            fn, self.on_sleep = self.on_sleep, None
+            fn()
+        super().sleep(sec)
+
+
+def _pair(tmp_path, clock, capacity=8):
+    path = str(tmp_path / "feed")
+    return FeedWriter(path, "SOLUSDT", capacity), FeedReader(path, "SOLUSDT", stale_sec=5.0, poll_sec=0.01, clock=clock)
+
+
+def test_round_trip_returns_the_newest_tick(tmp_path):
+    clock = _Clock(1000.0)
+    writer, reader = _pair(tmp_path, clock)
+    writer.publish(100.0, 100.5, ts=1000.0)
+    assert reader.get(timeout=0.1) == (100.0, 100.5, 100.25)
+
+    for i in range(1, 4):
+        writer.publish(100.0 + i, 100.5 + i, ts=1000.0)
+    assert reader.get(timeout=0.1) == (103.0, 103.5, 103.25)  # older unread ticks are conflated
+    assert reader.last_seq == 4 and reader.dropped == 2
+
+    # A restarted writer continues the sequence instead of going backwards
+    writer.close()
+    again = FeedWriter(writer.path, "SOLUSDT", 8)
+    assert again.publish(104.0, 104.02, ts=1000.0) == 5
+    assert reader.get(timeout=0.1)[0] == 104.0
+    again.close()
+
+
+def test_torn_record_is_retried_not_returned(tmp_path):
+    clock = _Clock(1000.0)
+    writer, reader = _pair(tmp_path, clock)
+    writer.publish(100.0, 100.02, ts=1000.0)
+    assert reader.get(timeout=0.1)[0] == 100.0
+
+    # The writer published seq 2 in the header but has only stamped the record's first half
+    seq = 2
+    off = _HEADER.size + (seq % writer.capacity) * _RECORD.size
+    _RECORD.pack_into(writer._mm, off, seq, 1000.0, 101.0, 101.5, 101.25, 0)
+    writer._mm[_HEADER.size - 8:_HEADER.size] = seq.to_bytes(8, "little")
+    assert reader.read(seq) is None and reader.latest() is None
+
+    # The reader backs off and sees the completed record on its next look
+    clock.on_sleep = lambda: _RECORD.pack_into(writer._mm, off, seq, 1000.0, 101.0, 101.5, 101.25, seq)
+    assert reader.get(timeout=0.1) == (101.0, 101.5, 101.25)
+    assert clock.sleeps == 1
+    writer.close()
+
+
+def test_stale_writer_is_reported_until_it_recovers(tmp_path):
+    clock = _Clock(1000.0)
+    writer, reader = _pair(tmp_path, clock)
+    writer.publish(100.0, 100.02, ts=990.0)  # 10 s old
+    with pytest.raises(queue.Empty):
+        reader.get(timeout=0.1)
+    assert reader.stale
+
+    # No new tick either: still stale, still Empty
+    with pytest.raises(queue.Empty):
+        reader.get(timeout=0.1)
+    assert reader.stale
+
+    writer.publish(100.5, 100.52, ts=clock.time())
+    assert reader.get(timeout=0.1)[0] == 100.5 and not reader.stale
+    writer.close()
+
+
+def test_get_times_out_like_queue_get(tmp_path):
+    clock = _Clock(1000.0)
+    reader = FeedReader(str(tmp_path / "missing"), "SOLUSDT", poll_sec=0.01, clock=clock)
+    with pytest.raises(queue.Empty):
+        reader.get(timeout=0.5)  # no feed file yet
+    assert clock.time() == pytest.approx(1000.5)
+
+    writer, reader = _pair(tmp_path, clock)
+    writer.publish(100.0, 100.02, ts=clock.time())
+    reader.get(timeout=0.5)
+    start = clock.time()
+    with pytest.raises(queue.Empty):
+        reader.get(timeout=0.5)  # nothing new since the last get
+    assert clock.time() - start == pytest.approx(0.5)
+
+    # A tick published while the reader waits is handed out before the deadline
+    clock.on_sleep = lambda: writer.publish(100.1, 100.12, ts=clock.time())
+    assert reader.get(timeout=0.5)[0] == 100.1
+    writer.close()
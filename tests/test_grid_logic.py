@@ -1,7 +1,17 @@
 """Basic tests for strategy/grid_logic.py"""
+import numpy as np
 import pytest
 
-from gridbot.strategy.grid_logic import compute_grid_levels
+from gridbot.core.utils import format_step
+from gridbot.strategy.grid_logic import (
+    arithmetic_ladders,
+    blocked_mask,
+    buy_ladder,
+    compute_grid_levels,
+    geometric_ladders,
+    select_capacity,
+    snap_to_tick,
+)
 
 
 def test_compute_grid_levels_basic():
@@ -16,3 +26,28 @@ def test_invalid_args():
         compute_grid_levels(100.0, grid_size=0, spacing=1.0)
     with pytest.raises(ValueError):
         compute_grid_levels(100.0, grid_size=3, spacing=0)
+
+
+def test_snap_matches_broker_clamp():
+    for tick in (0.01, 0.1, 0.001, 1.0):
+        xs = np.array([99.3, 100.0 - 0.1 * 3, 0.3, 12345.678901, 1e-3 * 7])
+        snapped = snap_to_tick(xs, tick)
+        assert snapped.tolist() == [float(format_step(x, tick)) for x in xs.tolist()]
+
+
+def test_ladders_for_many_mids():
+    mids = np.array([100.0, 150.25, 99.99])
+    buys = arithmetic_ladders(mids, step=0.5, levels=4, tick=0.01)
+    assert buys.shape == (3, 4)
+    assert buys[1].tolist() == [149.75, 149.25, 148.75, 148.25]
+    geo = geometric_ladders(mids, ratio=0.01, levels=2, tick=0.01, side=1)
+    assert geo[0].tolist() == [101.0, 102.01]
+
+
+def test_capacity_selection_skips_blocked_levels():
+    ladder = arithmetic_ladders([100.0, 50.0], step=1.0, levels=6, tick=0.01)
+    mask = blocked_mask(ladder, [99.0, 97.0, 49.0], tick=0.01)
+    selected, depth = select_capacity(mask, 3)
+    assert ladder[0][selected[0]].tolist() == [98.0, 96.0, 95.0]
+    assert depth.tolist() == [5, 4]
+    assert buy_ladder(100.0, 1.0, 3, 0.01, [99.0, 97.0]) == [99.0, 98.0, 97.0, 96.0, 95.0]
@@ -0,0 +1,113 @@
+"""Tests for core/hedge.py and clientOrderId-safe order retries"""
+import dataclasses
+import time
+
+import pytest
+import requests
+
+from gridbot.broker import binance_connector
+from gridbot.broker.binance_connector import Broker
+from gridbot.config.settings import Settings
+from gridbot.core.clock import VirtualClock
+from gridbot.core.hedge import RequestHedger
+
+
+def _sender(stall_host: str, stall_sec: float):
+    calls = []
+
+    def send(method, url, **kwargs):
+        calls.append(url)
+        time.sleep(stall_sec if url.startswith(stall_host) else 0.01)
+        return url
+
+    return send, calls
+
+
+def test_late_primary_is_hedged_to_alternate():
+    send, calls = _sender("https://a", 0.5)
+    h = RequestHedger(["https://a", "https://b"], min_sec=0.03, max_sec=0.05, send=send)
+    t0 = time.time()
+    r, _, _ = h.request("GET", "https://a/fapi/v1/openOrders?x=1", timeout=5)
+    assert r == "https://b/fapi/v1/openOrders?x=1"
+    assert time.time() - t0 < 0.3
+    assert h.hedged == 1 and h.won == 1
+    assert calls[0].startswith("https://a")
+
+
+def test_fast_primary_is_not_hedged_and_failure_fails_over():
+    send, calls = _sender("https://slow", 1.0)
+    h = RequestHedger(["https://a", "https://b"], min_sec=0.2, max_sec=0.2, send=send)
+    r, _, _ = h.request("GET", "https://a/fapi/v1/time")
+    assert r.startswith("https://a") and h.hedged == 0 and len(calls) == 1
+
+    def refuse_a(method, url, **kwargs):
+        if url.startswith("https://a"):
+            raise requests.exceptions.ConnectionError("refused")
+        return url
+
+    h = RequestHedger(["https://a", "https://b"], min_sec=5.0, max_sec=5.0, send=refuse_a)
+    t0 = time.time()
+    assert h.request("GET", "https://a/fapi/v1/time")[0].startswith("https://b")
+    assert time.time() - t0 < 1.0  # no waiting out the hedge delay after a hard failure
+
+
+def test_hedge_delay_follows_recent_percentile():
+    h = RequestHedger(["https://a"], percentile=0.9, min_sec=0.05, max_sec=2.0, send=lambda *a, **k: None)
+    key = "GET /fapi/v1/ticker/bookTicker"
+    assert h.delay(key) == 2.0  # nothing observed yet
+    for i in range(100):
+        h.latency.observe(key, 0.1 if i < 95 else 3.0)  # 5% stalls
+    assert h.delay(key) == pytest.approx(0.1)
+    assert h.routes("https://a/fapi/v1/time") == ["https://a/fapi/v1/time"] * 3
+
+
+class _Resp:
+    def __init__(self, status: int, body: dict):
+        self.status_code = status
+        self._body = body
+
+    def json(self):
+        return self._body
+
+
+def _broker():
+    b = object.__new__(Broker)
+    b.settings = dataclasses.replace(Settings(), DRY_RUN=False, API_SECRET="s", SYMBOL="SOLUSDT")
+    b.clock = VirtualClock(1_700_000_000.0)
+    return b
+
+
+def _exchange(monkeypatch, post_outcomes, lookup):
+    log = []
+
+    def fake(method, url, **kwargs):
+        log.append(method)
+        if method == "POST":
+            out = post_outcomes.pop(0)
+            if isinstance(out, Exception):
+                raise out
+            return _Resp(200, out)
+        if lookup is None:
+            raise requests.exceptions.HTTPError(response=_Resp(400, {"code": -2013, "msg": "Order does not exist."}))
+        return _Resp(200, lookup)
+
+    monkeypatch.setattr(binance_connector, "request_with_retry", fake)
+    return log
+
+
+def test_timed_out_order_is_resubmitted_only_if_absent(monkeypatch):
+    params = {"symbol": "SOLUSDT", "side": "BUY", "newClientOrderId": "B-x-9900-1"}
+
+    log = _exchange(monkeypatch, [requests.exceptions.ReadTimeout("stall"), {"orderId": 7, "status": "NEW"}], None)
+    assert _broker()._futures_order(params)["orderId"] == 7
+    assert log == ["POST", "GET", "POST"]
+
+    log = _exchange(monkeypatch, [requests.exceptions.ReadTimeout("stall")], {"orderId": 5, "status": "NEW"})
+    assert _broker()._futures_order(params)["orderId"] == 5
+    assert log == ["POST", "GET"]
+
+    rejected = requests.exceptions.HTTPError(response=_Resp(400, {"code": -2019}))
+    log = _exchange(monkeypatch, [rejected], None)
+    with pytest.raises(requests.exceptions.HTTPError):
+        _broker()._futures_order(params)
+    assert log == ["POST"]
@@ -0,0 +1,23 @@
+"""Tests for strategy/ladder.py"""
+from gridbot.strategy.ladder import plan_ladder
+
+
+def test_shift_up_amends_instead_of_cancel_place():
+    current = {95.0: "a", 96.0: "b", 97.0: "c", 98.0: "d"}
+    target = [97.0, 98.0, 99.0, 100.0]
+    plan = plan_ladder(current, target)
+    assert plan.keep == [97.0, 98.0]
+    # farthest stale order moves to the level closest to the market
+    assert plan.amend == [("a", 95.0, 100.0), ("b", 96.0, 99.0)]
+    assert plan.cancel == [] and plan.place == []
+    assert plan.requests == 2
+
+
+def test_leftovers_are_cancelled_or_placed():
+    plan = plan_ladder({90.0: "a", 91.0: "b"}, [100.0])
+    assert plan.amend == [("a", 90.0, 100.0)]
+    assert plan.cancel == [(91.0, "b")]
+
+    plan = plan_ladder({90.0: "a"}, [100.0, 99.0, 98.0], max_place=1)
+    assert plan.amend == [("a", 90.0, 100.0)]
+    assert plan.place == [99.0]
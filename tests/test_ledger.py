@@ -0,0 +1,128 @@
+"""Tests for state/ledger.py and how GridManager books TP exits into it"""
+import dataclasses
+
+from gridbot.broker.orders import OpenOrders, OrderParser
+from gridbot.config.settings import Settings
+from gridbot.core.grid_logic import GridManager
+from gridbot.state.ledger import Fill, PnLLedger, RollingWindow
+from gridbot.state.manager import Position, StateManager
+
+
+def _fill(ts, side, price, qty=1.0, fee=0.01, maker=True):
+    return Fill(ts=ts, side=side, price=price, qty=qty, commission=fee, maker=maker, order_id="x")
+
+
+def test_round_trip_books_actual_fills():
+    led = PnLLedger()
+    buy = _fill(1_000.0, "BUY", 99.98, fee=0.02)
+    led.record_fill(buy)
+    pnl = led.close_round_trip(100.0, buy.price, buy.commission, buy.ts, _fill(1_600.0, "SELL", 101.0, fee=0.03))
+
+    assert abs(pnl - (1.02 - 0.05)) < 1e-9
+    assert abs(led.fees - 0.05) < 1e-12
+    assert abs(led.turnover - (99.98 + 101.0)) < 1e-9
+    assert led.fills == 2 and led.maker_fills == 2 and led.round_trips == 1
+    st = led.level_stats(100.0)
+    assert st["round_trips"] == 1 and st["avg_hold_sec"] == 600.0
+
+
+def test_rolling_window_expires_old_buckets():
+    w = RollingWindow(3600, 60)
+    w.add(0.0, pnl=1.0)
+    w.add(1800.0, pnl=2.0)
+    assert w.totals(1800.0)["pnl"] == 3.0
+    assert w.totals(3700.0)["pnl"] == 2.0
+    assert w.totals(9000.0)["pnl"] == 0.0
+
+
+def test_persistence_round_trip():
+    led = PnLLedger()
+    led.close_round_trip(100.0, 100.0, 0.0, 0.0, _fill(50.0, "SELL", 101.0, fee=0.0))
+    again = PnLLedger.from_dict(led.to_dict())
+    assert again.realized_pnl == led.realized_pnl
+    assert again.level_stats(100.0)["round_trips"] == 1
+    assert again.window("1h", 60.0)["pnl"] == 1.0
+
+
+class _TpBroker:
+    """The crossed TP reports `status`; a replacement TP gets the next orderId."""
+    session_tag, tick_size, step_size, maker_fee, taker_fee = "t1", 0.01, 0.1, None, None
+
+    def __init__(self, status):
+        self.status, self.placed = status, []
+
+    def clamp_price(self, px):
+        return round(px, 2)
+
+    def clamp_qty(self, q):
+        return round(q, 1)
+
+    def lookup_orders(self, order_ids, limit=1000):
+        return {oid: {"orderId": oid, "status": self.status, "executedQty": "0"} for oid in order_ids}, {}
+
+    def get_open_orders(self):
+        return OpenOrders()
+
+    def limit_tp_reduce(self, entry, qty, client_order_id=None):
+        self.placed.append((entry, qty, client_order_id))
+        return {"orderId": "8", "clientOrderId": client_order_id}
+
+
+def test_crossed_tp_that_ends_canceled_keeps_the_lot(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), DRY_RUN=False, TAKE_PROFIT_USD=1.0, TELEGRAM_BOT_TOKEN="",
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    sm = StateManager(settings)
+    sm.state.positions = [Position(100.0, 1.0, 101.0, "7")]
+    broker = _TpBroker("CANCELED")
+    gm = GridManager(settings, sm, broker)
+
+    gm.process_positions_vs_market(101.5)
+
+    assert sm.state.realized_pnl == 0.0 and sm.state.total_sells == 0 and sm.ledger.round_trips == 0
+    assert [(p.entry, p.tp_id) for p in sm.state.positions] == [(100.0, "8")]
+    assert broker.placed == [(100.0, 1.0, "T-t1-10000-1000")]
+
+
+def test_crossed_lot_without_a_tp_is_never_booked(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), DRY_RUN=False, TAKE_PROFIT_USD=1.0, TELEGRAM_BOT_TOKEN="",
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    sm = StateManager(settings)
+    sm.state.positions = [Position(100.0, 1.0, 101.0, "7")]
+    broker = _TpBroker("CANCELED")
+
+    def _rejected(entry, qty, client_order_id=None):
+        broker.placed.append((entry, qty, client_order_id))
+        raise RuntimeError("-2022 ReduceOnly Order is rejected")
+
+    broker.limit_tp_reduce = _rejected
+    gm = GridManager(settings, sm, broker)
+
+    gm.process_positions_vs_market(101.5)  # TP ended unfilled, the replacement fails
+    gm.process_positions_vs_market(101.5)  # still crossed: retried, not booked
+    assert sm.state.realized_pnl == 0 and sm.state.total_sells == 0 and sm.ledger.round_trips == 0
+    assert [(p.entry, p.tp_id) for p in sm.state.positions] == [(100.0, "")]
+    assert len(broker.placed) == 2
+
+
+def test_lot_adopts_its_live_tp_instead_of_placing_another(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), DRY_RUN=False, TAKE_PROFIT_USD=1.0, TELEGRAM_BOT_TOKEN="",
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    sm = StateManager(settings)
+    sm.state.positions = [Position(100.0, 1.0, 101.0, "n/a")]  # placed, but the ack carried no orderId
+    broker = _TpBroker("FILLED")
+    parser = OrderParser(broker.clamp_price, broker.clamp_qty, "t1")
+    live = [{"orderId": 9, "clientOrderId": "T-t1-10000-1000", "side": "SELL", "status": "NEW",
+             "price": "101.00", "origQty": "1", "reduceOnly": True}]
+    broker.get_open_orders = lambda: parser.parse(live)
+    gm = GridManager(settings, sm, broker)
+
+    gm.process_positions_vs_market(101.5)
+    assert [p.tp_id for p in sm.state.positions] == ["9"] and broker.placed == []
+    gm.process_positions_vs_market(101.5)  # now looked up and booked
+    assert sm.state.positions == [] and sm.state.total_sells == 1
@@ -0,0 +1,68 @@
+"""Tests for utils/logger.py"""
+import dataclasses
+import logging
+
+from gridbot.config.settings import Settings
+from gridbot.core.grid_logic import GridManager
+from gridbot.state.manager import StateManager
+from gridbot.utils.logger import RateLimitFilter, StructuredFormatter, kv, setup_logger, shutdown_logger
+
+
+def _record(msg, level=logging.INFO, **extra):
+    rec = logging.LogRecord("gridbot.test", level, __file__, 1, msg, (), None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_rate_limit_per_call_site_and_report_suppressed():
+    f = RateLimitFilter(period=0.05, burst=2)
+    passed = [f.filter(_record("[SKIP %s] cooldown")) for _ in range(5)]
+    assert passed == [True, True, False, False, False]
+    # another template is limited independently, errors and exempt records never are
+    assert f.filter(_record("[CAP] %s"))
+    assert f.filter(_record("[SKIP %s] cooldown", logging.ERROR))
+    assert f.filter(_record("[SKIP %s] cooldown", **kv(_limit=False)))
+
+    import time
+    time.sleep(0.06)
+    rec = _record("[SKIP %s] cooldown")
+    assert f.filter(rec) and rec.suppressed == 3
+
+
+def test_structured_fields_appended():
+    rec = _record("[FILL] BUY filled @ %s", **kv(qty=1.0, oid="42"))
+    rec.args = (100.5,)
+    out = StructuredFormatter("%(message)s").format(rec)
+    assert out == "[FILL] BUY filled @ 100.5 | qty=1.0 oid=42"
+
+
+class _Broker:
+    session_tag, maker_fee, taker_fee = "t1", None, None
+
+    def clamp_price(self, px):
+        return round(px, 2)
+
+    def clamp_qty(self, q):
+        return round(q, 1)
+
+    def limit_tp_reduce(self, entry, qty, client_order_id=None):
+        return {"orderId": f"tp{entry}", "clientOrderId": client_order_id}
+
+
+def test_trade_events_are_never_rate_limited(tmp_path):
+    log_file = tmp_path / "bot.log"
+    settings = dataclasses.replace(
+        Settings(), TAKE_PROFIT_USD=1.0, TELEGRAM_BOT_TOKEN="",
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    gm = GridManager(settings, StateManager(settings), _Broker())
+    setup_logger("INFO", log_file, "%(message)s", rate_period=60.0, rate_burst=5)
+    try:
+        for i in range(20):
+            gm.on_buy_fill_confirmed(90.0 + i, 1.0, str(i), trades=[])
+        gm.process_positions_vs_market(200.0)
+    finally:
+        shutdown_logger()
+    lines = log_file.read_text().splitlines()
+    for tag in ("[FILL] BUY filled", "[TP] OPEN", "[TP] FILLED"):
+        assert sum(line.startswith(tag) for line in lines) == 20, tag
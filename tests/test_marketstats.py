@@ -0,0 +1,39 @@
+"""Tests for core/marketstats.py"""
+import math
+import statistics
+
+from gridbot.config.settings import Settings
+from gridbot.core.marketstats import MarketStats, RollingWindow
+
+
+def test_rolling_window_matches_full_recompute():
+    w = RollingWindow(8)
+    xs = [math.sin(i) * 3 + i * 0.01 for i in range(50)]
+    for x in xs:
+        w.push(x)
+    assert w.n == 8
+    assert math.isclose(w.mean, statistics.fmean(xs[-8:]), abs_tol=1e-12)
+    assert math.isclose(w.std, statistics.pstdev(xs[-8:]), rel_tol=1e-9)
+
+
+def test_one_wide_tick_does_not_move_the_gate():
+    stats = MarketStats(Settings())
+    t = 1000.0
+    for _ in range(20):
+        stats.observe(100.0, 100.01, t)
+        t += 0.5
+    stats.observe(99.0, 101.0, t)  # ~200 bps for one tick
+    assert stats.spread_bps > 100
+    assert stats.spread_avg_bps < 50
+
+
+def test_rate_and_velocity_follow_the_stream():
+    stats = MarketStats(Settings())
+    t, mid = 1000.0, 100.0
+    for _ in range(400):
+        stats.observe(mid - 0.005, mid + 0.005, t)
+        t += 0.25
+        mid += 0.05  # 0.2 USD/sec up
+    assert math.isclose(stats.tick_rate, 4.0, rel_tol=0.05)
+    assert math.isclose(stats.velocity.value, 0.2, rel_tol=0.01)
+    assert stats.volatility_bps > 0
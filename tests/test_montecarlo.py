@@ -0,0 +1,83 @@
+"""Tests for gridbot/montecarlo.py"""
+import dataclasses
+import math
+
+import numpy as np
+import pytest
+
+from gridbot.config.settings import Settings
+from gridbot.montecarlo import bootstrap_paths, gbm_paths, simulate, tick_returns
+from gridbot.ticks import TickRecorder
+
+
+def _settings(**kw):
+    base = dict(GRID_STEP_USD=1.0, TAKE_PROFIT_USD=2.0, MAX_LADDERS=4, MAX_OPEN_TRADES=6, QTY_PER_LADDER=0.5,
+                TRAIL_UP=True, TRAIL_TRIGGER_STEPS=1, MAX_DAILY_USDT=10000.0, MAKER_FEE=0.0002)
+    base.update(kw)
+    return dataclasses.replace(Settings(), **base)
+
+
+def _reference(s: Settings, prices: np.ndarray, steps_per_day: float):
+    """The same rules, one path at a time over plain sets of levels (in grid steps)."""
+    eps, tp_steps = 1e-9, s.TAKE_PROFIT_USD / s.GRID_STEP_USD
+    base = math.ceil(prices[0] / s.GRID_STEP_USD - eps)
+    lots, spent, realized, max_value, max_lots, full_steps = set(), 0.0, 0.0, 0.0, 0, 0
+    for t, p in enumerate(prices[1:], 1):
+        x = p / s.GRID_STEP_USD
+        if t % steps_per_day < 1:
+            spent = 0.0
+        for lv in [lv for lv in lots if lv + tp_steps <= x + eps]:
+            lots.remove(lv)
+            entry = lv * s.GRID_STEP_USD
+            realized += s.QTY_PER_LADDER * (s.TAKE_PROFIT_USD - s.MAKER_FEE * (2 * entry + s.TAKE_PROFIT_USD))
+        if s.TRAIL_UP and math.ceil(x - eps) >= base + s.TRAIL_TRIGGER_STEPS:
+            base = math.ceil(x - eps)
+        per_level = s.QTY_PER_LADDER * s.GRID_STEP_USD * max(base - 1, 1)
+        afford = math.floor(max(s.MAX_DAILY_USDT - spent, 0.0) / per_level)
+        cap = max(0, min(s.MAX_LADDERS, s.MAX_OPEN_TRADES - len(lots), afford))
+        buys, lv = [], base - 1
+        while len(buys) < cap:
+            if lv not in lots:
+                buys.append(lv)
+            lv -= 1
+        for lv in buys:
+            if lv >= x - eps:
+                lots.add(lv)
+                spent += s.QTY_PER_LADDER * lv * s.GRID_STEP_USD
+        max_value = max(max_value, s.QTY_PER_LADDER * s.GRID_STEP_USD * sum(lots))
+        max_lots = max(max_lots, len(lots))
+        full_steps += len(lots) >= s.MAX_OPEN_TRADES
+    return max_value, max_lots, realized, full_steps / (len(prices) - 1)
+
+
+@pytest.mark.parametrize(
+    "kw", [{}, {"TRAIL_UP": False}, {"MAX_DAILY_USDT": 300.0}, {"GRID_STEP_USD": 0.5, "TAKE_PROFIT_USD": 0.75}]
+)
+def test_vectorized_rules_match_a_per_path_reference(kw):
+    s = _settings(**kw)
+    steps, spd = 400, 100.0
+    prices = np.array(list(gbm_paths(40, steps, 100.0, 0.06, spd, seed=7))).T
+    r = simulate(s, prices.T, spd)
+    for i in range(prices.shape[0]):
+        max_value, max_lots, realized, at_cap = _reference(s, prices[i], spd)
+        assert r["max_notional"][i] == pytest.approx(max_value)
+        assert r["max_lots"][i] == max_lots
+        assert r["realized_pnl"][i] == pytest.approx(realized)
+        assert r["at_capacity"][i] == pytest.approx(at_cap)
+    assert r["max_lots"].max() == s.MAX_OPEN_TRADES or kw  # the default config hits capacity somewhere
+
+
+def test_bootstrap_from_recorded_ticks(tmp_path):
+    rec = TickRecorder(str(tmp_path), "SOLUSDT")
+    t0 = 1_700_000_000_000
+    for i in range(600):
+        mid = 100.0 + 3.0 * math.sin(i / 40.0)
+        rec.append(mid - 0.01, mid + 0.01, exchange_ms=t0 + i * 1000)
+    rec.close()
+
+    returns = tick_returns(str(tmp_path), "SOLUSDT", 10.0)
+    assert returns.size == 59 and abs(returns).max() < 0.01
+    paths = list(bootstrap_paths(returns, 1000, 120, 100.0, block=20, seed=1))
+    assert len(paths) == 121 and paths[0].shape == (1000,)
+    r = simulate(_settings(), paths, 8640.0)
+    assert r["max_lots"].max() > 0 and (r["realized_pnl"] >= 0).all()
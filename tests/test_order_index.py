@@ -0,0 +1,84 @@
+"""Tests for state/order_index.py"""
+from gridbot.state.manager import BotState
+from gridbot.state.order_index import OrderIndex
+
+
+def test_lookups_stay_in_step():
+    idx = OrderIndex({99.0: "a", 97.0: "c"})
+    idx.set(98.0, "b", "B-t-9800-1")
+    assert list(idx) == [97.0, 98.0, 99.0]
+    assert (idx.min_price(), idx.max_price()) == (97.0, 99.0)
+    assert idx.price_of("b") == 98.0 and idx.price_of_client("B-t-9800-1") == 98.0
+    assert idx.below(98.5) == [(97.0, "c"), (98.0, "b")]
+    assert idx.lowest(1) == [(97.0, "c")]
+
+    idx.set(96.0, "b")  # amended to a new price
+    assert 98.0 not in idx and idx.price_of("b") == 96.0
+    assert idx.price_of_client("B-t-9800-1") is None
+    idx[99.0] = "d"  # replaced at the same price
+    assert idx.price_of("a") is None
+    assert idx.pop_id("c") == 97.0
+    assert idx == {96.0: "b", 99.0: "d"}
+    assert idx.to_dict() == {"96.0": "b", "99.0": "d"}
+
+
+def test_state_indexes_plain_dicts():
+    state = BotState()
+    state.open_buy_price_to_id = {95.0: "x"}
+    assert isinstance(state.open_buy_price_to_id, OrderIndex)
+    assert state.open_buy_price_to_id.price_of("x") == 95.0
+
+
+def test_unacknowledged_submissions_do_not_collide():
+    idx = OrderIndex()
+    idx.set(99.0, "n/a")
+    idx.set(98.0, "n/a")
+    assert idx == {98.0: "n/a", 99.0: "n/a"}
+    assert idx.price_of("n/a") is None
+
+
+class _AmendBroker:
+    tick_size, min_qty = 0.01, 0.1
+
+    def __init__(self):
+        self.amends = []
+
+    def clamp_price(self, px):
+        return round(px, 2)
+
+    def modify_buys(self, amends):
+        self.amends.extend(amends)
+        return [{"orderId": oid, "status": "NEW"} for oid, _, _ in amends]  # no clientOrderId echoed
+
+    def cancel_orders(self, order_ids):
+        return [{"orderId": oid, "status": "CANCELED"} for oid in order_ids]
+
+    def lookup_orders(self, order_ids, limit=1000):
+        return {oid: {"orderId": oid, "status": "NEW"} for oid in order_ids}, {}
+
+
+def test_client_ids_survive_reanchor_amends_and_vanish_checks(tmp_path):
+    import dataclasses
+
+    from gridbot.config.settings import Settings
+    from gridbot.core.grid_logic import GridManager
+    from gridbot.state.manager import StateManager
+
+    settings = dataclasses.replace(
+        Settings(), GRID_STEP_USD=1.0, MAX_LADDERS=3, TRAIL_UP=True, TRAIL_TRIGGER_STEPS=1, TELEGRAM_BOT_TOKEN="",
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    gm = GridManager(settings, StateManager(settings), _AmendBroker())
+    idx = gm.state.open_buy_price_to_id
+    gm.state.base_price = 100.0
+    for px, oid in ((99.0, "a"), (98.0, "b"), (97.0, "c")):
+        idx.set(px, oid, f"B-t-{int(px * 100)}-1")
+
+    gm.reanchor_up_if_needed(101.2)
+    moved = {oid: new_px for oid, new_px, _ in gm.broker.amends}
+    assert moved == {"c": 101.0, "b": 100.0}
+    assert idx.price_of_client("B-t-9700-1") == 101.0 and idx.client_id_at(100.0) == "B-t-9800-1"
+
+    # A vanished BUY that turns out to be alive is restored with its clientOrderId
+    gm.confirm_and_process_vanished([(99.0, "a")], debounce=False)
+    assert idx[99.0] == "a" and idx.price_of_client("B-t-9900-1") == 99.0
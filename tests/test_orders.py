@@ -0,0 +1,33 @@
+"""Tests for broker/orders.py"""
+import json
+
+from gridbot.broker.orders import OrderParser
+
+
+def _clamp(p):
+    return float(int(p * 100)) / 100  # tick 0.01, floor
+
+
+def _parser():
+    return OrderParser(_clamp, lambda q: max(q, 0.1), "t1")
+
+
+def test_parse_once_with_flags_and_views():
+    raw = json.dumps([
+        {"orderId": 1, "clientOrderId": "B-t1-abc", "side": "BUY", "status": "NEW", "price": "99.999",
+         "origQty": "1", "reduceOnly": False},
+        {"orderId": 2, "clientOrderId": "web_x", "side": "BUY", "status": "PARTIALLY_FILLED", "price": "98.00",
+         "origQty": "1", "reduceOnly": False},
+        {"orderId": 3, "clientOrderId": "T-t1-def", "side": "SELL", "status": "NEW", "price": "101.00",
+         "origQty": "1", "reduceOnly": True},
+        {"orderId": 4, "clientOrderId": "B-t1-old", "side": "BUY", "status": "CANCELED", "price": "97.00",
+         "origQty": "1"},
+        {"orderId": 5, "side": "BUY", "status": "NEW", "price": "not-a-number"},
+    ]).encode()
+    snap = _parser().parse(raw)
+
+    assert len(snap) == 4  # malformed record skipped
+    assert [o.order_id for o in snap.buys] == ["1", "2"]
+    assert snap.buys[0].price == 99.99 and snap.buys[0].ours and not snap.buys[1].ours
+    assert [o.order_id for o in snap.tps] == ["3"]
+    assert snap.buy_ids == {"1", "2"} and snap.buy_prices == {99.99, 98.0}
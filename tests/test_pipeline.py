@@ -0,0 +1,79 @@
+"""Pipelined BUY placement: core/pipeline.py and GridManager.place_missing_buys"""
+import dataclasses
+import threading
+
+from gridbot.config.settings import Settings
+from gridbot.core.clock import VirtualClock
+from gridbot.core.cooldowns import PENDING, RECENT
+from gridbot.core.grid_logic import GridManager
+from gridbot.core.pipeline import OrderPipeline
+from gridbot.state.manager import StateManager
+
+
+class _BarrierBroker:
+    """
+    Answers a placement only once `parties` placements are in flight together, so a
+    pass that sent them one at a time would break the barrier. Prices in `reject` fail.
+    """
+
+    def __init__(self, parties, reject=()):
+        self.barrier = threading.Barrier(parties, timeout=10.0)
+        self.reject = set(reject)
+        self.min_qty = 0.1
+        self.nonce, self.in_flight, self.max_in_flight = 0, 0, 0
+        self.lock = threading.Lock()
+
+    def clamp_price(self, px):
+        return round(px, 2)
+
+    def client_id(self, prefix, price):
+        self.nonce += 1
+        return f"{prefix}-t-{int(round(price * 100))}-{self.nonce}"
+
+    def limit_buy(self, price, qty, client_order_id=None):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        self.barrier.wait()
+        with self.lock:
+            self.in_flight -= 1
+        if price in self.reject:
+            raise RuntimeError("Order would immediately trigger")
+        return {"orderId": str(int(price * 100)), "clientOrderId": client_order_id, "status": "NEW"}
+
+
+def _manager(tmp_path, broker, **overrides):
+    settings = dataclasses.replace(
+        Settings(), STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+        TELEGRAM_BOT_TOKEN="", MAX_LADDERS=8, MAX_OPEN_TRADES=8, QTY_PER_LADDER=1.0, MAX_DAILY_USDT=1e6, **overrides,
+    )
+    return GridManager(settings, StateManager(settings), broker)
+
+
+def test_pass_overlaps_round_trips_and_reconciles_by_client_id(tmp_path):
+    broker = _BarrierBroker(4, reject={96.0})
+    gm = _manager(tmp_path, broker, ORDER_PIPELINE_DEPTH=4)
+    levels = [99.0, 98.0, 97.0, 96.0, 95.0, 94.0, 93.0, 92.0]
+
+    gm.place_missing_buys(levels)  # two rounds of four overlapping placements, not eight round trips
+    gm.close()
+
+    assert not broker.barrier.broken
+    assert broker.max_in_flight == 4 and not gm.orders.inflight
+    open_buys = gm.state.open_buy_price_to_id
+    assert sorted(open_buys) == [92.0, 93.0, 94.0, 95.0, 97.0, 98.0, 99.0]
+    assert open_buys.price_of_client("B-t-9900-1") == 99.0 and open_buys.price_of_client("B-t-9200-8") == 92.0
+    assert gm.state.total_buys == 7 and gm.state.spent_today == sum(open_buys)
+    # Pending locks are released on each answer; only accepted levels start the duplicate cooldown
+    now = gm.clock.time()
+    assert all(gm.cooldowns.until(px, PENDING) is None for px in levels)
+    assert gm.cooldowns.reason(99.0, now) == RECENT and gm.cooldowns.reason(96.0, now) is None
+
+
+def test_placements_respect_the_order_rate_window():
+    clock = VirtualClock(1000.0)
+    pipe = OrderPipeline(depth=1, rate_10s=3, clock=clock)
+    sent = []
+    for i in range(7):
+        pipe.submit(f"c{i}", i, lambda: sent.append(clock.time()) or {})
+    assert sent == [1000.0] * 3 + [1010.0] * 3 + [1020.0]
@@ -0,0 +1,47 @@
+"""Tests for utils/profiler.py"""
+import json
+import os
+import re
+import threading
+
+from gridbot.utils.profiler import SamplingProfiler
+
+
+def _busy(stop_evt, ready):
+    ready.set()
+    while not stop_evt.is_set():
+        sum(range(100))
+
+
+def test_dump_writes_collapsed_and_speedscope_files(tmp_path):
+    stop_evt, ready = threading.Event(), threading.Event()
+    worker = threading.Thread(target=_busy, args=(stop_evt, ready), name="processor")
+    worker.start()
+    ready.wait(5.0)
+    prof = SamplingProfiler(str(tmp_path), hz=100.0)
+    prof.watch(worker)
+    try:
+        prof._set_active(True)
+        for _ in range(20):
+            prof._sample()
+    finally:
+        stop_evt.set()
+        worker.join()
+
+    first, second = prof.dump(), prof.dump()  # same start time: the second must not overwrite the first
+    assert len(set(first + second)) == 4 and all(os.path.exists(p) for p in first + second)
+    assert re.fullmatch(r"profile-\d{8}-\d{6}-\d{3}\.collapsed", os.path.basename(first[0]))
+    assert os.path.basename(second[0]) == os.path.basename(first[0]).replace(".collapsed", "-2.collapsed")
+
+    lines = open(first[0], encoding="utf-8").read().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == 20
+    frames = [line.rsplit(" ", 1)[0].split(";") for line in lines]
+    assert all(f[0] == "processor" for f in frames)
+    assert any(re.fullmatch(r"test_profiler:_busy:\d+", label) for f in frames for label in f)
+
+    doc = json.load(open(first[1], encoding="utf-8"))
+    prof_doc = doc["profiles"][0]
+    assert prof_doc["name"] == "processor" and len(prof_doc["samples"]) == len(lines)
+    assert abs(prof_doc["endValue"] - 20 * 0.01) < 1e-9
+    names = [fr["name"] for fr in doc["shared"]["frames"]]
+    assert all(0 <= i < len(names) for stack in prof_doc["samples"] for i in stack)
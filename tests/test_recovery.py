@@ -0,0 +1,70 @@
+"""Cold-start state recovery (GridManager.recover_state_from_exchange)"""
+import dataclasses
+
+from gridbot.broker.binance_connector import Broker
+from gridbot.broker.orders import OrderParser
+from gridbot.config.settings import Settings
+from gridbot.core.grid_logic import GridManager
+from gridbot.state.manager import StateManager
+
+
+class _Account(Broker):
+    """Exchange account left behind by an earlier session ("old"): 2 BUYs filled at 99 and 98, one TP live."""
+
+    def __init__(self, settings):
+        self.settings = settings
+        self.order_nonce = 0
+        self.tick_size, self.step_size, self.min_qty, self.min_notional = 0.01, 0.1, 0.1, 0.0
+        self.price_precision, self.qty_precision = 2, 1
+        self.session_tag, self.maker_fee, self.taker_fee = "new", 0.0002, 0.0005
+        self.order_parser = OrderParser(self.clamp_price, self.clamp_qty, self.session_tag)
+
+    def get_position_risk(self):
+        return {"positionAmt": 2.0, "entryPrice": 98.5}
+
+    def get_open_orders(self):
+        return self.order_parser.parse([
+            {"orderId": "10", "clientOrderId": "B-old-9700-3", "side": "BUY", "status": "NEW", "price": "97",
+             "origQty": "1"},
+            {"orderId": "11", "clientOrderId": "T-old-9900-1000", "side": "SELL", "status": "NEW", "price": "100",
+             "origQty": "1", "reduceOnly": True},
+            {"orderId": "12", "clientOrderId": "manual", "side": "BUY", "status": "NEW", "price": "90", "origQty": "1"},
+        ])
+
+    def account_orders_since(self, start_ms, limit=1000):
+        return [
+            {"orderId": "1", "clientOrderId": "B-old-9900-1", "side": "BUY", "status": "FILLED", "price": "99",
+             "executedQty": "1", "updateTime": 1000},
+            {"orderId": "2", "clientOrderId": "B-old-9800-2", "side": "BUY", "status": "FILLED", "price": "98",
+             "executedQty": "1", "updateTime": 2000},
+            {"orderId": "10", "clientOrderId": "B-old-9700-3", "side": "BUY", "status": "NEW", "price": "97"},
+        ]
+
+    def account_trades_since(self, start_ms, limit=1000):
+        return [
+            {"orderId": "1", "price": "98.99", "qty": "1", "commission": "0.0198", "maker": True, "time": 1000},
+            {"orderId": "2", "price": "98", "qty": "1", "commission": "0.0196", "maker": True, "time": 2000},
+        ]
+
+
+def test_rebuilds_positions_and_maps_from_the_exchange(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), DRY_RUN=False, TAKE_PROFIT_USD=1.0, SESSION_TAG_ENV="", TELEGRAM_BOT_TOKEN="",
+        STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+    )
+    sm = StateManager(settings)
+    sm.init_csv()
+    gm = GridManager(settings, sm, _Account(settings))
+    assert gm.recover_state_from_exchange()
+
+    state = sm.state
+    lots = {p.entry: p for p in state.positions}
+    assert set(lots) == {99.0, 98.0}
+    assert lots[99.0].tp_id == "11" and lots[99.0].entry_fill == 98.99 and lots[99.0].opened_at == 1.0
+    assert lots[98.0].tp_id == "" and lots[98.0].tp_price == 99.0  # unhedged: ensure_tps_for_positions places it
+    assert state.open_buy_price_to_id == {97.0: "10"}
+    assert state.tp_blocked_entries == {99.0, 98.0}
+    assert state.handled_fills == {"1", "2"}
+
+    reloaded = StateManager(settings)
+    assert reloaded.load_state() and len(reloaded.state.positions) == 2
@@ -0,0 +1,54 @@
+"""Coalesced refill scheduling in core/grid_logic.py"""
+import dataclasses
+
+from gridbot.config.settings import Settings
+from gridbot.core.grid_logic import GridManager
+from gridbot.state.manager import StateManager
+
+
+class _Broker:
+    def __init__(self):
+        self.cancel_batches = []
+
+    def clamp_price(self, px):
+        return round(px, 2)
+
+    def cancel_orders(self, order_ids):
+        self.cancel_batches.append(list(order_ids))
+        return [{"orderId": oid, "status": "CANCELED"} for oid in order_ids]
+
+
+def _manager(tmp_path, **overrides):
+    settings = dataclasses.replace(
+        Settings(), STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "trades.csv"),
+        TELEGRAM_BOT_TOKEN="", **overrides,
+    )
+    gm = GridManager(settings, StateManager(settings), _Broker())
+    gm.refills = 0
+
+    def _count():
+        gm.refills += 1
+    gm.refill_now = _count
+    return gm
+
+
+def test_tp_fills_in_one_tick_share_one_refill(tmp_path):
+    gm = _manager(tmp_path)
+    gm.state.open_buy_price_to_id = {95.0: "5", 96.0: "6", 97.0: "7", 98.0: "8"}
+    for entry in (99.0, 100.0, 101.0):
+        gm.on_tp_fill(entry, 1.0)
+    assert gm.refills == 0
+
+    assert gm.flush_refill()
+    assert gm.refills == 1
+    assert gm.broker.cancel_batches == [["5", "6", "7"]]
+    assert gm.state.open_buy_price_to_id == {98.0: "8"}
+    assert not gm.flush_refill()
+
+
+def test_refill_waits_for_the_coalescing_window(tmp_path):
+    gm = _manager(tmp_path, REFILL_COALESCE_SEC=60.0)
+    gm.request_refill()
+    assert not gm.flush_refill()
+    assert gm.flush_refill(force=True)
+    assert gm.refills == 1
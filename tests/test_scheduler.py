@@ -0,0 +1,85 @@
+"""Tests for core/scheduler.py"""
+import dataclasses
+
+import pytest
+
+from gridbot.config.settings import Settings
+from gridbot.core import scheduler as scheduler_mod
+from gridbot.core.scheduler import PollScheduler
+
+
+class _Stats:
+    """Fixed quotes and price speed (grid steps per second)."""
+
+    def __init__(self, bid=100.0, ask=100.01, speed=1.0):
+        self.bid, self.ask, self.speed, self.ticks = bid, ask, speed, 1
+
+    def speed_steps(self):
+        return self.speed
+
+
+def _scheduler(speed=1.0, **overrides):
+    base = dict(GRID_STEP_USD=1.0, PRICE_REFRESH_SEC=0.5, POLL_MAX_SEC=5.0, POLL_LOOKAHEAD=0.25,
+                BOOK_POLL_SEC=10.0, ADAPTIVE_POLL=True)
+    settings = dataclasses.replace(Settings(), **{**base, **overrides})
+    return PollScheduler(settings, _Stats(speed=speed))
+
+
+@pytest.fixture(autouse=True)
+def _weight(monkeypatch):
+    used = {"ratio": 0.0}
+    monkeypatch.setattr(scheduler_mod, "used_weight_ratio", lambda: used["ratio"])
+    return used
+
+
+def test_interval_is_a_lookahead_share_of_the_eta():
+    s = _scheduler(speed=1.0)
+    s.update_levels(highest_buy=88.01, lowest_tp=None)  # 12 steps below ask
+    assert s.distance == pytest.approx(12.0)
+    assert s.price_interval() == pytest.approx(3.0)  # eta 12 s * 0.25
+
+    s.update_levels(highest_buy=96.01, lowest_tp=None)  # nearer level -> faster polling
+    assert s.price_interval() == pytest.approx(1.0)
+    s.update_levels(highest_buy=None, lowest_tp=100.5)  # inside the base refresh
+    assert s.price_interval() == 0.5
+    s.update_levels(highest_buy=50.0, lowest_tp=None)  # far away, clamped
+    assert s.price_interval() == 5.0
+
+    s = _scheduler(speed=4.0, POLL_LOOKAHEAD=0.5)  # faster market and larger share
+    s.update_levels(highest_buy=88.01, lowest_tp=None)
+    assert s.price_interval() == pytest.approx(1.5)
+
+
+def test_room_to_fill_or_nothing_resting_use_the_bounds():
+    s = _scheduler()
+    s.update_levels(highest_buy=88.01, lowest_tp=None, urgent=True)
+    assert s.price_interval() == 0.5
+    s.update_levels(highest_buy=None, lowest_tp=None)
+    assert s.price_interval() == 5.0
+    assert _scheduler(ADAPTIVE_POLL=False).price_interval() == 0.5
+
+
+def test_backs_off_near_the_weight_limit(_weight):
+    s = _scheduler()
+    s.update_levels(highest_buy=96.01, lowest_tp=None)
+    _weight["ratio"] = 0.9
+    assert s.price_interval() == pytest.approx(3.0)  # x3 at 90% used
+    _weight["ratio"] = 1.0
+    assert s.price_interval() == pytest.approx(5.0)  # x5 at the limit
+
+
+def test_orders_due_and_book_fallback():
+    s = _scheduler()
+    s.update_levels(highest_buy=92.01, lowest_tp=None)  # 2 s interval
+    s.mark_orders_polled(1000.0)
+    assert not s.orders_due(1001.0) and s.orders_due(1002.0)
+
+    # A live book mirror makes the sweep a backstop...
+    s.book_live = True
+    assert not s.orders_due(1005.0) and s.orders_due(1010.0)
+    # ...unless the ladder has room, or the mirror drops out
+    s.update_levels(highest_buy=92.01, lowest_tp=None, urgent=True)
+    assert s.orders_due(1000.5)
+    s.update_levels(highest_buy=92.01, lowest_tp=None)
+    s.book_live = False
+    assert s.orders_due(1002.0)
@@ -0,0 +1,38 @@
+"""Tests for gridbot.stress"""
+from gridbot.stress import run_scenario
+
+
+def test_scenarios_are_reproducible():
+    a = run_scenario("tp_cascade")
+    b = run_scenario("tp_cascade")
+    assert a == b
+    assert a["buy_fills"] >= 10 and a["tp_placed"] > 0 and a["tp_fills"] > 0
+    assert a["tp_latency_p50"] <= a["tp_latency_p90"] <= a["tp_latency_max"]
+
+
+def test_dropped_responses_cost_the_timeout():
+    r = run_scenario("blackhole", timeout=2.0)
+    assert r["dropped"] > 0
+    assert r["sim_sec"] > 30.0  # timeouts push the processor past the end of the script
+
+
+def test_burst_fills_are_confirmed_and_hedged():
+    r = run_scenario("waterfall")
+    assert r["buy_fills"] > 0
+    assert r["unhedged"] == 0
+
+
+def test_day_rolls_the_budget_over_on_the_virtual_clock():
+    r = run_scenario("day")
+    assert r["sim_sec"] >= 86400.0
+    # The budget runs out on the first day; buying resumes after the rollover
+    assert len(r["buys_by_day"]) == 2 and all(n > 0 for n in r["buys_by_day"].values())
+    assert r["unhedged"] == 0
+
+
+def test_book_mirror_replaces_blind_sweeps():
+    base = run_scenario("tp_cascade")
+    r = run_scenario("tp_cascade", book=True)
+    assert r["tp_fills"] == base["tp_fills"] and r["unhedged"] == 0
+    assert r["requests"] < base["requests"]
+    assert r["tp_latency_p90"] <= base["tp_latency_p90"]
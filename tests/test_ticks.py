@@ -0,0 +1,72 @@
+"""Tests for gridbot/ticks.py"""
+import datetime
+import os
+
+from gridbot.ticks import RECORD, TickRecorder, TickSegment, list_segments, replay, segment_path
+
+DAY_MS = 86_400_000
+T0 = 1_700_006_400_000  # 2023-11-15 00:00:00 UTC
+
+
+def test_segments_roll_at_utc_midnight_and_replay_in_order(tmp_path):
+    rec = TickRecorder(str(tmp_path), "solusdt", flush_every=1000, flush_sec=1e9)
+    rec.append(100.0, 100.5, exchange_ms=T0 - 1)          # last ms of Nov 14
+    rec.append(101.0, 101.5, exchange_ms=T0)              # first ms of Nov 15
+    rec.append(102.0, 102.5, exchange_ms=T0 + DAY_MS - 1)
+    rec.append(103.0, 103.5, exchange_ms=T0 + DAY_MS, seq=77)
+    rec.close()
+
+    names = [os.path.basename(p) for p in list_segments(str(tmp_path), "SOLUSDT")]
+    assert names == ["SOLUSDT-20231114.ticks", "SOLUSDT-20231115.ticks", "SOLUSDT-20231116.ticks"]
+    ticks = list(replay(str(tmp_path), "SOLUSDT"))
+    assert [(t[1], t[2], t[4]) for t in ticks] == [
+        (T0 - 1, 100.0, 1), (T0, 101.0, 2), (T0 + DAY_MS - 1, 102.0, 3), (T0 + DAY_MS, 103.0, 77),
+    ]
+
+
+def test_torn_tail_is_trimmed_on_reopen(tmp_path):
+    day = datetime.date(2023, 11, 15)
+    path = segment_path(str(tmp_path), "SOLUSDT", day)
+    rec = TickRecorder(str(tmp_path), "SOLUSDT")
+    rec.append(100.0, 100.5, exchange_ms=T0)
+    rec.close()
+    with open(path, "ab") as f:
+        f.write(b"\x01" * 13)  # crash mid-record
+
+    seg = TickSegment(path)
+    assert len(seg) == 1  # the reader ignores the partial record
+    seg.close()
+
+    rec = TickRecorder(str(tmp_path), "SOLUSDT")
+    rec.append(101.0, 101.5, exchange_ms=T0 + 1000)
+    rec.close()
+    assert os.path.getsize(path) == 2 * RECORD.size
+    assert [t[2] for t in replay(str(tmp_path), "SOLUSDT")] == [100.0, 101.0]
+
+
+def test_to_numpy_views_the_segment(tmp_path):
+    rec = TickRecorder(str(tmp_path), "SOLUSDT")
+    for i in range(5):
+        rec.append(100.0 + i, 100.5 + i, exchange_ms=T0 + i * 1000)
+    rec.close()
+
+    seg = TickSegment(list_segments(str(tmp_path), "SOLUSDT")[0])
+    arr = seg.to_numpy()
+    assert arr.shape == (5,) and arr["bid"].tolist() == [100.0, 101.0, 102.0, 103.0, 104.0]
+    assert arr["exchange_ms"][-1] == T0 + 4000 and arr["seq"].tolist() == [1, 2, 3, 4, 5]
+    assert list(seg.columns()["ask"]) == arr["ask"].tolist()
+    del arr
+    seg.close()
+
+
+def test_close_flushes_buffered_ticks_and_ignores_later_appends(tmp_path):
+    rec = TickRecorder(str(tmp_path), "SOLUSDT", flush_every=256, flush_sec=1e9)
+    rec.append(100.0, 100.5, exchange_ms=T0)
+    rec.append(101.0, 101.5, exchange_ms=T0 + 1)
+    path = list_segments(str(tmp_path), "SOLUSDT")[0]
+    assert os.path.getsize(path) == 0  # still buffered
+
+    rec.close()
+    rec.close()
+    rec.append(102.0, 102.5, exchange_ms=T0 + 2)  # e.g. the price thread after shutdown
+    assert os.path.getsize(path) == 2 * RECORD.size
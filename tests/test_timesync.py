@@ -0,0 +1,58 @@
+"""Tests for core/timesync.py"""
+import math
+import threading
+import time
+
+from gridbot.core.timesync import ServerClock
+
+
+def test_min_rtt_sample_anchors_offset():
+    clock = ServerClock("http://x")
+    # True offset is +250 ms; the slow probe has asymmetric delay that skews its midpoint
+    clock.add_sample(1_000.0, 1_000.0 + 250.0 + 40.0, 1_080.0)
+    clock.add_sample(2_000.0, 2_000.0 + 250.0 + 5.0, 2_010.0)
+    clock.add_sample(3_000.0, 3_000.0 + 250.0 + 200.0, 3_300.0)
+    assert abs(clock.offset_ms(2_005.0) - 250.0) < 1e-9
+    assert clock.error_ms(2_005.0) == 5.0
+
+
+def test_skew_tracks_drift_over_long_window():
+    clock = ServerClock("http://x", max_drift_ppm=100.0)
+    drift = 20e-6  # 20 ppm
+    for i in range(10):
+        t0 = i * 60_000.0
+        clock.add_sample(t0, t0 + 5.0 + 100.0 + drift * (t0 + 5.0), t0 + 10.0)
+    assert math.isclose(clock.skew, drift, rel_tol=1e-6)
+    later = 3_600_000.0
+    assert abs(clock.offset_ms(later) - (100.0 + drift * later)) < 0.5
+
+
+def test_recv_window_bounds():
+    clock = ServerClock("http://x", min_recv_window_ms=1000, max_recv_window_ms=5000)
+    assert clock.recv_window_ms() == 5000  # no samples yet
+    now = time.time() * 1000.0
+    clock.add_sample(now - 20.0, now + 30.0, now)
+    assert 1000 <= clock.recv_window_ms() < 5000
+
+
+def test_clock_step_resets_window():
+    clock = ServerClock("http://x")
+    clock.add_sample(0.0, 105.0, 10.0)
+    clock.add_sample(1_000.0, 1_105.0, 1_010.0)
+    clock.add_sample(2_000.0, 2_005.0 - 900.0, 2_010.0)  # local clock jumped forward ~1 s
+    assert len(clock.samples) == 1
+    assert abs(clock.offset_ms(2_005.0) + 900.0) < 1e-9
+
+
+def test_estimates_wait_for_a_refit_in_progress():
+    clock = ServerClock("http://x")
+    clock.add_sample(1_000.0, 1_250.0 + 5.0, 1_010.0)
+    out = []
+    with clock._lock:  # a refit is half-way through updating anchor and skew
+        reader = threading.Thread(target=lambda: out.append((clock.offset_ms(1_005.0), clock.error_ms(1_005.0))))
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive() and not out
+        clock._anchor, clock.skew = (1_005.0, 300.0, 2.0), 0.0
+    reader.join(5.0)
+    assert out == [(300.0, 1.0)]
@@ -0,0 +1,56 @@
+"""Tests for state/writer.py and StateManager's background saves"""
+import dataclasses
+import json
+import os
+
+from gridbot.config.settings import Settings
+from gridbot.state.manager import Position, StateManager
+from gridbot.state.writer import StateWriter
+
+
+def test_requests_within_the_window_coalesce_into_one_write(tmp_path):
+    path = str(tmp_path / "state.json")
+    w = StateWriter(path, window_sec=0.5)
+    for i in range(20):
+        w.submit({"n": i})
+    assert w.wait(timeout=5.0)  # the barrier does not wait out the window
+    assert w.writes == 1 and w.requests == 20
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == {"n": 19}
+    w.close()
+
+
+def test_failed_write_fails_the_barrier(tmp_path):
+    w = StateWriter(str(tmp_path / "missing" / "state.json"), window_sec=0.0)
+    assert not w.wait(w.submit({"n": 1}), timeout=5.0)
+    assert w.writes == 0
+    w.close()
+
+
+def test_manager_queues_a_consistent_snapshot(tmp_path):
+    settings = dataclasses.replace(
+        Settings(), STATE_FILE=str(tmp_path / "state.json"), CSV_FILE=str(tmp_path / "t.csv")
+    )
+    sm = StateManager(settings)
+    sm.state.positions = [Position(99.0, 1.0, 100.0, "7")]
+    sm.state.open_buy_price_to_id[98.0] = "8"
+    sm.state.handled_fills.add("6")
+    expected = sm.snapshot()
+
+    sm.start_writer(window_sec=10.0)
+    sm.save_state()
+    # Changes after the request are not part of it
+    sm.state.positions.append(Position(97.0, 1.0, 98.0, "9"))
+    sm.state.open_buy_price_to_id[96.0] = "10"
+    sm.state.handled_fills.add("5")
+    sm.ledger.levels["97.0"] = [1, 0, 0.0, 1.0]
+    assert not os.path.exists(settings.STATE_FILE)
+    assert sm.writer.wait(1, timeout=5.0)
+    with open(settings.STATE_FILE, encoding="utf-8") as f:
+        assert json.load(f) == json.loads(json.dumps(expected))
+
+    assert sm.save_state(durable=True)
+    sm.close()
+    loaded = StateManager(settings)
+    assert loaded.load_state()
+    assert len(loaded.state.positions) == 2 and dict(loaded.state.open_buy_price_to_id) == {98.0: "8", 96.0: "10"}